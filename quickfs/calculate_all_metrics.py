@@ -1,14 +1,28 @@
 #!/usr/bin/env python3
 """
 Calculate all QuickFS metrics for all stocks and save to database.
+
+Usage:
+    python3 calculate_all_metrics.py         # Calculate metrics for all tickers
+    python3 calculate_all_metrics.py serve   # Stay running and calculate batches sent by clients
 """
 
 import sqlite3
 import json
+import math
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
 import sys
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Import all calculation functions from get_one.py
 # Get the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,6 +30,7 @@ sys.path.insert(0, script_dir)
 
 from get_one import (
     get_ticker_data,
+    iter_ticker_data,
     calculate_5y_revenue_growth,
     calculate_5y_halfway_revenue_growth,
     calculate_halfway_share_count_growth,
@@ -34,40 +49,104 @@ from get_one import (
 QUICKFS_DB = os.path.join(os.path.dirname(__file__), "data.db")
 METRICS_DB = os.path.join(os.path.dirname(__file__), "metrics.db")
 
-def init_metrics_db():
-    """Initialize the metrics database with table to store calculated metrics."""
-    conn = sqlite3.connect(METRICS_DB)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS quickfs_metrics (
+# Address and key for `serve` mode, which keeps this process (and the
+# get_one imports) warm and calculates ticker batches sent by clients.
+# There is no default key: connections unpickle what clients send, so
+# serve refuses to start unless QUICKFS_METRICS_AUTHKEY is set.
+SERVE_ADDRESS = ('localhost', 6001)
+SERVE_AUTHKEY = os.environ.get('QUICKFS_METRICS_AUTHKEY', '').encode() or None
+
+# Metric value columns, in table order. Values are written once as a JSON
+# object in metrics_json; each column is a virtual generated column that
+# extracts its key, so existing queries keep working unchanged.
+METRIC_COLUMNS = (
+    # Revenue Growth Metrics
+    'revenue_5y_cagr',
+    'revenue_5y_halfway_growth',
+    'revenue_growth_consistency',
+    'revenue_growth_acceleration',
+    # Margin Metrics
+    'operating_margin_growth',
+    'gross_margin_growth',
+    'operating_margin_consistency',
+    'gross_margin_consistency',
+    # Share Count Metrics
+    'share_count_halfway_growth',
+    # Return on Capital Metrics
+    'ttm_ebit_ppe',
+    # Debt Metrics
+    'net_debt_to_ttm_operating_income',
+    # Return Metrics
+    'total_past_return',
+    'total_past_return_multiplier',
+)
+
+# Batches with fewer tickers than this are calculated in this process, since
+# starting worker processes would cost more than it saves. Larger batches
+# are split over a process pool in chunks of PARALLEL_CHUNKSIZE tickers.
+PARALLEL_MIN_TICKERS = 32
+PARALLEL_CHUNKSIZE = 16
+
+# Position of each metric in METRIC_COLUMNS. calculate_all_metrics_for_ticker
+# fills a list in this order, so saving needs no per-metric dict lookups.
+METRIC_INDEX = {name: i for i, name in enumerate(METRIC_COLUMNS)}
+
+def _create_metrics_table(cursor, table_name):
+    """Create the quickfs_metrics table layout under the given name."""
+    generated_columns = ",\n".join(
+        f"            {name} REAL AS (json_extract(metrics_json, '$.{name}')) VIRTUAL"
+        for name in METRIC_COLUMNS
+    )
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table_name} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             ticker TEXT NOT NULL,
             calculated_at TEXT NOT NULL,
-            -- Revenue Growth Metrics
-            revenue_5y_cagr REAL,
-            revenue_5y_halfway_growth REAL,
-            revenue_growth_consistency REAL,
-            revenue_growth_acceleration REAL,
-            -- Margin Metrics
-            operating_margin_growth REAL,
-            gross_margin_growth REAL,
-            operating_margin_consistency REAL,
-            gross_margin_consistency REAL,
-            -- Share Count Metrics
-            share_count_halfway_growth REAL,
-            -- Return on Capital Metrics
-            ttm_ebit_ppe REAL,
-            -- Debt Metrics
-            net_debt_to_ttm_operating_income REAL,
-            -- Return Metrics
-            total_past_return REAL,
-            total_past_return_multiplier REAL,
+            metrics_json TEXT,
+{generated_columns},
             -- Error tracking
             error TEXT,
             UNIQUE(ticker, calculated_at)
         )
     ''')
+
+def _migrate_metrics_table(cursor):
+    """
+    Rebuild a quickfs_metrics table created with plain REAL columns so that
+    values live in metrics_json. Row ids are preserved (readers select the
+    latest row per ticker by MAX(id)).
+    """
+    cursor.execute("PRAGMA table_xinfo(quickfs_metrics)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if not columns or 'metrics_json' in columns:
+        return
+    
+    cursor.execute('ALTER TABLE quickfs_metrics RENAME TO quickfs_metrics_old')
+    _create_metrics_table(cursor, 'quickfs_metrics')
+    # Re-serialize in Python rather than with json_object(), which rounds
+    # REAL values to 15 significant digits
+    cursor.execute(f'''
+        SELECT id, ticker, calculated_at, error, {", ".join(METRIC_COLUMNS)}
+        FROM quickfs_metrics_old
+    ''')
+    rows = [
+        (row[0], row[1], row[2], serialize_metrics(row[4:]), row[3])
+        for row in cursor.fetchall()
+    ]
+    cursor.executemany('''
+        INSERT INTO quickfs_metrics (id, ticker, calculated_at, metrics_json, error)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    cursor.execute('DROP TABLE quickfs_metrics_old')
+    print("Migrated quickfs_metrics to JSON-backed metric columns")
+
+def init_metrics_db():
+    """Initialize the metrics database with table to store calculated metrics."""
+    conn = sqlite3.connect(METRICS_DB)
+    cursor = conn.cursor()
+    
+    _migrate_metrics_table(cursor)
+    _create_metrics_table(cursor, 'quickfs_metrics')
     
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_ticker ON quickfs_metrics(ticker)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_calculated_at ON quickfs_metrics(calculated_at)')
@@ -98,14 +177,18 @@ def get_all_tickers():
 
 def calculate_all_metrics_for_ticker(ticker):
     """Calculate all metrics for a single ticker."""
-    ticker_data = get_ticker_data(ticker)
-    
+    return calculate_metrics_from_data(ticker, get_ticker_data(ticker))
+
+def calculate_metrics_from_data(ticker, ticker_data):
+    """Calculate all metrics for a ticker from its already loaded data."""
     if not ticker_data:
         return None, f"No data found for {ticker}"
     
+    values = [None] * len(METRIC_COLUMNS)
     metrics = {
         'ticker': ticker,
-        'calculated_at': datetime.now().isoformat()
+        'calculated_at': datetime.now().isoformat(),
+        'values': values
     }
     errors = []
     
@@ -114,28 +197,28 @@ def calculate_all_metrics_for_ticker(ticker):
         result = calculate_5y_revenue_growth(ticker_data)
         if result:
             growth_rate, _, _, _, _, _ = result
-            metrics['revenue_5y_cagr'] = growth_rate
+            values[METRIC_INDEX['revenue_5y_cagr']] = growth_rate
         else:
             errors.append("revenue_5y_cagr")
         
         result = calculate_5y_halfway_revenue_growth(ticker_data)
         if result:
             growth_ratio, _, _, _, _, _ = result
-            metrics['revenue_5y_halfway_growth'] = growth_ratio
+            values[METRIC_INDEX['revenue_5y_halfway_growth']] = growth_ratio
         else:
             errors.append("revenue_5y_halfway_growth")
         
         result = calculate_consistency_of_growth(ticker_data)
         if result:
-            stdev, _, _ = result
-            metrics['revenue_growth_consistency'] = stdev
+            stdev, _, _, _ = result
+            values[METRIC_INDEX['revenue_growth_consistency']] = stdev
         else:
             errors.append("revenue_growth_consistency")
         
         result = calculate_acceleration_of_growth(ticker_data)
         if result:
             acceleration, _, _, _, _, _, _ = result
-            metrics['revenue_growth_acceleration'] = acceleration
+            values[METRIC_INDEX['revenue_growth_acceleration']] = acceleration
         else:
             errors.append("revenue_growth_acceleration")
         
@@ -143,28 +226,28 @@ def calculate_all_metrics_for_ticker(ticker):
         result = calculate_operating_margin_growth(ticker_data)
         if result:
             margin_growth, _, _, _, _, _, _, _ = result
-            metrics['operating_margin_growth'] = margin_growth
+            values[METRIC_INDEX['operating_margin_growth']] = margin_growth
         else:
             errors.append("operating_margin_growth")
         
         result = calculate_gross_margin_growth(ticker_data)
         if result:
             margin_growth, _, _, _, _, _, _, _ = result
-            metrics['gross_margin_growth'] = margin_growth
+            values[METRIC_INDEX['gross_margin_growth']] = margin_growth
         else:
             errors.append("gross_margin_growth")
         
         result = calculate_operating_margin_consistency(ticker_data)
         if result:
             stdev, _, _ = result
-            metrics['operating_margin_consistency'] = stdev
+            values[METRIC_INDEX['operating_margin_consistency']] = stdev
         else:
             errors.append("operating_margin_consistency")
         
         result = calculate_gross_margin_consistency(ticker_data)
         if result:
             stdev, _, _ = result
-            metrics['gross_margin_consistency'] = stdev
+            values[METRIC_INDEX['gross_margin_consistency']] = stdev
         else:
             errors.append("gross_margin_consistency")
         
@@ -172,7 +255,7 @@ def calculate_all_metrics_for_ticker(ticker):
         result = calculate_halfway_share_count_growth(ticker_data)
         if result:
             growth_ratio, _, _, _, _, _ = result
-            metrics['share_count_halfway_growth'] = growth_ratio
+            values[METRIC_INDEX['share_count_halfway_growth']] = growth_ratio
         else:
             errors.append("share_count_halfway_growth")
         
@@ -180,7 +263,7 @@ def calculate_all_metrics_for_ticker(ticker):
         result = calculate_ttm_ebit_ppe(ticker_data)
         if result:
             ratio, _, _, _, _ = result
-            metrics['ttm_ebit_ppe'] = ratio
+            values[METRIC_INDEX['ttm_ebit_ppe']] = ratio
         else:
             errors.append("ttm_ebit_ppe")
         
@@ -188,7 +271,7 @@ def calculate_all_metrics_for_ticker(ticker):
         result = calculate_net_debt_to_ttm_operating_income(ticker_data)
         if result:
             ratio, _, _, _, _ = result
-            metrics['net_debt_to_ttm_operating_income'] = ratio
+            values[METRIC_INDEX['net_debt_to_ttm_operating_income']] = ratio
         else:
             errors.append("net_debt_to_ttm_operating_income")
         
@@ -196,8 +279,8 @@ def calculate_all_metrics_for_ticker(ticker):
         result = calculate_total_past_return(ticker_data)
         if result:
             total_return, total_return_multiplier, _, _, _, _, _, _ = result
-            metrics['total_past_return'] = total_return
-            metrics['total_past_return_multiplier'] = total_return_multiplier
+            values[METRIC_INDEX['total_past_return']] = total_return
+            values[METRIC_INDEX['total_past_return_multiplier']] = total_return_multiplier
         else:
             errors.append("total_past_return")
         
@@ -209,8 +292,58 @@ def calculate_all_metrics_for_ticker(ticker):
     except Exception as e:
         return None, f"Error calculating metrics: {str(e)}"
 
+def _calculate_chunk(tickers):
+    """Calculate metrics for a chunk of tickers, loaded with one bulk read."""
+    return [calculate_metrics_from_data(ticker, ticker_data)
+            for ticker, ticker_data in iter_ticker_data(tickers)]
+
+def batch_calculate(tickers, max_workers=None):
+    """
+    Calculate metrics for many tickers, in worker processes for large batches.
+    
+    Yields (ticker, metrics, error) in the order of tickers, where metrics
+    and error are as returned by calculate_all_metrics_for_ticker. Ticker
+    data is read in bulk with iter_ticker_data; each worker reads its chunks
+    over its own database connection.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if len(tickers) < PARALLEL_MIN_TICKERS or max_workers == 1:
+        for ticker, ticker_data in iter_ticker_data(tickers):
+            metrics, error = calculate_metrics_from_data(ticker, ticker_data)
+            yield ticker, metrics, error
+        return
+    
+    chunks = [tickers[start:start + PARALLEL_CHUNKSIZE]
+              for start in range(0, len(tickers), PARALLEL_CHUNKSIZE)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = (result for chunk_results in executor.map(_calculate_chunk, chunks)
+                   for result in chunk_results)
+        for ticker, (metrics, error) in zip(tickers, results):
+            yield ticker, metrics, error
+
+def serialize_metrics(values):
+    """
+    Serialize metric values, ordered as METRIC_COLUMNS, to the JSON text
+    stored in metrics_json.
+    
+    Non-finite floats are stored as null since SQLite's JSON functions reject
+    NaN/Infinity tokens.
+    """
+    if HAS_ORJSON:
+        # orjson already emits null for NaN/Infinity
+        return orjson.dumps(dict(zip(METRIC_COLUMNS, values))).decode()
+    return json.dumps({
+        name: value if value is None or math.isfinite(value) else None
+        for name, value in zip(METRIC_COLUMNS, values)
+    })
+
 def save_metrics(metrics):
-    """Save calculated metrics to the database."""
+    """
+    Save calculated metrics to the database.
+    
+    Metric values are read from metrics['values'], ordered as METRIC_COLUMNS
+    (see calculate_all_metrics_for_ticker).
+    """
     if not metrics:
         return False
     
@@ -219,33 +352,12 @@ def save_metrics(metrics):
     
     try:
         cursor.execute('''
-            INSERT OR REPLACE INTO quickfs_metrics (
-                ticker, calculated_at,
-                revenue_5y_cagr, revenue_5y_halfway_growth, revenue_growth_consistency, revenue_growth_acceleration,
-                operating_margin_growth, gross_margin_growth,
-                operating_margin_consistency, gross_margin_consistency,
-                share_count_halfway_growth,
-                ttm_ebit_ppe,
-                net_debt_to_ttm_operating_income,
-                total_past_return, total_past_return_multiplier,
-                error
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT OR REPLACE INTO quickfs_metrics (ticker, calculated_at, metrics_json, error)
+            VALUES (?, ?, ?, ?)
         ''', (
             metrics['ticker'],
             metrics['calculated_at'],
-            metrics.get('revenue_5y_cagr'),
-            metrics.get('revenue_5y_halfway_growth'),
-            metrics.get('revenue_growth_consistency'),
-            metrics.get('revenue_growth_acceleration'),
-            metrics.get('operating_margin_growth'),
-            metrics.get('gross_margin_growth'),
-            metrics.get('operating_margin_consistency'),
-            metrics.get('gross_margin_consistency'),
-            metrics.get('share_count_halfway_growth'),
-            metrics.get('ttm_ebit_ppe'),
-            metrics.get('net_debt_to_ttm_operating_income'),
-            metrics.get('total_past_return'),
-            metrics.get('total_past_return_multiplier'),
+            serialize_metrics(metrics['values']),
             metrics.get('error')
         ))
         
@@ -278,6 +390,16 @@ def main():
     print(f"Found {len(tickers)} tickers")
     print(f"Tickers: {', '.join(tickers[:10])}{'...' if len(tickers) > 10 else ''}")
     print()
+    run_batch(tickers)
+
+def run_batch(tickers):
+    """
+    Calculate and save metrics for a list of tickers, printing progress and
+    a summary. The metrics database must already be initialized.
+    
+    Returns a summary dict with success/error/skip counts and the tickers
+    that had failing metrics.
+    """
     print("Starting metric calculations...")
     print("-" * 80)
     
@@ -286,8 +408,7 @@ def main():
     skip_count = 0
     
     # Track failures
-    companies_with_failures = []  # List of (ticker, failed_metrics_list)
-    metric_failure_counts = {}  # metric_name -> count
+    companies_with_failures = []  # List of (ticker, failed_metrics_mask)
     
     # Define all metric names for tracking
     all_metric_names = [
@@ -305,15 +426,32 @@ def main():
         'total_past_return'
     ]
     
-    # Initialize failure counts
-    for metric_name in all_metric_names:
-        metric_failure_counts[metric_name] = 0
+    # Format metric names for display
+    metric_display_names = {
+        'revenue_5y_cagr': '5-Year Revenue CAGR',
+        'revenue_5y_halfway_growth': '5-Year Halfway Revenue Growth',
+        'revenue_growth_consistency': 'Revenue Growth Consistency',
+        'revenue_growth_acceleration': 'Revenue Growth Acceleration',
+        'operating_margin_growth': 'Operating Margin Growth',
+        'gross_margin_growth': 'Gross Margin Growth',
+        'operating_margin_consistency': 'Operating Margin Consistency',
+        'gross_margin_consistency': 'Gross Margin Consistency',
+        'share_count_halfway_growth': 'Share Count Halfway Growth',
+        'ttm_ebit_ppe': 'TTM EBIT/PPE',
+        'net_debt_to_ttm_operating_income': 'Net Debt to TTM Operating Income',
+        'total_past_return': 'Total Past Return'
+    }
+    display_names = [metric_display_names[metric_name] for metric_name in all_metric_names]
+    
+    # Failure counts aligned with all_metric_names, plus each metric's
+    # position in the values list so the per-ticker scan is index-only.
+    # A ticker's failed metrics are kept as a bitmask over the same indices.
+    metric_failure_counts = [0] * len(all_metric_names)
+    metric_positions = [METRIC_INDEX[metric_name] for metric_name in all_metric_names]
     
-    for i, ticker in enumerate(tickers, 1):
+    for i, (ticker, metrics, error) in enumerate(batch_calculate(tickers), 1):
         print(f"[{i}/{len(tickers)}] Processing {ticker}...", end=' ')
         
-        metrics, error = calculate_all_metrics_for_ticker(ticker)
-        
         if error and not metrics:
             print(f"✗ {error}")
             error_count += 1
@@ -324,18 +462,17 @@ def main():
             skip_count += 1
             continue
         
-        # Track failures
-        failed_metrics = []
-        
         # Check for None values in metrics (failed calculations)
-        for metric_name in all_metric_names:
-            if metric_name not in metrics or metrics[metric_name] is None:
-                failed_metrics.append(metric_name)
-                metric_failure_counts[metric_name] += 1
+        values = metrics['values']
+        failed_mask = 0
+        for j, pos in enumerate(metric_positions):
+            if values[pos] is None:
+                failed_mask |= 1 << j
+                metric_failure_counts[j] += 1
         
         # Track companies with failures
-        if failed_metrics:
-            companies_with_failures.append((ticker, failed_metrics))
+        if failed_mask:
+            companies_with_failures.append((ticker, failed_mask))
         
         # Save metrics
         if save_metrics(metrics):
@@ -358,7 +495,7 @@ def main():
     print(f"Metrics saved to: {METRICS_DB}")
     
     # Display failure statistics
-    if companies_with_failures or any(count > 0 for count in metric_failure_counts.values()):
+    if companies_with_failures or any(metric_failure_counts):
         print()
         print("=" * 80)
         print("FAILURE STATISTICS")
@@ -367,31 +504,14 @@ def main():
         # Show which metrics failed the most
         print("\nMetric Failure Counts (sorted by frequency):")
         print("-" * 80)
-        sorted_failures = sorted(metric_failure_counts.items(), key=lambda x: x[1], reverse=True)
-        
-        # Format metric names for display
-        metric_display_names = {
-            'revenue_5y_cagr': '5-Year Revenue CAGR',
-            'revenue_5y_halfway_growth': '5-Year Halfway Revenue Growth',
-            'revenue_growth_consistency': 'Revenue Growth Consistency',
-            'revenue_growth_acceleration': 'Revenue Growth Acceleration',
-            'operating_margin_growth': 'Operating Margin Growth',
-            'gross_margin_growth': 'Gross Margin Growth',
-            'operating_margin_consistency': 'Operating Margin Consistency',
-            'gross_margin_consistency': 'Gross Margin Consistency',
-            'share_count_halfway_growth': 'Share Count Halfway Growth',
-            'ttm_ebit_ppe': 'TTM EBIT/PPE',
-            'net_debt_to_ttm_operating_income': 'Net Debt to TTM Operating Income',
-            'total_past_return': 'Total Past Return'
-        }
+        sorted_failures = sorted(zip(display_names, metric_failure_counts), key=lambda x: x[1], reverse=True)
         
         print(f"{'Metric':<45} {'Failures':<10} {'% of Total':<12}")
         print("-" * 80)
         
         total_companies = len(tickers)
-        for metric_name, count in sorted_failures:
+        for display_name, count in sorted_failures:
             if count > 0:
-                display_name = metric_display_names.get(metric_name, metric_name)
                 percentage = (count / total_companies * 100) if total_companies > 0 else 0
                 print(f"{display_name:<45} {count:<10} {percentage:.1f}%")
         
@@ -402,21 +522,96 @@ def main():
             print("-" * 80)
             
             # Sort by number of failures (most failures first)
-            companies_with_failures.sort(key=lambda x: len(x[1]), reverse=True)
+            companies_with_failures.sort(key=lambda x: x[1].bit_count(), reverse=True)
             
             print(f"{'Ticker':<10} {'# Failed':<10} {'Failed Metrics'}")
             print("-" * 80)
             
-            for ticker, failed_metrics in companies_with_failures:
-                metric_names_short = [metric_display_names.get(m, m) for m in failed_metrics]
+            for ticker, failed_mask in companies_with_failures:
+                metric_names_short = [name for j, name in enumerate(display_names) if failed_mask >> j & 1]
                 # Truncate if too long
                 metrics_str = ', '.join(metric_names_short)
                 if len(metrics_str) > 65:
                     metrics_str = metrics_str[:62] + "..."
-                print(f"{ticker:<10} {len(failed_metrics):<10} {metrics_str}")
+                print(f"{ticker:<10} {len(metric_names_short):<10} {metrics_str}")
         
         print()
+    
+    return {
+        'total': len(tickers),
+        'success': success_count,
+        'errors': error_count,
+        'skipped': skip_count,
+        'failures': [
+            (ticker, [name for j, name in enumerate(all_metric_names) if failed_mask >> j & 1])
+            for ticker, failed_mask in companies_with_failures
+        ]
+    }
+
+def handle_batch_request(conn):
+    """
+    Receive a ticker list on a connection, run it and send back the summary.
+    
+    Bad requests and clients that disconnect are reported and dropped, so
+    one client can't stop the serve loop.
+    """
+    try:
+        tickers = conn.recv()
+    except EOFError:
+        return
+    except Exception as e:
+        print(f"Error receiving batch: {e}")
+        return
+    
+    # A bare string would otherwise be run as one-character tickers
+    if not isinstance(tickers, (list, tuple)) or not all(isinstance(ticker, str) for ticker in tickers):
+        print(f"Rejected batch: expected a list of tickers, got {type(tickers).__name__}")
+        summary = {'error': 'expected a list of ticker strings'}
+    else:
+        try:
+            summary = run_batch(tickers)
+        except Exception as e:
+            # Keep serving; report the failure to the client instead
+            print(f"Error running batch: {e}")
+            summary = {'error': str(e)}
+    
+    try:
+        conn.send(summary)
+    except OSError as e:
+        print(f"Client disconnected before the reply: {e}")
+
+def serve(address=SERVE_ADDRESS, authkey=None):
+    """
+    Listen for ticker batches and calculate them in this process.
+    
+    Imports and database setup are paid once instead of per run. Clients
+    connect with multiprocessing.connection.Client(SERVE_ADDRESS,
+    authkey=SERVE_AUTHKEY), send a list of tickers and receive the summary
+    dict returned by run_batch. Exits with an error if no authkey is given
+    and QUICKFS_METRICS_AUTHKEY is not set.
+    """
+    authkey = authkey or SERVE_AUTHKEY
+    if not authkey:
+        print("ERROR: QUICKFS_METRICS_AUTHKEY is not set!")
+        print("Set it to a long random secret shared with the clients before running serve")
+        sys.exit(1)
+    
+    init_metrics_db()
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Serving metric batches on {address[0]}:{address[1]}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError) as e:
+                # Wrong key, or the client went away during the handshake
+                print(f"Rejected connection: {e}")
+                continue
+            with conn:
+                handle_batch_request(conn)
 
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve()
+    else:
+        main()
 
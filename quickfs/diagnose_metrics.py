@@ -5,8 +5,15 @@ Diagnostic tool to check which QuickFS metrics fail for a ticker and why.
 
 import sys
 import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 sys.path.insert(0, os.path.dirname(__file__))
 
+import get_one
 from get_one import (
     get_ticker_data,
     calculate_5y_revenue_growth,
@@ -21,47 +28,180 @@ from get_one import (
     calculate_ttm_ebit_ppe,
     calculate_net_debt_to_ttm_operating_income,
     calculate_total_past_return,
-    get_consecutive_quarters,
-    get_previous_quarter
+    get_previous_quarter,
+    PPE_FIELDS
 )
 
+# Threads used to diagnose a ticker's metrics. The diagnostics are pure
+# Python, so under the GIL a pool only adds overhead; raise this on a
+# free-threaded build.
+MAX_WORKERS = 1
+
+# On-disk copies of ticker data, so re-diagnosing a ticker skips the
+# database read. A copy is used while it is newer than the QuickFS database
+# (and its WAL file, where commits land first) and younger than
+# CACHE_TTL_SECONDS.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "quickfs")
+CACHE_TTL_SECONDS = 90 * 24 * 60 * 60
+
+def get_quickfs_db_mtime():
+    """Last modification time of the QuickFS database or its WAL file, or None if neither exists."""
+    mtimes = []
+    for path in (get_one.QUICKFS_DB, get_one.QUICKFS_DB + '-wal'):
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            pass
+    return max(mtimes, default=None)
+
+def load_diagnosis_ticker_data(ticker):
+    """Get ticker data through this tool's in-memory and on-disk caches."""
+    # Keying on the database mtime drops in-memory entries when it changes
+    return _load_ticker_data(ticker, get_quickfs_db_mtime())
+
+@lru_cache(maxsize=64)
+def _load_ticker_data(ticker, db_mtime):
+    """Load ticker data from the disk cache, falling back to get_ticker_data."""
+    # Hash the symbol so arbitrary input can't escape CACHE_DIR
+    cache_path = os.path.join(CACHE_DIR, hashlib.md5(ticker.encode()).hexdigest() + ".json")
+    
+    try:
+        cache_mtime = os.path.getmtime(cache_path)
+        if (db_mtime is None or cache_mtime >= db_mtime) and time.time() - cache_mtime < CACHE_TTL_SECONDS:
+            with open(cache_path) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+    
+    ticker_data = get_ticker_data(ticker)
+    if ticker_data:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_path, 'w') as f:
+                json.dump(ticker_data, f)
+        except OSError as e:
+            print(f"Warning: could not cache data for {ticker}: {e}")
+    return ticker_data
+
+# (threshold, suffix) pairs for format_value, largest first
+VALUE_SCALES = ((1e9, 'B'), (1e6, 'M'), (1e3, 'K'))
+
+def format_value(val):
+    """Format a quarter value as $ with a B/M/K suffix."""
+    # Values are almost always numbers, so try that path first; abs()
+    # raises TypeError for None, strings and other JSON values
+    try:
+        abs_val = abs(val)
+    except TypeError:
+        return str(val)
+    for threshold, suffix in VALUE_SCALES:
+        if abs_val >= threshold:
+            return f"${val/threshold:.2f}{suffix}"
+    return f"${val:.2f}"
+
 def format_quarter_table(quarters_data, title, show_gap_warning=False):
     """Format quarter data as a table."""
     if not quarters_data:
         return []
     
-    lines = []
-    lines.append(f"  {title}:")
-    lines.append("  " + "-" * 60)
-    lines.append(f"  {'Quarter':<12} {'Value':<20}")
-    lines.append("  " + "-" * 60)
-    
-    for date, val in quarters_data:
-        # Format the value
-        if isinstance(val, (int, float)):
-            if abs(val) >= 1e9:
-                val_str = f"${val/1e9:.2f}B"
-            elif abs(val) >= 1e6:
-                val_str = f"${val/1e6:.2f}M"
-            elif abs(val) >= 1e3:
-                val_str = f"${val/1e3:.2f}K"
-            else:
-                val_str = f"${val:.2f}"
-        else:
-            val_str = str(val)
-        
-        lines.append(f"  {date:<12} {val_str:<20}")
+    separator = "  " + "-" * 60
+    lines = [f"  {title}:", separator, f"  {'Quarter':<12} {'Value':<20}", separator]
+    lines += [f"  {date:<12} {format_value(val):<20}" for date, val in quarters_data]
     
-    if show_gap_warning and len(quarters_data) > 0:
-        lines.append("  " + "-" * 60)
-        lines.append("  ⚠ Gap detected - quarters are not consecutive")
+    if show_gap_warning:
+        lines += [separator, "  ⚠ Gap detected - quarters are not consecutive"]
     
     lines.append("")
     
     return lines
 
-def check_data_availability(ticker_data, field_name):
-    """Check if a field has data and count consecutive quarters."""
+@dataclass(slots=True)
+class TableRef:
+    """A quarter table in a diagnose_metric reason list, formatted only when printed."""
+    data: list
+    title: str
+    show_gap_warning: bool = False
+    
+    def render(self):
+        """Format the table as lines (see format_quarter_table)."""
+        return format_quarter_table(self.data, self.title, self.show_gap_warning)
+
+def check_data_availability(ticker_data, field_name, cache=None):
+    """
+    Check if a field has data and count consecutive quarters.
+    
+    If a cache dict is given, results are memoized in it by field name, so
+    pass a fresh dict per ticker and reuse it for all of that ticker's checks.
+    """
+    if cache is not None:
+        if field_name not in cache:
+            cache[field_name] = _check_field(ticker_data, field_name, cache)
+        return cache[field_name]
+    return _check_field(ticker_data, field_name)
+
+# Key for the shared date order in a check_data_availability cache (field
+# names are strings, so a tuple can't collide with them)
+_DATE_ORDER_KEY = ('period_end_date', 'order')
+
+def descending_date_order(dates, cache=None):
+    """
+    Get the indices of non-None dates, most recent first. Equal dates keep
+    their original order. Every field of a ticker shares the same dates, so
+    with a cache the sort runs once per ticker.
+    """
+    if cache is not None:
+        order = cache.get(_DATE_ORDER_KEY)
+        if order is None:
+            order = cache[_DATE_ORDER_KEY] = descending_date_order(dates)
+        return order
+    return sorted([i for i, date in enumerate(dates) if date is not None], key=dates.__getitem__, reverse=True)
+
+# Key for the shared month keys in a check_data_availability cache
+_MONTH_KEYS_KEY = ('period_end_date', 'month_keys')
+
+def walk_valid_data(dates, values, cache=None, limit=20):
+    """
+    Walk a field's valid data points most recent first, in one pass.
+    
+    Returns (consecutive, recent): the leading run of consecutive quarters
+    (as get_consecutive_quarters with a minimum of 1 would return it, or
+    None) and up to `limit` most recent (date, value) points. Dates are
+    parsed to month keys at most once per ticker when a cache is given.
+    """
+    month_keys = {}
+    if cache is not None:
+        month_keys = cache.setdefault(_MONTH_KEYS_KEY, {})
+    
+    def month_key(i):
+        key = month_keys.get(i)
+        if key is None:
+            key = month_keys[i] = get_one._month_key(dates[i])
+        return key
+    
+    consecutive = []
+    recent = []
+    in_run = True
+    last_index = None
+    value_count = len(values)
+    for i in descending_date_order(dates, cache):
+        if i >= value_count or values[i] is None:
+            continue
+        point = (dates[i], values[i])
+        if in_run:
+            # The previous quarter is always 3 months earlier
+            if last_index is not None and month_key(i) != month_key(last_index) - 3:
+                in_run = False
+            else:
+                consecutive.append(point)
+                last_index = i
+        if len(recent) < limit:
+            recent.append(point)
+        elif not in_run:
+            break
+    return consecutive or None, recent
+
+def _check_field(ticker_data, field_name, cache=None):
+    """Uncached body of check_data_availability."""
     if not ticker_data or 'financials' not in ticker_data:
         return None, "No financials data"
     
@@ -80,29 +220,242 @@ def check_data_availability(ticker_data, field_name):
     
     dates = quarterly_data.get('period_end_date', [])
     
-    # Count valid values
-    valid_count = sum(1 for v in values if v is not None)
-    positive_count = sum(1 for v in values if v is not None and (not isinstance(v, (int, float)) or v > 0))
+    # Count valid and positive values in one pass
+    valid_count = 0
+    positive_count = 0
+    for v in values:
+        if v is not None:
+            valid_count += 1
+            if not isinstance(v, (int, float)) or v > 0:
+                positive_count += 1
     
-    # Check consecutive quarters
-    consecutive = get_consecutive_quarters(quarterly_data, field_name, 1)
+    # Check consecutive quarters and get the 20 most recent valid data
+    # points (for display) in the same walk
+    consecutive, all_valid = walk_valid_data(dates, values, cache)
     consecutive_count = len(consecutive) if consecutive else 0
     
-    # Get all valid data points (for display)
-    all_valid = [(date, val) for date, val in zip(dates, values) if date is not None and val is not None]
-    all_valid.sort(key=lambda x: x[0], reverse=True)  # Most recent first
-    
     return {
-        'total_values': len(values) if values else 0,
+        'total_values': len(values),
         'valid_values': valid_count,
         'positive_values': positive_count,
         'consecutive_quarters': consecutive_count,
-        'all_valid_data': all_valid[:20] if len(all_valid) > 20 else all_valid,  # Show up to 20 most recent
-        'consecutive_data': consecutive[:20] if consecutive and len(consecutive) > 20 else (consecutive if consecutive else [])
+        'all_valid_data': all_valid,
+        'consecutive_data': consecutive[:20] if consecutive else [],
+        '_consecutive_raw': consecutive  # Untruncated, for cross-field date checks
     }, None
 
-def diagnose_metric(metric_name, calculation_func, ticker_data, required_quarters=None):
-    """Try to calculate a metric and diagnose why it fails if it does."""
+def field_counts(quarterly_data, field_name, cache=None):
+    """
+    Get (total, valid, consecutive) value counts for a quarterly field, or
+    None if it is missing or not a list.
+    
+    Reuses a cached check_data_availability result when there is one;
+    otherwise only counts, skipping the sorted data point lists.
+    """
+    if cache and field_name in cache:
+        data_info, error = cache[field_name]
+        if error:
+            return None
+        return data_info['total_values'], data_info['valid_values'], data_info['consecutive_quarters']
+    
+    values = quarterly_data.get(field_name)
+    if not isinstance(values, list):
+        return None
+    
+    consecutive, _ = walk_valid_data(quarterly_data.get('period_end_date', []), values, cache, limit=0)
+    return len(values), len(values) - values.count(None), len(consecutive) if consecutive else 0
+
+def report_field(data_info, error, label, required, reasons):
+    """
+    Append reasons for a field that has fewer than `required` consecutive
+    quarters, with tables of the consecutive run and the data after the gap.
+    """
+    if error:
+        reasons.append(f"{label}: {error}")
+    elif data_info:
+        consecutive_data = data_info['consecutive_data']
+        if data_info['consecutive_quarters'] < required:
+            reasons.append(f"{label}: only {data_info['consecutive_quarters']} consecutive quarters (need {required})")
+            # Show quarter details if there's a gap (show table if few consecutive quarters)
+            if consecutive_data and len(consecutive_data) < 10:
+                reasons.append(TableRef(consecutive_data, f"{label.title()} Consecutive Quarters"))
+                # Show what comes after (the gap)
+                all_valid_data = data_info['all_valid_data']
+                if len(all_valid_data) > len(consecutive_data):
+                    gap_data = all_valid_data[len(consecutive_data):len(consecutive_data) + 10]
+                    reasons.append(TableRef(gap_data, "Next Data Points (Gap Detected)", show_gap_warning=True))
+        elif data_info['valid_values'] == 0:
+            reasons.append(f"{label}: no valid data")
+    else:
+        reasons.append(f"{label}: no data found")
+
+def consecutive_date_set(data_info, count):
+    """
+    Get the dates of the first `count` consecutive quarters from a
+    check_data_availability result, cached on data_info per count.
+    """
+    date_sets = data_info.setdefault('_consecutive_date_sets', {})
+    dates = date_sets.get(count)
+    if dates is None:
+        dates = date_sets[count] = frozenset(date for date, _ in data_info['_consecutive_raw'][:count])
+    return dates
+
+def diagnose_revenue(ticker_data, required_quarters, cache, reasons):
+    """Diagnose revenue-only metrics (CAGR, halfway growth, consistency, acceleration)."""
+    data_info, error = check_data_availability(ticker_data, 'revenue', cache)
+    if error:
+        reasons.append(error)
+    elif data_info:
+        if data_info['consecutive_quarters'] < (required_quarters or 20):
+            reasons.append(f"Only {data_info['consecutive_quarters']} consecutive quarters of revenue data (need {required_quarters or 20})")
+        elif data_info['valid_values'] == 0:
+            reasons.append("No valid revenue data")
+
+def diagnose_share_count(ticker_data, required_quarters, cache, reasons):
+    """Diagnose share count metrics using the first share field with data."""
+    for field in ['shares_eop', 'shares_diluted', 'shares_basic']:
+        data_info, error = check_data_availability(ticker_data, field, cache)
+        if not error and data_info and data_info['valid_values'] > 0:
+            if data_info['consecutive_quarters'] < (required_quarters or 20):
+                reasons.append(f"Only {data_info['consecutive_quarters']} consecutive quarters of {field} data (need {required_quarters or 20})")
+            break
+    else:
+        reasons.append("No share count data found (checked shares_eop, shares_diluted, shares_basic)")
+
+def diagnose_revenue_and_field(ticker_data, field_name, label, required, cache, reasons):
+    """Diagnose a margin metric that needs `required` matching quarters of revenue and field_name."""
+    rev_info, rev_error = check_data_availability(ticker_data, 'revenue', cache)
+    field_info, field_error = check_data_availability(ticker_data, field_name, cache)
+    
+    report_field(rev_info, rev_error, "Revenue", required, reasons)
+    report_field(field_info, field_error, label, required, reasons)
+    
+    # Check if dates match (both fields need matching dates)
+    if rev_info and field_info and rev_info['consecutive_quarters'] > 0 and field_info['consecutive_quarters'] > 0:
+        matching_count = len(consecutive_date_set(rev_info, required) & consecutive_date_set(field_info, required))
+        if matching_count < required:
+            reasons.append(f"Only {matching_count} matching dates between revenue and {field_name} (need {required})")
+
+def diagnose_operating_margin(ticker_data, required_quarters, cache, reasons):
+    """Diagnose operating margin metrics."""
+    diagnose_revenue_and_field(ticker_data, 'operating_income', "Operating income", required_quarters or 20, cache, reasons)
+
+def diagnose_ttm_operating_margin(ticker_data, required_quarters, cache, reasons):
+    """Diagnose TTM operating margin metrics, which need 4 quarters."""
+    diagnose_revenue_and_field(ticker_data, 'operating_income', "Operating income", 4, cache, reasons)
+
+def diagnose_gross_margin(ticker_data, required_quarters, cache, reasons):
+    """Diagnose gross margin metrics."""
+    diagnose_revenue_and_field(ticker_data, 'gross_profit', "Gross profit", required_quarters or 20, cache, reasons)
+
+def diagnose_ppe(ticker_data, required_quarters, cache, reasons):
+    """Diagnose TTM EBIT/PPE (operating income plus any PPE field)."""
+    op_inc_info, op_inc_error = check_data_availability(ticker_data, 'operating_income', cache)
+    if op_inc_error:
+        reasons.append(f"Operating income: {op_inc_error}")
+    elif op_inc_info:
+        if op_inc_info['consecutive_quarters'] < 4:
+            reasons.append(f"Only {op_inc_info['consecutive_quarters']} consecutive quarters of operating_income data (need 4 for TTM)")
+    
+    for field in PPE_FIELDS:
+        data_info, error = check_data_availability(ticker_data, field, cache)
+        if not error and data_info and data_info['valid_values'] > 0:
+            if data_info['consecutive_quarters'] < 1:
+                reasons.append(f"PPE field '{field}' found but has no consecutive quarters")
+            break
+    else:
+        reasons.append(f"No PPE data found (checked {', '.join(PPE_FIELDS)})")
+
+def diagnose_net_debt(ticker_data, required_quarters, cache, reasons):
+    """Diagnose net debt to TTM operating income."""
+    op_inc_info, op_inc_error = check_data_availability(ticker_data, 'operating_income', cache)
+    net_debt_info, net_debt_error = check_data_availability(ticker_data, 'net_debt', cache)
+    
+    if op_inc_error:
+        reasons.append(f"Operating income: {op_inc_error}")
+    elif op_inc_info:
+        if op_inc_info['consecutive_quarters'] < 4:
+            reasons.append(f"Operating income: only {op_inc_info['consecutive_quarters']} consecutive quarters (need 4 for TTM)")
+        elif op_inc_info['valid_values'] == 0:
+            reasons.append("Operating income: no valid data")
+    else:
+        reasons.append("Operating income: no data found")
+    
+    if net_debt_error:
+        reasons.append(f"Net debt: {net_debt_error}")
+    elif net_debt_info:
+        if net_debt_info['valid_values'] == 0:
+            reasons.append("Net debt: no valid data")
+    else:
+        reasons.append("Net debt: no data found")
+
+def diagnose_total_past_return(ticker_data, required_quarters, cache, reasons):
+    """Diagnose total past return (price history, plus a note on dividends)."""
+    data_info, error = check_data_availability(ticker_data, 'period_end_price', cache)
+    if error:
+        reasons.append(error)
+    elif data_info:
+        if data_info['consecutive_quarters'] < 2:
+            reasons.append(f"Only {data_info['consecutive_quarters']} consecutive quarters of price data (need at least 2)")
+    
+    # Check dividends (optional but good to know)
+    div_info, _ = check_data_availability(ticker_data, 'dividends', cache)
+    if div_info and div_info['valid_values'] == 0:
+        reasons.append("Note: No dividend data (this is okay, metric can still calculate)")
+
+def metric_checks(metric_name):
+    """
+    Pick the diagnose_* checks for a metric from keywords in its name.
+    
+    Results are stored in METRIC_CHECKS, so this name normalization runs
+    at most once per metric name.
+    """
+    metric_lower = metric_name.lower().replace(' ', '_').replace('-', '_')
+    checks = []
+    
+    if 'revenue' in metric_lower:
+        checks.append(diagnose_revenue)
+    if 'share_count' in metric_lower or ('share' in metric_lower and 'growth' in metric_lower):
+        checks.append(diagnose_share_count)
+    if 'operating_margin' in metric_lower or ('operating_income' in metric_lower and 'net_debt' not in metric_lower):
+        checks.append(diagnose_ttm_operating_margin if 'ttm' in metric_lower else diagnose_operating_margin)
+    if 'gross_margin' in metric_lower or 'gross_profit' in metric_lower:
+        checks.append(diagnose_gross_margin)
+    if 'ppe' in metric_lower or 'ebit_ppe' in metric_lower:
+        checks.append(diagnose_ppe)
+    if 'net_debt' in metric_lower:
+        checks.append(diagnose_net_debt)
+    if 'total_past_return' in metric_lower or ('total_return' in metric_lower and 'past' in metric_lower):
+        checks.append(diagnose_total_past_return)
+    
+    return tuple(checks)
+
+# Metrics diagnosed by main: (name, calculation function, required quarters)
+METRICS_TO_CHECK = [
+    ("5-Year Revenue CAGR", calculate_5y_revenue_growth, 20),
+    ("5-Year Halfway Revenue Growth", calculate_5y_halfway_revenue_growth, 20),
+    ("Revenue Growth Consistency", calculate_consistency_of_growth, 20),
+    ("Revenue Growth Acceleration", calculate_acceleration_of_growth, 21),
+    ("Operating Margin Growth", calculate_operating_margin_growth, 20),
+    ("Gross Margin Growth", calculate_gross_margin_growth, 20),
+    ("Operating Margin Consistency", calculate_operating_margin_consistency, 20),
+    ("Gross Margin Consistency", calculate_gross_margin_consistency, 20),
+    ("Share Count Halfway Growth", calculate_halfway_share_count_growth, 20),
+    ("TTM EBIT/PPE", calculate_ttm_ebit_ppe, 4),
+    ("Net Debt to TTM Operating Income", calculate_net_debt_to_ttm_operating_income, 4),
+    ("Total Past Return", calculate_total_past_return, 2),
+]
+
+# Checks for each metric name, resolved once (at import for METRICS_TO_CHECK)
+METRIC_CHECKS = {name: metric_checks(name) for name, _, _ in METRICS_TO_CHECK}
+
+def diagnose_metric(metric_name, calculation_func, ticker_data, required_quarters=None, cache=None):
+    """
+    Try to calculate a metric and diagnose why it fails if it does.
+    
+    cache is passed through to check_data_availability. A failure's reason
+    list may contain TableRef entries; call render() to format them.
+    """
     try:
         result = calculation_func(ticker_data)
         if result is not None:
@@ -119,204 +472,13 @@ def diagnose_metric(metric_name, calculation_func, ticker_data, required_quarter
             if 'quarterly' not in financials:
                 return False, "Failed", "No quarterly data available"
             
-            quarterly_data = financials['quarterly']
-            
-            # Check specific field requirements based on metric name
-            metric_lower = metric_name.lower().replace(' ', '_').replace('-', '_')
-            
-            if 'revenue' in metric_lower:
-                data_info, error = check_data_availability(ticker_data, 'revenue')
-                if error:
-                    reasons.append(error)
-                elif data_info:
-                    if data_info['consecutive_quarters'] < (required_quarters or 20):
-                        reasons.append(f"Only {data_info['consecutive_quarters']} consecutive quarters of revenue data (need {required_quarters or 20})")
-                    elif data_info['valid_values'] == 0:
-                        reasons.append("No valid revenue data")
-            
-            if 'share_count' in metric_lower or ('share' in metric_lower and 'growth' in metric_lower):
-                for field in ['shares_eop', 'shares_diluted', 'shares_basic']:
-                    data_info, error = check_data_availability(ticker_data, field)
-                    if not error and data_info and data_info['valid_values'] > 0:
-                        if data_info['consecutive_quarters'] < (required_quarters or 20):
-                            reasons.append(f"Only {data_info['consecutive_quarters']} consecutive quarters of {field} data (need {required_quarters or 20})")
-                        break
-                else:
-                    reasons.append("No share count data found (checked shares_eop, shares_diluted, shares_basic)")
-            
-            if 'operating_margin' in metric_lower or ('operating_income' in metric_lower and 'net_debt' not in metric_lower):
-                # Check both revenue and operating income
-                rev_info, rev_error = check_data_availability(ticker_data, 'revenue')
-                op_inc_info, op_inc_error = check_data_availability(ticker_data, 'operating_income')
-                
-                if 'ttm' in metric_lower:
-                    required = 4
-                else:
-                    required = required_quarters or 20
-                
-                # Check revenue
-                if rev_error:
-                    reasons.append(f"Revenue: {rev_error}")
-                elif rev_info:
-                    if rev_info['consecutive_quarters'] < required:
-                        reasons.append(f"Revenue: only {rev_info['consecutive_quarters']} consecutive quarters (need {required})")
-                        # Show quarter details if there's a gap (show table if few consecutive quarters)
-                        if rev_info.get('consecutive_data') and len(rev_info['consecutive_data']) < 10:
-                            table_lines = format_quarter_table(rev_info['consecutive_data'], "Revenue Consecutive Quarters")
-                            reasons.extend(table_lines)
-                            # Show what comes after (the gap)
-                            if rev_info.get('all_valid_data') and len(rev_info['all_valid_data']) > len(rev_info['consecutive_data']):
-                                gap_data = rev_info['all_valid_data'][len(rev_info['consecutive_data']):len(rev_info['consecutive_data'])+10]
-                                gap_table_lines = format_quarter_table(gap_data, "Next Data Points (Gap Detected)", show_gap_warning=True)
-                                reasons.extend(gap_table_lines)
-                else:
-                    reasons.append("Revenue: no data found")
-                
-                # Check operating income
-                if op_inc_error:
-                    reasons.append(f"Operating income: {op_inc_error}")
-                elif op_inc_info:
-                    if op_inc_info['consecutive_quarters'] < required:
-                        reasons.append(f"Operating income: only {op_inc_info['consecutive_quarters']} consecutive quarters (need {required})")
-                        # Show quarter details if there's a gap (show table if few consecutive quarters)
-                        if op_inc_info.get('consecutive_data') and len(op_inc_info['consecutive_data']) < 10:
-                            table_lines = format_quarter_table(op_inc_info['consecutive_data'], "Operating Income Consecutive Quarters")
-                            reasons.extend(table_lines)
-                            # Show what comes after (the gap)
-                            if op_inc_info.get('all_valid_data') and len(op_inc_info['all_valid_data']) > len(op_inc_info['consecutive_data']):
-                                gap_data = op_inc_info['all_valid_data'][len(op_inc_info['consecutive_data']):len(op_inc_info['consecutive_data'])+10]
-                                gap_table_lines = format_quarter_table(gap_data, "Next Data Points (Gap Detected)", show_gap_warning=True)
-                                reasons.extend(gap_table_lines)
-                    elif op_inc_info['valid_values'] == 0:
-                        reasons.append("Operating income: no valid data")
-                else:
-                    reasons.append("Operating income: no data found")
-                
-                # Check if dates match (both fields need matching dates)
-                if rev_info and op_inc_info and rev_info['consecutive_quarters'] > 0 and op_inc_info['consecutive_quarters'] > 0:
-                    # Get consecutive quarters for both to check matching dates
-                    rev_consecutive = get_consecutive_quarters(ticker_data['financials']['quarterly'], 'revenue', 1)
-                    op_inc_consecutive = get_consecutive_quarters(ticker_data['financials']['quarterly'], 'operating_income', 1)
-                    if rev_consecutive and op_inc_consecutive:
-                        rev_dates = {date for date, _ in rev_consecutive[:required]}
-                        op_inc_dates = {date for date, _ in op_inc_consecutive[:required]}
-                        matching_dates = rev_dates & op_inc_dates
-                        if len(matching_dates) < required:
-                            reasons.append(f"Only {len(matching_dates)} matching dates between revenue and operating_income (need {required})")
-            
-            if 'gross_margin' in metric_lower or 'gross_profit' in metric_lower:
-                # Check both revenue and gross profit
-                rev_info, rev_error = check_data_availability(ticker_data, 'revenue')
-                gp_info, gp_error = check_data_availability(ticker_data, 'gross_profit')
-                
-                required = required_quarters or 20
-                
-                # Check revenue
-                if rev_error:
-                    reasons.append(f"Revenue: {rev_error}")
-                elif rev_info:
-                    if rev_info['consecutive_quarters'] < required:
-                        reasons.append(f"Revenue: only {rev_info['consecutive_quarters']} consecutive quarters (need {required})")
-                        # Show quarter details if there's a gap (show table if few consecutive quarters)
-                        if rev_info.get('consecutive_data') and len(rev_info['consecutive_data']) < 10:
-                            table_lines = format_quarter_table(rev_info['consecutive_data'], "Revenue Consecutive Quarters")
-                            reasons.extend(table_lines)
-                            # Show what comes after (the gap)
-                            if rev_info.get('all_valid_data') and len(rev_info['all_valid_data']) > len(rev_info['consecutive_data']):
-                                gap_data = rev_info['all_valid_data'][len(rev_info['consecutive_data']):len(rev_info['consecutive_data'])+10]
-                                gap_table_lines = format_quarter_table(gap_data, "Next Data Points (Gap Detected)", show_gap_warning=True)
-                                reasons.extend(gap_table_lines)
-                else:
-                    reasons.append("Revenue: no data found")
-                
-                # Check gross profit
-                if gp_error:
-                    reasons.append(f"Gross profit: {gp_error}")
-                elif gp_info:
-                    if gp_info['consecutive_quarters'] < required:
-                        reasons.append(f"Gross profit: only {gp_info['consecutive_quarters']} consecutive quarters (need {required})")
-                        # Show quarter details if there's a gap (show table if few consecutive quarters)
-                        if gp_info.get('consecutive_data') and len(gp_info['consecutive_data']) < 10:
-                            table_lines = format_quarter_table(gp_info['consecutive_data'], "Gross Profit Consecutive Quarters")
-                            reasons.extend(table_lines)
-                            # Show what comes after (the gap)
-                            if gp_info.get('all_valid_data') and len(gp_info['all_valid_data']) > len(gp_info['consecutive_data']):
-                                gap_data = gp_info['all_valid_data'][len(gp_info['consecutive_data']):len(gp_info['consecutive_data'])+10]
-                                gap_table_lines = format_quarter_table(gap_data, "Next Data Points (Gap Detected)", show_gap_warning=True)
-                                reasons.extend(gap_table_lines)
-                    elif gp_info['valid_values'] == 0:
-                        reasons.append("Gross profit: no valid data")
-                else:
-                    reasons.append("Gross profit: no data found")
-                
-                # Check if dates match (both fields need matching dates)
-                if rev_info and gp_info and rev_info['consecutive_quarters'] > 0 and gp_info['consecutive_quarters'] > 0:
-                    # Get consecutive quarters for both to check matching dates
-                    rev_consecutive = get_consecutive_quarters(ticker_data['financials']['quarterly'], 'revenue', 1)
-                    gp_consecutive = get_consecutive_quarters(ticker_data['financials']['quarterly'], 'gross_profit', 1)
-                    if rev_consecutive and gp_consecutive:
-                        rev_dates = {date for date, _ in rev_consecutive[:required]}
-                        gp_dates = {date for date, _ in gp_consecutive[:required]}
-                        matching_dates = rev_dates & gp_dates
-                        if len(matching_dates) < required:
-                            reasons.append(f"Only {len(matching_dates)} matching dates between revenue and gross_profit (need {required})")
-            
-            if 'ppe' in metric_lower or 'ebit_ppe' in metric_lower:
-                # Check both operating income and PPE
-                op_inc_info, op_inc_error = check_data_availability(ticker_data, 'operating_income')
-                if op_inc_error:
-                    reasons.append(f"Operating income: {op_inc_error}")
-                elif op_inc_info:
-                    if op_inc_info['consecutive_quarters'] < 4:
-                        reasons.append(f"Only {op_inc_info['consecutive_quarters']} consecutive quarters of operating_income data (need 4 for TTM)")
-                
-                ppe_found = False
-                ppe_field_used = None
-                for field in ['ppe_net', 'ppe', 'property_plant_equipment', 'net_ppe', 'fixed_assets']:
-                    data_info, error = check_data_availability(ticker_data, field)
-                    if not error and data_info and data_info['valid_values'] > 0:
-                        ppe_found = True
-                        ppe_field_used = field
-                        if data_info['consecutive_quarters'] < 1:
-                            reasons.append(f"PPE field '{field}' found but has no consecutive quarters")
-                        break
-                if not ppe_found:
-                    reasons.append("No PPE data found (checked ppe_net, ppe, property_plant_equipment, net_ppe, fixed_assets)")
-            
-            if 'net_debt' in metric_lower:
-                op_inc_info, op_inc_error = check_data_availability(ticker_data, 'operating_income')
-                net_debt_info, net_debt_error = check_data_availability(ticker_data, 'net_debt')
-                
-                if op_inc_error:
-                    reasons.append(f"Operating income: {op_inc_error}")
-                elif op_inc_info:
-                    if op_inc_info['consecutive_quarters'] < 4:
-                        reasons.append(f"Operating income: only {op_inc_info['consecutive_quarters']} consecutive quarters (need 4 for TTM)")
-                    elif op_inc_info['valid_values'] == 0:
-                        reasons.append("Operating income: no valid data")
-                else:
-                    reasons.append("Operating income: no data found")
-                
-                if net_debt_error:
-                    reasons.append(f"Net debt: {net_debt_error}")
-                elif net_debt_info:
-                    if net_debt_info['valid_values'] == 0:
-                        reasons.append("Net debt: no valid data")
-                else:
-                    reasons.append("Net debt: no data found")
-            
-            if 'total_past_return' in metric_lower or ('total_return' in metric_lower and 'past' in metric_lower):
-                data_info, error = check_data_availability(ticker_data, 'period_end_price')
-                if error:
-                    reasons.append(error)
-                elif data_info:
-                    if data_info['consecutive_quarters'] < 2:
-                        reasons.append(f"Only {data_info['consecutive_quarters']} consecutive quarters of price data (need at least 2)")
-                
-                # Check dividends (optional but good to know)
-                div_info, _ = check_data_availability(ticker_data, 'dividends')
-                if div_info and div_info['valid_values'] == 0:
-                    reasons.append("Note: No dividend data (this is okay, metric can still calculate)")
+            # Run the checks for this metric's required fields
+            checks = METRIC_CHECKS.get(metric_name)
+            if checks is None:
+                # Other metric names are resolved once and remembered
+                checks = METRIC_CHECKS[metric_name] = metric_checks(metric_name)
+            for check in checks:
+                check(ticker_data, required_quarters, cache, reasons)
             
             # If no reasons found, try to provide a general diagnosis
             if not reasons:
@@ -328,19 +490,29 @@ def diagnose_metric(metric_name, calculation_func, ticker_data, required_quarter
                 else:
                     reasons.append("Unknown reason - calculation returned None (check data availability summary below)")
             
-            # Join reasons - if any are lists (tables), flatten them
-            flat_reasons = []
-            for r in reasons:
-                if isinstance(r, list):
-                    flat_reasons.extend(r)
-                else:
-                    flat_reasons.append(r)
-            
-            return False, "Failed", flat_reasons
+            return False, "Failed", reasons
     
     except Exception as e:
         return False, "Error", f"Exception occurred: {str(e)}"
 
+def diagnose_all_metrics(ticker_data, cache=None, max_workers=MAX_WORKERS):
+    """
+    Diagnose every metric in METRICS_TO_CHECK, on a thread pool if
+    max_workers > 1.
+    
+    Returns (metric_name, success, status, reason) tuples in METRICS_TO_CHECK
+    order. The diagnostics only read ticker_data; concurrent cache fills for
+    the same field store equal results, so sharing the cache is safe.
+    """
+    def run(metric):
+        metric_name, calc_func, required_q = metric
+        return (metric_name, *diagnose_metric(metric_name, calc_func, ticker_data, required_q, cache))
+    
+    if max_workers <= 1:
+        return [run(metric) for metric in METRICS_TO_CHECK]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, METRICS_TO_CHECK))
+
 def main():
     """Main function to diagnose metrics for a ticker."""
     print("=" * 80)
@@ -363,7 +535,7 @@ def main():
         print(f"\nFetching data for {ticker}...")
         
         # Get ticker data
-        ticker_data = get_ticker_data(ticker)
+        ticker_data = load_diagnosis_ticker_data(ticker)
         
         if not ticker_data:
             print(f"✗ No QuickFS data found for {ticker}")
@@ -373,21 +545,8 @@ def main():
         print(f"✓ Data loaded for {ticker}")
         print()
         
-        # Define all metrics to check
-        metrics_to_check = [
-            ("5-Year Revenue CAGR", calculate_5y_revenue_growth, 20),
-            ("5-Year Halfway Revenue Growth", calculate_5y_halfway_revenue_growth, 20),
-            ("Revenue Growth Consistency", calculate_consistency_of_growth, 20),
-            ("Revenue Growth Acceleration", calculate_acceleration_of_growth, 21),
-            ("Operating Margin Growth", calculate_operating_margin_growth, 20),
-            ("Gross Margin Growth", calculate_gross_margin_growth, 20),
-            ("Operating Margin Consistency", calculate_operating_margin_consistency, 20),
-            ("Gross Margin Consistency", calculate_gross_margin_consistency, 20),
-            ("Share Count Halfway Growth", calculate_halfway_share_count_growth, 20),
-            ("TTM EBIT/PPE", calculate_ttm_ebit_ppe, 4),
-            ("Net Debt to TTM Operating Income", calculate_net_debt_to_ttm_operating_income, 4),
-            ("Total Past Return", calculate_total_past_return, 2),
-        ]
+        # Field checks are shared by several metrics and the summary below
+        field_cache = {}
         
         print("=" * 80)
         print(f"METRIC DIAGNOSTICS FOR {ticker}")
@@ -397,9 +556,7 @@ def main():
         success_count = 0
         fail_count = 0
         
-        for metric_name, calc_func, required_q in metrics_to_check:
-            success, status, reason = diagnose_metric(metric_name, calc_func, ticker_data, required_q)
-            
+        for metric_name, success, status, reason in diagnose_all_metrics(ticker_data, field_cache):
             if success:
                 print(f"✓ {metric_name}: SUCCESS")
                 success_count += 1
@@ -409,7 +566,11 @@ def main():
                     # If reason contains multiple lines (tables), print each line separately
                     if isinstance(reason, list):
                         for line in reason:
-                            print(line)
+                            if isinstance(line, TableRef):
+                                for table_line in line.render():
+                                    print(table_line)
+                            else:
+                                print(line)
                     else:
                         # Split by semicolon but preserve table formatting
                         if ";   " in reason and "------------------------------------------------------------" in reason:
@@ -429,7 +590,7 @@ def main():
         print("=" * 80)
         print("SUMMARY")
         print("=" * 80)
-        print(f"Total metrics: {len(metrics_to_check)}")
+        print(f"Total metrics: {len(METRICS_TO_CHECK)}")
         print(f"Successful: {success_count}")
         print(f"Failed: {fail_count}")
         print()
@@ -452,13 +613,12 @@ def main():
             print("-" * 80)
             
             for field in key_fields:
-                data_info, error = check_data_availability(ticker_data, field)
-                if error:
+                counts = field_counts(quarterly, field, field_cache)
+                if counts is None:
                     print(f"{field:<25} {'N/A':<10} {'N/A':<10} {'N/A':<15}")
-                elif data_info:
-                    print(f"{field:<25} {data_info['total_values']:<10} {data_info['valid_values']:<10} {data_info['consecutive_quarters']:<15}")
                 else:
-                    print(f"{field:<25} {'Not found':<10} {'-':<10} {'-':<15}")
+                    total, valid, consecutive = counts
+                    print(f"{field:<25} {total:<10} {valid:<10} {consecutive:<15}")
         
         print()
 
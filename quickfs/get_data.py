@@ -1,27 +1,35 @@
 #!/usr/bin/env python3
 """
 Fetch all financial data from QuickFS API for stocks in top_tickers database.
+
+Usage:
+    python3 get_data.py           # Fetch tickers, resuming today's run if it was interrupted
+    python3 get_data.py RUN_ID    # Fetch tickers, resuming the run with the given id
 """
 
 import sqlite3
 import os
+import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import threading
+import queue
+import random
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
 
 try:
-    from quickfs import QuickFS
-    HAS_QUICKFS_SDK = True
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_QUICKFS_SDK = False
-    print("Warning: QuickFS SDK not installed. Installing it...")
-    import subprocess
-    import sys
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "quickfs"])
-    from quickfs import QuickFS
-    HAS_QUICKFS_SDK = True
+    HAS_ORJSON = False
 
 # Database paths
 TOP_TICKERS_DB = os.path.join(os.path.dirname(__file__), "..", "finviz", "top_tickers.db")
@@ -36,7 +44,11 @@ def load_config():
         'api_base': 'https://public-api.quickfs.net/v1',
         'request_delay': 0.5,
         'retry_delay': 60,
-        'max_workers': 5
+        'max_workers': 5,
+        'request_timeout': 30,
+        'max_retries': 5,
+        'retry_base_delay': 0.5,
+        'cache_ttl_hours': 24
     }
     
     if os.path.exists(CONFIG_FILE):
@@ -63,29 +75,144 @@ QUICKFS_API_BASE = config['api_base']
 REQUEST_DELAY = config.get('request_delay', 0.5)
 RETRY_DELAY = config.get('retry_delay', 60)
 MAX_WORKERS = config.get('max_workers', 5)  # Number of concurrent threads
+REQUEST_TIMEOUT = config.get('request_timeout', 30)  # Seconds per HTTP request
+MAX_RETRIES = config.get('max_retries', 5)  # Retries for network errors and 5xx responses
+RETRY_BASE_DELAY = config.get('retry_base_delay', 0.5)  # Seconds, doubled per retry
+CACHE_TTL_HOURS = config.get('cache_ttl_hours', 24)  # Skip tickers fetched more recently than this
 
-def init_quickfs_db():
-    """Initialize the QuickFS database with a table to store all financial data."""
-    conn = sqlite3.connect(QUICKFS_DB)
-    cursor = conn.cursor()
+# Messages from the fetch and writer threads and the per-ticker results.
+# During a run they go through a queue to a listener thread that prints
+# them (see start_progress_log), so no thread waits on stdout.
+logger = logging.getLogger('quickfs.get_data')
+
+# Connection settings for writing to the QuickFS database. WAL lets readers
+# work during a write and makes each commit an append instead of a full
+# journal sync. journal_mode is stored in the database file; the others
+# apply per connection, so every writing connection runs this.
+WRITE_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-20000;
+    PRAGMA busy_timeout=30000;
+"""
+
+def configure_connection(conn):
+    """Apply WRITE_PRAGMAS to a QuickFS database connection."""
+    conn.executescript(WRITE_PRAGMAS)
+
+# zlib level for the data_json column. QuickFS JSON compresses about 3.5x,
+# and decompressing it costs a fraction of parsing it.
+DATA_COMPRESSION_LEVEL = 6
+
+# Fetched data is written in batches by a writer thread, each batch in one
+# transaction: up to WRITE_BATCH_SIZE rows, or whatever has arrived after
+# waiting WRITE_FLUSH_SECONDS for the next one
+WRITE_BATCH_SIZE = 100
+WRITE_FLUSH_SECONDS = 5.0
+
+# One connection, opened on first use, serves every save_quickfs_data call;
+# _write_lock serializes the threads that share it
+_write_conn = None
+_write_conn_path = None
+_write_lock = threading.Lock()
+
+def get_write_connection():
+    """
+    Get the shared connection for writing to QUICKFS_DB, opening it if needed.
     
-    # Create table to store QuickFS data
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS quickfs_data (
+    Call with _write_lock held. A connection to a previous QUICKFS_DB path is
+    closed and replaced.
+    """
+    global _write_conn, _write_conn_path
+    if _write_conn is None or _write_conn_path != QUICKFS_DB:
+        close_write_connection()
+        # Autocommit mode: save_quickfs_rows manages its own transactions
+        _write_conn = sqlite3.connect(QUICKFS_DB, timeout=30.0, check_same_thread=False,
+                                      isolation_level=None)
+        configure_connection(_write_conn)
+        _write_conn_path = QUICKFS_DB
+    return _write_conn
+
+def close_write_connection():
+    """Close the shared write connection, if it is open."""
+    global _write_conn, _write_conn_path
+    if _write_conn is not None:
+        # Refresh the planner statistics after a run's writes
+        _write_conn.execute("PRAGMA optimize")
+        _write_conn.close()
+        _write_conn = None
+        _write_conn_path = None
+
+def _create_quickfs_table(cursor, table_name):
+    """Create the quickfs_data table layout under the given name."""
+    # One row per ticker and data type, updated in place on each fetch
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table_name} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             ticker TEXT NOT NULL,
             data_type TEXT NOT NULL,
             data_json TEXT NOT NULL,
             fetched_at TEXT NOT NULL,
-            UNIQUE(ticker, data_type, fetched_at)
+            UNIQUE(ticker, data_type)
+        )
+    ''')
+
+def _migrate_quickfs_table(cursor):
+    """
+    Rebuild a quickfs_data table created with UNIQUE(ticker, data_type,
+    fetched_at), which gained a row on every fetch, keeping only the latest
+    row per ticker and data type.
+    """
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'quickfs_data'")
+    row = cursor.fetchone()
+    if not row or 'UNIQUE(ticker, data_type, fetched_at)' not in row[0]:
+        return
+    
+    cursor.execute('ALTER TABLE quickfs_data RENAME TO quickfs_data_old')
+    _create_quickfs_table(cursor, 'quickfs_data')
+    cursor.execute('''
+        INSERT INTO quickfs_data (id, ticker, data_type, data_json, fetched_at)
+        SELECT id, ticker, data_type, data_json, fetched_at
+        FROM quickfs_data_old AS old
+        WHERE id = (
+            SELECT id FROM quickfs_data_old
+            WHERE ticker = old.ticker AND data_type = old.data_type
+            ORDER BY fetched_at DESC, id DESC
+            LIMIT 1
         )
     ''')
+    cursor.execute('DROP TABLE quickfs_data_old')
+    print("Migrated quickfs_data to one row per ticker and data type")
+
+def init_quickfs_db():
+    """Initialize the QuickFS database with a table to store all financial data."""
+    conn = sqlite3.connect(QUICKFS_DB, isolation_level=None)
+    configure_connection(conn)
+    cursor = conn.cursor()
+    
+    # One transaction, so a migration is never left half done (the sqlite3
+    # module would otherwise commit before each schema statement)
+    cursor.execute('BEGIN IMMEDIATE')
+    
+    # Create table to store QuickFS data
+    _migrate_quickfs_table(cursor)
+    _create_quickfs_table(cursor, 'quickfs_data')
     
     # Create index for faster lookups
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_ticker ON quickfs_data(ticker)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_type ON quickfs_data(data_type)')
     
-    conn.commit()
+    # Tickers saved by each run, so an interrupted run can be resumed
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fetch_progress (
+            ticker TEXT PRIMARY KEY,
+            run_id TEXT NOT NULL,
+            fetched_at TEXT NOT NULL
+        )
+    ''')
+    
+    cursor.execute('COMMIT')
     conn.close()
     print(f"Initialized QuickFS database: {QUICKFS_DB}")
 
@@ -105,6 +232,54 @@ def get_all_tickers():
     conn.close()
     return tickers
 
+# Tickers per query in get_last_fetched, under SQLite's default limit of 999
+# bound parameters on older versions
+SELECT_CHUNK_SIZE = 500
+
+def get_last_fetched(tickers):
+    """
+    Get when each of the given tickers' full data was last fetched, as
+    {ticker: fetched_at}. Tickers without data are left out.
+    """
+    conn = sqlite3.connect(QUICKFS_DB)
+    cursor = conn.cursor()
+    
+    last_fetched = {}
+    for start in range(0, len(tickers), SELECT_CHUNK_SIZE):
+        chunk = tickers[start:start + SELECT_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"""
+            SELECT ticker, MAX(fetched_at) FROM quickfs_data
+            WHERE data_type = 'full' AND ticker IN ({placeholders})
+            GROUP BY ticker
+        """, chunk)
+        last_fetched.update(cursor.fetchall())
+    
+    conn.close()
+    return last_fetched
+
+def get_stale_tickers(tickers, ttl_hours=None):
+    """
+    Get the tickers that have no data yet or were last fetched more than
+    ttl_hours (default CACHE_TTL_HOURS) ago, in their original order.
+    """
+    ttl_hours = CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+    # fetched_at is an ISO timestamp, so it compares correctly as a string
+    cutoff = (datetime.now() - timedelta(hours=ttl_hours)).isoformat()
+    last_fetched = get_last_fetched(list(tickers))
+    return [ticker for ticker in tickers if last_fetched.get(ticker, '') < cutoff]
+
+def get_completed_tickers(run_id):
+    """Get the set of tickers already saved by the run with the given id."""
+    conn = sqlite3.connect(QUICKFS_DB)
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT ticker FROM fetch_progress WHERE run_id = ?", (run_id,))
+    completed = {row[0] for row in cursor.fetchall()}
+    
+    conn.close()
+    return completed
+
 def format_ticker(ticker):
     """Format ticker for QuickFS API (add :US suffix for US stocks)."""
     # Assume all tickers are US stocks for now
@@ -113,97 +288,516 @@ def format_ticker(ticker):
         return f"{ticker}:US"
     return ticker
 
-def fetch_all_data_for_ticker_sdk(ticker, client):
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    
+    Allows bursts of up to `capacity` requests and `rate` requests per second
+    on average. Tokens are refilled from the time elapsed since the last
+    acquire, so no background thread is needed.
+    """
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def acquire(self):
+        """Take a token, waiting until one is available."""
+        with self.condition:
+            self._refill()
+            while self.tokens < 1:
+                self.condition.wait((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+    
+    def hold(self, seconds):
+        """Give out no tokens for the next `seconds` (e.g. after a rate limit response)."""
+        with self.condition:
+            self._refill()
+            # Tokens refill from `updated`, so moving it into the future
+            # keeps the bucket empty until then
+            self.tokens = min(self.tokens, 0)
+            self.updated = max(self.updated, time.monotonic() + seconds)
+
+class AdaptiveConcurrency:
+    """
+    Thread-safe limit on concurrent requests that adapts to rate limiting.
+    
+    Starts at `initial` requests at a time and doubles after every
+    `increase_after` requests in a row without a rate limit response, up to
+    `max_limit`; each rate limit response halves it (to at least 1).
+    """
+    
+    def __init__(self, max_limit, initial=1, increase_after=10):
+        self.max_limit = max_limit
+        self.limit = min(initial, max_limit)
+        self.increase_after = increase_after
+        self.active = 0
+        self.successes = 0
+        self.condition = threading.Condition()
+    
+    def acquire(self):
+        """Wait for a request slot under the current limit."""
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+    
+    def release(self):
+        """Give back a request slot, counting the request as not rate limited."""
+        with self.condition:
+            self.active -= 1
+            self.successes += 1
+            if self.successes >= self.increase_after:
+                self.limit = min(self.limit * 2, self.max_limit)
+                self.successes = 0
+            self.condition.notify_all()
+    
+    def record_rate_limit(self):
+        """Halve the limit after a rate limit response."""
+        with self.condition:
+            self.limit = max(1, self.limit // 2)
+            self.successes = -1  # The request's release doesn't count as a success
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for the QuickFS API.
+    
+    After `failure_threshold` failed tickers in a row the breaker opens and
+    turns requests away, so a dead API or a bad key doesn't use up the whole
+    run. Once `reset_timeout` seconds have passed it lets a single probe
+    request through (half open): an answer closes it again, a failure
+    reopens it.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold=10, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+    
+    def allow_request(self):
+        """Check if a request may be made now."""
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let this request through as the probe
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+    
+    def record_result(self, answered):
+        """Record whether a request got an answer from the API or failed."""
+        with self.lock:
+            if answered:
+                self.failures = 0
+                self.state = self.CLOSED
+            else:
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.state = self.OPEN
+                    self.opened_at = time.monotonic()
+
+class QuickFSAPIError(Exception):
+    """An unsuccessful QuickFS API response, with its HTTP status code."""
+    
+    def __init__(self, status_code, reason, headers=None):
+        super().__init__(f"{status_code} {reason}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class QuickFSClient:
+    """
+    QuickFS API client that reuses one requests.Session (and its connections)
+    for all requests, in place of the QuickFS SDK.
+    """
+    
+    def __init__(self, api_key, api_base=None, timeout=None, pool_size=None):
+        self.api_base = (api_base or QUICKFS_API_BASE).rstrip('/')
+        self.timeout = timeout or REQUEST_TIMEOUT
+        self.session = requests.Session()
+        self.session.headers.update({'X-QFS-API-Key': api_key})
+        # Keep a warm connection for every fetch thread (requests keeps 10 by
+        # default, and discards extra connections when more threads are used)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or MAX_WORKERS * 2, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def get_data_full(self, symbol):
+        """
+        Get all data for a symbol (e.g. 'AAPL:US'), like the SDK's get_data_full.
+        
+        Raises:
+            QuickFSAPIError: If the API does not return HTTP 200
+        """
+        response = self.session.get(f"{self.api_base}/data/all-data/{symbol}", timeout=self.timeout)
+        if response.status_code != 200:
+            raise QuickFSAPIError(response.status_code, response.reason, response.headers)
+        return response.json()['data']
+
+def is_transient_error(error):
+    """Check if a request error is worth retrying: a network error, a timeout, or a 5xx response."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return isinstance(error, QuickFSAPIError) and error.status_code >= 500
+
+def get_error_status(error):
+    """
+    Get the HTTP status code of a failed request, or None if there was no
+    response.
+    
+    QuickFS responses carry it as QuickFSAPIError.status_code. Errors from
+    other clients are matched on their message as a fallback, but requests'
+    own errors never are, since a port or byte count in the text could look
+    like a status code.
+    """
+    if isinstance(error, QuickFSAPIError):
+        return error.status_code
+    if isinstance(error, requests.exceptions.RequestException):
+        response = error.response
+        return response.status_code if response is not None else None
+    error_msg = str(error).lower()
+    if 'not found' in error_msg or '404' in error_msg:
+        return 404
+    if 'rate limit' in error_msg or '429' in error_msg:
+        return 429
+    if '401' in error_msg or 'unauthorized' in error_msg:
+        return 401
+    return None
+
+def _with_retry(fn, max_retries=None, base=None):
+    """
+    Call fn(), retrying transient errors with exponential backoff and full
+    jitter: before retry n (from 0), sleep a random time up to base * 2**n.
+    Other errors, and the last transient one, are raised.
+    """
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    base = RETRY_BASE_DELAY if base is None else base
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not is_transient_error(e):
+                raise
+            time.sleep(random.uniform(0, base * 2 ** attempt))
+
+def get_retry_delay(error):
     """
-    Fetch all data for a ticker using QuickFS SDK's get_data_full method.
+    Get the seconds to wait before retrying a rate-limited request: the
+    response's Retry-After header (seconds or an HTTP date) if it has one,
+    otherwise RETRY_DELAY.
+    """
+    headers = getattr(error, 'headers', None) or {}
+    retry_after = headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return RETRY_DELAY
+
+def fetch_all_data_for_ticker_sdk(ticker, client, bucket=None, breaker=None, concurrency=None):
+    """
+    Fetch all data for a ticker using the client's get_data_full method.
     
     Args:
         ticker: Stock ticker symbol
-        client: QuickFS client instance
+        client: QuickFSClient instance
+        bucket: TokenBucket shared by all threads; on a rate limit it is held
+            for the retry delay, so the other threads wait too
+        breaker: CircuitBreaker shared by all threads, told whether the API
+            answered (data or not found) or failed
+        concurrency: AdaptiveConcurrency shared by all threads, told about
+            rate limits
     
     Returns:
         Dictionary with all financial data, or None if error
     """
     formatted_ticker = format_ticker(ticker)
     
+    def get_data():
+        return client.get_data_full(symbol=formatted_ticker)
+    
+    def record(answered):
+        if breaker is not None:
+            breaker.record_result(answered)
+    
     try:
-        full_data = client.get_data_full(symbol=formatted_ticker)
+        full_data = _with_retry(get_data)
+        record(True)
         return full_data
     except Exception as e:
-        error_msg = str(e).lower()
-        if 'not found' in error_msg or '404' in error_msg:
+        status_code = get_error_status(e)
+        if status_code == 404:
             # Ticker not found - this is okay
+            record(True)
             return None
-        elif 'rate limit' in error_msg or '429' in error_msg:
-            print(f"  Rate limit hit for {ticker}. Waiting {RETRY_DELAY} seconds...")
-            time.sleep(RETRY_DELAY)
+        elif status_code == 429:
+            retry_delay = get_retry_delay(e)
+            if concurrency is not None:
+                concurrency.record_rate_limit()
+            logger.warning(f"  Rate limit hit for {ticker}. Waiting {retry_delay:g} seconds...")
+            if bucket is not None:
+                bucket.hold(retry_delay)
+                bucket.acquire()
+            else:
+                time.sleep(retry_delay)
             # Retry once
             try:
-                full_data = client.get_data_full(symbol=formatted_ticker)
+                full_data = _with_retry(get_data)
+                record(True)
                 return full_data
             except Exception as retry_e:
-                print(f"  Retry failed for {ticker}: {str(retry_e)}")
+                logger.warning(f"  Retry failed for {ticker}: {str(retry_e)}")
+                record(False)
                 return None
-        elif '401' in error_msg or 'unauthorized' in error_msg:
-            print(f"  Authentication error - check API key")
+        elif status_code == 401:
+            logger.warning(f"  Authentication error - check API key")
+            record(False)
             return None
         else:
-            print(f"  Error fetching data for {ticker}: {str(e)}")
+            logger.warning(f"  Error fetching data for {ticker}: {str(e)}")
+            record(False)
             return None
 
-def save_quickfs_data(ticker, data):
-    """Save QuickFS full data to the database (thread-safe)."""
-    conn = sqlite3.connect(QUICKFS_DB, timeout=30.0)  # Increase timeout for concurrent access
-    cursor = conn.cursor()
+def encode_quickfs_data(data):
+    """
+    Serialize QuickFS data for the data_json column: compact JSON, zlib
+    compressed. Readers decompress values stored as bytes and parse text
+    values (saved before compression) as they are.
+    """
+    if HAS_ORJSON:
+        # Compact UTF-8 JSON as bytes, without a str round trip
+        data_json = orjson.dumps(data)
+    else:
+        data_json = json.dumps(data, separators=(',', ':')).encode()
+    return zlib.compress(data_json, DATA_COMPRESSION_LEVEL)
+
+# Fetches in progress, by formatted ticker, for coalesce_fetch
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def coalesce_fetch(ticker, fetch):
+    """
+    Call fetch() for a ticker, unless another thread is already fetching
+    the same ticker; then wait for that fetch and share its result.
+    
+    Returns:
+        Tuple of (result, fetched_here); fetched_here is False for a shared result
+    """
+    key = format_ticker(ticker)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        fetched_here = future is None
+        if fetched_here:
+            future = _inflight[key] = Future()
+    
+    if not fetched_here:
+        return future.result(), False
     
     try:
-        data_json = json.dumps(data)
-        fetched_at = datetime.now().isoformat()
-        
-        # Store all data under 'full' data_type
-        cursor.execute('''
-            INSERT OR REPLACE INTO quickfs_data (ticker, data_type, data_json, fetched_at)
-            VALUES (?, ?, ?, ?)
-        ''', (ticker, 'full', data_json, fetched_at))
-        
-        conn.commit()
-        
+        result = fetch()
+        future.set_result(result)
+        return result, True
     except Exception as e:
-        print(f"  Error saving data for {ticker}: {str(e)}")
-        conn.rollback()
+        future.set_exception(e)
+        raise
     finally:
-        conn.close()
+        with _inflight_lock:
+            del _inflight[key]
 
-def process_ticker(ticker, client, thread_id, delay):
+def save_quickfs_rows(rows, run_id=None):
+    """
+    Save (ticker, data_json, fetched_at) rows to the database in a single
+    transaction (thread-safe). data_json is from encode_quickfs_data.
+    
+    With a run_id, the tickers are also marked as done for that run in
+    fetch_progress, in the same transaction.
+    
+    Rows arrive already serialized and everything else is prepared before
+    taking _write_lock, so the lock is only held for the writes themselves.
+    
+    Returns True if the rows were saved, False if the batch was rolled back.
+    """
+    progress_rows = [(ticker, run_id, fetched_at) for ticker, _, fetched_at in rows] if run_id is not None else []
+    error = None
+    
+    with _write_lock:
+        conn = get_write_connection()
+        
+        try:
+            # IMMEDIATE takes the write lock up front (waiting out busy_timeout
+            # if needed) instead of upgrading a read lock partway through
+            conn.execute('BEGIN IMMEDIATE')
+            
+            # Store all data under 'full' data_type
+            conn.executemany('''
+                INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+                VALUES (?, 'full', ?, ?)
+                ON CONFLICT(ticker, data_type) DO UPDATE SET
+                    data_json = excluded.data_json,
+                    fetched_at = excluded.fetched_at
+            ''', rows)
+            if progress_rows:
+                conn.executemany('''
+                    INSERT INTO fetch_progress (ticker, run_id, fetched_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(ticker) DO UPDATE SET
+                        run_id = excluded.run_id,
+                        fetched_at = excluded.fetched_at
+                ''', progress_rows)
+            
+            conn.execute('COMMIT')
+            
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            error = e
+    
+    if error is not None:
+        tickers = ', '.join(row[0] for row in rows)
+        logger.warning(f"  Error saving data for {tickers}: {str(error)}")
+        return False
+    return True
+
+def save_quickfs_data(ticker, data):
+    """Save QuickFS full data to the database (thread-safe)."""
+    # Serialize before save_quickfs_rows takes the write lock
+    row = (ticker, encode_quickfs_data(data), datetime.now().isoformat())
+    save_quickfs_rows([row])
+
+def write_quickfs_rows(write_queue, run_id=None, failed=None):
+    """
+    Writer thread: save rows from write_queue in batches until it gets None.
+    
+    Each batch is one transaction, so a run commits once per batch instead of
+    once per ticker. Saved tickers are marked as done for run_id; tickers in
+    a batch that failed to save are added to the failed set, if given.
+    """
+    def save(batch):
+        if not save_quickfs_rows(batch, run_id) and failed is not None:
+            failed.update(row[0] for row in batch)
+    
+    batch = []
+    while True:
+        try:
+            row = write_queue.get(timeout=WRITE_FLUSH_SECONDS)
+        except queue.Empty:
+            # Nothing new - save what we have so far
+            if batch:
+                save(batch)
+                batch = []
+            continue
+        
+        if row is None:
+            break
+        batch.append(row)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            save(batch)
+            batch = []
+    
+    if batch:
+        save(batch)
+
+def start_progress_log():
+    """
+    Print this module's log messages from a background thread until the
+    returned QueueListener is passed to stop_progress_log.
+    """
+    log_queue = queue.Queue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = QueueListener(log_queue, handler)
+    
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+def stop_progress_log(listener):
+    """Print the remaining queued log messages and detach the queue from the logger."""
+    listener.stop()
+    for handler in list(logger.handlers):
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            logger.removeHandler(handler)
+    logger.propagate = True
+
+def process_ticker(ticker, client, write_queue=None, bucket=None, breaker=None, concurrency=None):
     """
     Process a single ticker (worker function for threading).
     
     Args:
         ticker: Stock ticker symbol
-        client: QuickFS client instance (should be thread-safe)
-        thread_id: Thread identifier for staggering delays
-        delay: Delay before making the request (for rate limiting)
+        client: QuickFSClient instance (shared by all threads)
+        write_queue: Queue for the write_quickfs_rows thread; if None, the
+            data is saved directly
+        bucket: TokenBucket shared by all threads, taken from before the request
+        breaker: CircuitBreaker shared by all threads; while it is open the
+            ticker is skipped without a request
+        concurrency: AdaptiveConcurrency shared by all threads, holding a
+            slot for the duration of the request
     
     Returns:
         Tuple of (ticker, success, error_message)
     """
-    # Stagger requests across threads
-    if delay > 0:
-        time.sleep(delay)
+    def fetch():
+        if concurrency is None:
+            if bucket is not None:
+                bucket.acquire()
+            return fetch_all_data_for_ticker_sdk(ticker, client, bucket, breaker)
+        
+        concurrency.acquire()
+        try:
+            if bucket is not None:
+                bucket.acquire()
+            return fetch_all_data_for_ticker_sdk(ticker, client, bucket, breaker, concurrency)
+        finally:
+            concurrency.release()
     
     try:
-        full_data = fetch_all_data_for_ticker_sdk(ticker, client)
+        if breaker is not None and not breaker.allow_request():
+            return (ticker, False, "Skipped - QuickFS API circuit breaker is open")
+        
+        # A ticker listed twice is only requested (and saved) once at a time
+        full_data, fetched_here = coalesce_fetch(ticker, fetch)
         
         if full_data:
-            save_quickfs_data(ticker, full_data)
+            if fetched_here and write_queue is None:
+                save_quickfs_data(ticker, full_data)
+            elif fetched_here:
+                write_queue.put((ticker, encode_quickfs_data(full_data), datetime.now().isoformat()))
             return (ticker, True, None)
         else:
             return (ticker, False, "No data found")
     except Exception as e:
         return (ticker, False, str(e))
 
-def main():
-    """Main function to fetch QuickFS data for all tickers."""
+def main(run_id=None):
+    """
+    Main function to fetch QuickFS data for all tickers.
+    
+    Tickers already saved by the run with the given id (default: today's
+    date) are skipped, so rerunning after an interruption resumes the run.
+    """
+    run_id = run_id or datetime.now().strftime('%Y-%m-%d')
     print("=" * 80)
     print("QuickFS Data Fetcher")
     print("=" * 80)
@@ -226,12 +820,29 @@ def main():
         return
     
     print(f"Found {len(tickers)} unique tickers")
+    
+    # Skip tickers that were fetched recently
+    stale_tickers = get_stale_tickers(tickers)
+    if len(stale_tickers) < len(tickers):
+        print(f"Skipping {len(tickers) - len(stale_tickers)} tickers fetched in the last {CACHE_TTL_HOURS} hours")
+    tickers = stale_tickers
+    
+    # Skip tickers this run has already saved
+    completed = get_completed_tickers(run_id)
+    remaining = [ticker for ticker in tickers if ticker not in completed]
+    if len(remaining) < len(tickers):
+        print(f"Resuming run {run_id}: skipping {len(tickers) - len(remaining)} tickers already fetched")
+    tickers = remaining
+    if not tickers:
+        print("All tickers are up to date")
+        return
+    
     print(f"Tickers: {', '.join(tickers[:10])}{'...' if len(tickers) > 10 else ''}")
     print()
     
     # Initialize QuickFS client
     print("Initializing QuickFS client...")
-    client = QuickFS(QUICKFS_API_KEY)
+    client = QuickFSClient(QUICKFS_API_KEY)
     
     # Ask for confirmation
     estimated_time = (len(tickers) * REQUEST_DELAY) / (MAX_WORKERS * 60)  # minutes with multithreading
@@ -249,59 +860,86 @@ def main():
     print("Starting data fetch with multithreading...")
     print("-" * 80)
     
-    # Thread-safe counters
+    # Counters (only updated by this thread, as results complete)
     success_count = 0
     error_count = 0
     completed_count = 0
-    lock = threading.Lock()
-    
-    # Stagger delays per thread to avoid simultaneous requests
-    thread_delays = [i * REQUEST_DELAY / MAX_WORKERS for i in range(MAX_WORKERS)]
-    
-    # Process tickers using ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all tasks with staggered delays
-        futures = {}
-        for idx, ticker in enumerate(tickers):
-            thread_id = idx % MAX_WORKERS
-            thread_delay = thread_delays[thread_id]
-            future = executor.submit(process_ticker, ticker, client, thread_id, thread_delay)
-            futures[future] = ticker
-        
-        # Process results as they complete
-        for future in as_completed(futures):
-            ticker = futures[future]
+    
+    progress_log = start_progress_log()
+    
+    # Pace requests across all threads: each worker gets one request per
+    # REQUEST_DELAY on average, with bursts of up to MAX_WORKERS requests
+    bucket = TokenBucket(MAX_WORKERS / REQUEST_DELAY, MAX_WORKERS) if REQUEST_DELAY > 0 else None
+    
+    # Stop requesting while the API keeps failing
+    breaker = CircuitBreaker()
+    
+    # Start with one request at a time and ramp up to MAX_WORKERS while the
+    # API doesn't rate limit us
+    concurrency = AdaptiveConcurrency(MAX_WORKERS)
+    
+    # Save fetched data from a single writer thread, which collects the
+    # tickers it fails to save
+    write_queue = queue.Queue()
+    failed_saves = set()
+    writer = threading.Thread(target=write_quickfs_rows, args=(write_queue, run_id, failed_saves))
+    writer.start()
+    
+    try:
+        # Process tickers using ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Submit all tasks (the token bucket paces the requests)
+            futures = {}
+            for ticker in tickers:
+                future = executor.submit(process_ticker, ticker, client, write_queue, bucket, breaker, concurrency)
+                futures[future] = ticker
             
-            try:
-                result_ticker, success, error_msg = future.result()
+            # Process results as they complete
+            for future in as_completed(futures):
+                ticker = futures[future]
                 
-                with lock:
+                try:
+                    result_ticker, success, error_msg = future.result()
+                    
                     completed_count += 1
                     if success:
                         success_count += 1
-                        print(f"[{completed_count}/{len(tickers)}] {ticker}: ✓ Success")
+                        logger.info(f"[{completed_count}/{len(tickers)}] {ticker}: ✓ Fetched")
                     else:
                         error_count += 1
-                        print(f"[{completed_count}/{len(tickers)}] {ticker}: ✗ {error_msg}")
-                
-                # Progress update every 10 tickers
-                if completed_count % 10 == 0:
-                    print(f"  Progress: {completed_count}/{len(tickers)} ({success_count} successful, {error_count} errors)")
+                        logger.info(f"[{completed_count}/{len(tickers)}] {ticker}: ✗ {error_msg}")
                     
-            except Exception as e:
-                with lock:
+                    # Progress update every 10 tickers
+                    if completed_count % 10 == 0:
+                        logger.info(f"  Progress: {completed_count}/{len(tickers)} ({success_count} fetched, {error_count} errors)")
+                        
+                except Exception as e:
                     completed_count += 1
                     error_count += 1
-                    print(f"[{completed_count}/{len(tickers)}] {ticker}: ✗ Exception: {str(e)}")
+                    logger.info(f"[{completed_count}/{len(tickers)}] {ticker}: ✗ Exception: {str(e)}")
+    finally:
+        # Flush the remaining rows, even if the run was interrupted, so the
+        # writer thread exits
+        write_queue.put(None)
+        writer.join()
+        with _write_lock:
+            close_write_connection()
+        stop_progress_log(progress_log)
+    
+    # Fetched tickers whose batch failed to save count as errors
+    success_count -= len(failed_saves)
+    error_count += len(failed_saves)
     
     print()
     print("=" * 80)
     print("Data fetch complete!")
-    print(f"Successfully fetched: {success_count} tickers")
+    print(f"Successfully saved: {success_count} tickers")
+    if failed_saves:
+        print(f"Failed to save: {', '.join(sorted(failed_saves))}")
     print(f"Errors: {error_count} tickers")
     print(f"Database: {QUICKFS_DB}")
     print("=" * 80)
 
 if __name__ == '__main__':
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
 
@@ -6,37 +6,187 @@ Calculate 5-year revenue growth rate for a ticker from QuickFS data.
 import sqlite3
 import json
 import os
-from datetime import datetime
-import statistics
+import atexit
+import sys
+import math
+import zlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from urllib.request import pathname2url
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 # Database path
 QUICKFS_DB = os.path.join(os.path.dirname(__file__), "data.db")
 
+# Read-only connection shared by get_ticker_data calls, reopened when
+# QUICKFS_DB points at a different file
+READ_PRAGMAS = (
+    "PRAGMA query_only=1",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+_read_conn = None
+_read_conn_key = None
+_read_lock = threading.Lock()
+
+def get_read_connection():
+    """
+    Get the shared read-only connection to QUICKFS_DB, opening it if needed.
+    
+    The connection is keyed by the path, inode and change time of the file,
+    so it is reopened if the path changes or the database file is replaced,
+    and by process id, so forked workers never share their parent's.
+    """
+    global _read_conn, _read_conn_key
+    stat = os.stat(QUICKFS_DB)
+    key = (QUICKFS_DB, stat.st_dev, stat.st_ino, stat.st_ctime_ns, os.getpid())
+    if _read_conn is None or _read_conn_key != key:
+        close_read_connection()
+        _read_conn = sqlite3.connect(f"file:{pathname2url(QUICKFS_DB)}?mode=ro", uri=True,
+                                     check_same_thread=False)
+        for pragma in READ_PRAGMAS:
+            _read_conn.execute(pragma)
+        _read_conn_key = key
+    return _read_conn
+
+def close_read_connection():
+    """Close the shared read-only connection, if it is open."""
+    global _read_conn, _read_conn_key
+    if _read_conn is not None:
+        _read_conn.close()
+        _read_conn = None
+        _read_conn_key = None
+    # A new connection's data_version says nothing about the cached data
+    _ticker_cache.clear()
+
+atexit.register(close_read_connection)
+
+def _loads(data_json):
+    """Parse a data_json value, with orjson when it is installed."""
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(data_json)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity and integers beyond 64 bits,
+            # which the standard library accepts
+            pass
+    return json.loads(data_json)
+
 def get_ticker_data(ticker):
     """Get QuickFS data for a ticker from the database."""
     if not os.path.exists(QUICKFS_DB):
         print(f"Error: Database not found at {QUICKFS_DB}")
         return None
     
-    conn = sqlite3.connect(QUICKFS_DB)
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('''
+    with _read_lock:
+        row = get_read_connection().execute('''
             SELECT data_json FROM quickfs_data 
             WHERE ticker = ? AND data_type = 'full'
             ORDER BY fetched_at DESC
             LIMIT 1
-        ''', (ticker.upper(),))
+        ''', (ticker.upper(),)).fetchone()
+    
+    if row:
+        data_json = row[0]
+        if isinstance(data_json, bytes):
+            # Saved zlib-compressed by get_data.py
+            data_json = zlib.decompress(data_json)
+        return _loads(data_json)
+    else:
+        return None
+
+# Data of the tickers most recently loaded by get_cached_ticker_data, keyed
+# by upper-cased ticker. The cache is emptied whenever the read connection's
+# data_version changes, i.e. another connection has written to the database.
+TICKER_CACHE_SIZE = 32
+_ticker_cache = OrderedDict()
+_ticker_cache_conn = None
+_ticker_cache_version = None
+
+def get_cached_ticker_data(ticker):
+    """
+    Get QuickFS data for a ticker like get_ticker_data, reusing the data of
+    recently requested tickers while the database is unchanged.
+    
+    The data is shared between calls, so callers must not modify it.
+    """
+    global _ticker_cache_conn, _ticker_cache_version
+    if not os.path.exists(QUICKFS_DB):
+        return get_ticker_data(ticker)
+    
+    key = ticker.upper()
+    with _read_lock:
+        conn = get_read_connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if conn is not _ticker_cache_conn or version != _ticker_cache_version:
+            _ticker_cache.clear()
+            _ticker_cache_conn, _ticker_cache_version = conn, version
+        data = _ticker_cache.get(key)
+        if data is not None:
+            _ticker_cache.move_to_end(key)
+            return data
+    
+    data = get_ticker_data(ticker)
+    if data is not None:
+        with _read_lock:
+            _ticker_cache[key] = data
+            if len(_ticker_cache) > TICKER_CACHE_SIZE:
+                _ticker_cache.popitem(last=False)
+    return data
+
+# Tickers looked up per query by iter_ticker_data, well under SQLite's
+# bound-parameter limit
+TICKER_CHUNK_SIZE = 500
+
+def iter_ticker_data(tickers):
+    """
+    Get QuickFS data for many tickers, yielding (ticker, data) in the order
+    of tickers, with data None for tickers that have none.
+    
+    Tickers are looked up in chunks of TICKER_CHUNK_SIZE per query, and each
+    chunk's rows are parsed one at a time as they are yielded.
+    """
+    tickers = list(tickers)
+    if not os.path.exists(QUICKFS_DB):
+        print(f"Error: Database not found at {QUICKFS_DB}")
+        for ticker in tickers:
+            yield ticker, None
+        return
+    
+    for start in range(0, len(tickers), TICKER_CHUNK_SIZE):
+        chunk = tickers[start:start + TICKER_CHUNK_SIZE]
+        keys = list({ticker.upper(): None for ticker in chunk})
+        placeholders = ', '.join('?' * len(keys))
+        # With MAX(), SQLite takes the bare data_json column from the
+        # latest row of each group
+        with _read_lock:
+            rows = get_read_connection().execute(f'''
+                SELECT ticker, data_json, MAX(fetched_at) FROM quickfs_data
+                WHERE data_type = 'full' AND ticker IN ({placeholders})
+                GROUP BY ticker
+            ''', keys).fetchall()
+        blobs = {ticker: data_json for ticker, data_json, _ in rows}
         
-        row = cursor.fetchone()
-        if row:
-            data_json = row[0]
-            return json.loads(data_json)
-        else:
-            return None
-    finally:
-        conn.close()
+        for ticker in chunk:
+            data_json = blobs.get(ticker.upper())
+            if data_json is None:
+                yield ticker, None
+                continue
+            if isinstance(data_json, bytes):
+                # Saved zlib-compressed by get_data.py
+                data_json = zlib.decompress(data_json)
+            yield ticker, _loads(data_json)
 
 def get_previous_quarter(year, month):
     """Get the previous quarter's year and month.
@@ -52,7 +202,200 @@ def get_previous_quarter(year, month):
         # Otherwise, just subtract 3 months
         return year, month - 3
 
-def get_consecutive_quarters(quarterly_data, field_name, min_quarters_required):
+def _ym(date):
+    """Parse the year and month of a 'YYYY-MM' (or 'YYYY-MM-DD') date by position."""
+    return int(date[0:4]), int(date[5:7])
+
+def _month_key(date):
+    """Encode a 'YYYY-MM' date as a month count (year * 12 + month)."""
+    year, month = _ym(date)
+    return year * 12 + month
+
+# Consecutive-quarter runs (see _memoize) of recently seen quarterly data,
+# keyed by id(quarterly_data). Each entry holds a reference to its
+# quarterly_data so the id cannot be reused while cached, and each result
+# remembers the lists it was computed from. Ticker data is treated as
+# read-only once loaded.
+_CONSECUTIVE_CACHE_SIZE = 8
+_consecutive_cache = OrderedDict()
+_consecutive_cache_lock = threading.Lock()
+
+def _find_consecutive_quarters(values, dates):
+    """Longest run of consecutive quarters, most recent first."""
+    # Filter out None values and get valid data
+    valid_data = [(date, val) for date, val in zip(dates, values) 
+                  if date is not None and val is not None]
+    
+    if len(valid_data) == 0:
+        return []
+    
+    # Sort by date (most recent first). QuickFS lists dates in order, and
+    # Timsort handles an already-ordered list in one linear pass, so no
+    # sortedness check is needed up front; itemgetter avoids a Python-level
+    # key call per quarter.
+    valid_data.sort(key=itemgetter(0), reverse=True)
+    
+    # Find consecutive quarters starting from the most recent
+    return valid_data[:_consecutive_cutoff(valid_data)]
+
+def _consecutive_cutoff(rows):
+    """
+    Length of the leading run of (date, ...) rows that are one quarter apart.
+    
+    With dates encoded as month counts the previous quarter is always
+    key - 3 (same as get_previous_quarter). Dates are parsed lazily, so
+    nothing past the first gap is parsed.
+    """
+    if not rows:
+        return 0
+    
+    expected_key = _month_key(rows[0][0]) - 3
+    for i in range(1, len(rows)):
+        if _month_key(rows[i][0]) != expected_key:
+            # Gap detected - stop here
+            return i
+        expected_key -= 3
+    return len(rows)
+
+def _memoize(quarterly_data, key, field_name, compute, depends_on=()):
+    """
+    Return compute(values, dates) for a field of quarterly_data, memoized
+    under key. The result is recomputed if the field or date list, or the
+    list of any field named in depends_on, is replaced.
+    """
+    values = quarterly_data[field_name]
+    dates = quarterly_data['period_end_date']
+    others = tuple(quarterly_data[name] for name in depends_on)
+    
+    with _consecutive_cache_lock:
+        entry = _consecutive_cache.get(id(quarterly_data))
+        if entry is None or entry[0] is not quarterly_data:
+            entry = (quarterly_data, {})
+            _consecutive_cache[id(quarterly_data)] = entry
+            if len(_consecutive_cache) > _CONSECUTIVE_CACHE_SIZE:
+                _consecutive_cache.popitem(last=False)
+        else:
+            _consecutive_cache.move_to_end(id(quarterly_data))
+        results = entry[1]
+        cached = results.get(key)
+    
+    if (cached is not None and cached[0] is values and cached[1] is dates
+            and all(old is new for old, new in zip(cached[3], others))):
+        return cached[2]
+    
+    result = compute(values, dates)
+    results[key] = (values, dates, result, others)
+    return result
+
+def get_cached_consecutive_quarters(quarterly_data, field_name, positive_only=False):
+    """
+    Get the full run of consecutive quarters for a field, computed once per
+    quarterly_data and field and shared by every calculator.
+    
+    With positive_only, quarters whose value is not positive are dropped from
+    the run afterwards (they still count towards it being consecutive).
+    
+    Returns:
+        List of tuples (date, value), most recent first (empty if there is no
+        valid data). The list is shared, so callers must not modify it.
+    """
+    if field_name not in quarterly_data or 'period_end_date' not in quarterly_data:
+        return []
+    
+    if positive_only:
+        return _memoize(quarterly_data, (field_name, 'positive'), field_name,
+                        lambda values, dates: [
+                            (date, val) for date, val
+                            in get_cached_consecutive_quarters(quarterly_data, field_name)
+                            if val > 0])
+    
+    return _memoize(quarterly_data, field_name, field_name, _find_consecutive_quarters)
+
+@dataclass(slots=True)
+class QuarterlyBundle:
+    """The parts of a ticker's data shared by the revenue calculators."""
+    quarterly: dict
+    revenue: list  # consecutive quarters of positive revenue, most recent first (shared)
+    revenue_20: list  # the most recent 20 of them (shared)
+
+# Field names that may hold a series, in order of preference
+SHARES_FIELDS = ('shares_eop', 'shares_diluted', 'shares_basic', 'shares')
+PPE_FIELDS = ('ppe_net', 'ppe', 'property_plant_equipment', 'net_ppe', 'fixed_assets')
+
+def _resolve_field(quarterly_data, candidates):
+    """Return the first of the candidate field names in quarterly_data, or None."""
+    for field_name in candidates:
+        if field_name in quarterly_data:
+            return field_name
+    return None
+
+def _quarterly(ticker_data, *required):
+    """
+    Return ticker_data['financials']['quarterly'], or None if it is missing
+    or lacks any of the required fields.
+    """
+    if not ticker_data:
+        return None
+    quarterly_data = ticker_data.get('financials', {}).get('quarterly')
+    if quarterly_data is None or not all(field in quarterly_data for field in required):
+        return None
+    return quarterly_data
+
+def prepare_quarterly_bundle(ticker_data):
+    """
+    Validate ticker_data and gather the quarterly series the calculators share.
+    
+    The bundle is memoized alongside the consecutive-quarter runs, so every
+    calculator given the same data shares one bundle and one 20-quarter slice.
+    
+    Returns:
+        QuarterlyBundle, or None if there is no quarterly data
+    """
+    quarterly_data = _quarterly(ticker_data)
+    if quarterly_data is None:
+        return None
+    
+    if 'revenue' not in quarterly_data or 'period_end_date' not in quarterly_data:
+        return QuarterlyBundle(quarterly_data, [], [])
+    
+    def build(values, dates):
+        revenue = get_cached_consecutive_quarters(quarterly_data, 'revenue', positive_only=True)
+        return QuarterlyBundle(quarterly_data, revenue, revenue[:20])
+    
+    return _memoize(quarterly_data, 'bundle', 'revenue', build)
+
+def _mean_stdev(values):
+    """
+    Mean and sample standard deviation of a short list of floats.
+    
+    Two passes with math.fsum instead of the exact Fraction arithmetic of
+    statistics.mean/stdev; the results agree to within a unit or so in the
+    last place, at a small fraction of the cost.
+    """
+    n = len(values)
+    mean = math.fsum(values) / n
+    deviations = [value - mean for value in values]
+    # Subtracting the squared residual sum compensates for rounding in mean
+    ss = math.fsum([d * d for d in deviations]) - math.fsum(deviations) ** 2 / n
+    return mean, math.sqrt(max(ss, 0.0) / (n - 1))
+
+# Sizes of the 5 groups of 4 quarters the margin consistency metrics use
+GROUPS_OF_4 = (4, 4, 4, 4, 4)
+
+def _partition_sum(values, sizes):
+    """
+    Sums of consecutive runs of values with the given sizes, in one pass
+    (like numpy.add.reduceat). Each run is added in order, so the sums match
+    sum() over the equivalent slices exactly.
+    """
+    values = iter(values)
+    return [sum(islice(values, size)) for size in sizes]
+
+def _columns(rows):
+    """Transpose (date, value, ...) rows into parallel column tuples."""
+    return tuple(zip(*rows))
+
+def get_consecutive_quarters(quarterly_data, field_name, min_quarters_required, positive_only=False):
     """
     Get consecutive quarters of data for a given field, starting from the most recent.
     
@@ -60,55 +403,115 @@ def get_consecutive_quarters(quarterly_data, field_name, min_quarters_required):
         quarterly_data: Dictionary containing quarterly financial data
         field_name: Name of the field to extract (e.g., 'revenue', 'operating_income')
         min_quarters_required: Minimum number of consecutive quarters needed
+        positive_only: Keep only quarters with a positive value (the minimum
+            applies after filtering)
     
     Returns:
         List of tuples (date, value) in reverse chronological order (most recent first),
         or None if insufficient consecutive data.
     """
-    if field_name not in quarterly_data or 'period_end_date' not in quarterly_data:
+    consecutive_quarters = get_cached_consecutive_quarters(quarterly_data, field_name, positive_only)
+    
+    # Check if we have enough consecutive quarters
+    if not consecutive_quarters or len(consecutive_quarters) < min_quarters_required:
         return None
     
-    values = quarterly_data[field_name]
-    dates = quarterly_data['period_end_date']
+    return consecutive_quarters
+
+def get_consecutive_quarters_multi(quarterly_data, field_names, min_quarters_required):
+    """
+    Get the quarters shared by the consecutive runs of several fields.
     
-    # Filter out None values and get valid data
-    valid_data = [(date, val) for date, val in zip(dates, values) 
-                  if date is not None and val is not None]
+    Each field must have at least min_quarters_required consecutive quarters
+    of its own, as with get_consecutive_quarters. Every run steps back exactly
+    one quarter at a time, so the shared quarters are lined up by offset
+    instead of matching dates.
     
-    if len(valid_data) == 0:
-        return None
+    Args:
+        quarterly_data: Dictionary containing quarterly financial data
+        field_names: Names of the fields to join (e.g., ['revenue', 'operating_income'])
+        min_quarters_required: Minimum number of consecutive quarters needed per field
+    
+    Returns:
+        List of tuples (date, value1, value2, ...) in reverse chronological order
+        (most recent first), or None if any field has insufficient consecutive data.
+    """
+    runs = []
+    for field_name in field_names:
+        run = get_consecutive_quarters(quarterly_data, field_name, min_quarters_required)
+        if run is None:
+            return None
+        runs.append(run)
+    
+    # The shared quarters start at the oldest of the runs' most recent quarters
+    start_keys = [_month_key(run[0][0]) for run in runs]
+    start_key = min(start_keys)
+    if any((key - start_key) % 3 for key in start_keys):
+        # Runs on different quarter-end months never share a date
+        return []
+    
+    offsets = [(key - start_key) // 3 for key in start_keys]
+    length = min(len(run) - offset for run, offset in zip(runs, offsets))
+    if length <= 0:
+        return []
+    
+    columns = [run[offset:offset + length] for run, offset in zip(runs, offsets)]
+    return [(rows[0][0],) + tuple(value for _, value in rows) for rows in zip(*columns)]
+
+@dataclass(slots=True)
+class MarginFrame:
+    """The 20 quarters a margin calculator works on, oldest first."""
+    rows: list  # (date, revenue, value) tuples, oldest first (shared)
+    revenues: tuple
+    values: tuple
+
+def get_margin_frame(quarterly_data, field_name):
+    """
+    Get the most recent 20 quarters where revenue and field_name both have
+    consecutive data and revenue is positive, oldest first, as rows and as
+    revenue and value columns.
     
-    # Sort by date (most recent first)
-    valid_data.sort(key=lambda x: x[0], reverse=True)
+    Computed once per quarterly_data and field, and shared by the growth and
+    consistency calculators of that margin.
     
-    # Find consecutive quarters starting from the most recent
-    consecutive_quarters = []
+    Returns:
+        MarginFrame, or None if there are fewer than 20 such quarters
+    """
+    if ('revenue' not in quarterly_data or field_name not in quarterly_data
+            or 'period_end_date' not in quarterly_data):
+        return None
     
-    for i, (date, val) in enumerate(valid_data):
-        if i == 0:
-            consecutive_quarters.append((date, val))
-            continue
-        
-        # Parse dates
-        year1, month1 = map(int, date.split('-'))
-        prev_date = consecutive_quarters[-1][0]
-        year2, month2 = map(int, prev_date.split('-'))
+    def build(values, dates):
+        # Get the quarters where revenue and the field both have consecutive
+        # data (requires 20 of each)
+        joined = get_consecutive_quarters_multi(quarterly_data, ['revenue', field_name], 20)
+        if joined is None:
+            return None
         
-        # Calculate expected previous quarter
-        expected_year, expected_month = get_previous_quarter(year2, month2)
+        # Filter to only positive revenue values
+        valid_data = [(date, rev, value) for date, rev, value in joined if rev > 0]
+        if len(valid_data) < 20:
+            return None
         
-        # Check if this quarter is exactly one quarter before the previous one
-        if year1 == expected_year and month1 == expected_month:
-            consecutive_quarters.append((date, val))
-        else:
-            # Gap detected - stop here
-            break
-    
-    # Check if we have enough consecutive quarters
-    if len(consecutive_quarters) < min_quarters_required:
+        # Take the most recent 20 quarters, oldest first in a single reversed
+        # slice, so quarter 1 = oldest and quarter 20 = newest
+        rows = valid_data[19::-1]
+        _, revenues, field_values = _columns(rows)
+        return MarginFrame(rows, revenues, field_values)
+    
+    return _memoize(quarterly_data, ('margin', field_name), field_name, build,
+                    depends_on=('revenue',))
+
+def _value_at(run, date):
+    """
+    Value of a consecutive-quarter run (most recent first) at date, or None
+    if the run does not include it. The run steps back one quarter at a
+    time, so the quarter is found by its position instead of a date lookup.
+    """
+    offset, remainder = divmod(_month_key(run[0][0]) - _month_key(date), 3)
+    if remainder or not 0 <= offset < len(run) or run[offset][0] != date:
         return None
-    
-    return consecutive_quarters
+    return run[offset][1]
 
 def calculate_5y_revenue_growth(ticker_data):
     """
@@ -127,74 +530,37 @@ def calculate_5y_revenue_growth(ticker_data):
         Tuple of (growth_rate, current_revenue_sum, old_revenue_sum, current_periods, old_periods, years_diff)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
-        return None
-    
-    financials = ticker_data['financials']
-    
-    # Use quarterly data for 5-year calculation
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
-    # Get consecutive quarters (requires 20 to find 4 quarters from 5 years ago)
-    consecutive_quarters = get_consecutive_quarters(quarterly_data, 'revenue', 20)
-    if consecutive_quarters is None:
+    bundle = prepare_quarterly_bundle(ticker_data)
+    if bundle is None:
         return None
     
-    # Filter to only positive revenue values
-    consecutive_quarters = [(date, rev) for date, rev in consecutive_quarters if rev > 0]
+    # Consecutive quarters of positive revenue (requires 20 to find 4 quarters from 5 years ago)
+    consecutive_quarters = bundle.revenue
     if len(consecutive_quarters) < 20:
         return None
     
+    dates, revenues = _columns(bundle.revenue_20)
+    
     # Get most recent 4 quarters (numerator)
-    recent_4 = consecutive_quarters[:4]
-    current_revenue_sum = sum(rev for _, rev in recent_4)
-    current_periods = [date for date, _ in recent_4]
+    current_revenue_sum = revenues[0] + revenues[1] + revenues[2] + revenues[3]
+    current_periods = list(dates[:4])
     
     if current_revenue_sum <= 0:
         return None
     
     # Find 4 quarters from approximately 5 years ago (quarters 17-20 from the 20 consecutive quarters)
-    old_4 = consecutive_quarters[16:20]  # Quarters 17-20 (5 years back, 4 quarters)
-    old_revenue_sum = sum(rev for _, rev in old_4)
-    old_periods = [date for date, _ in old_4]
+    old_revenue_sum = revenues[16] + revenues[17] + revenues[18] + revenues[19]
+    old_periods = list(dates[16:20])
     
     if old_revenue_sum <= 0:
         return None
     
-    # Calculate the actual time difference in years
-    try:
-        # Get dates from the periods
-        newest_date = recent_4[0][0]  # Most recent quarter
-        oldest_date = old_4[-1][0]    # Oldest of the 4 quarters from 5 years ago
-        
-        # Parse years
-        if '-' in newest_date:
-            newest_year = float(newest_date.split('-')[0])
-            newest_month = float(newest_date.split('-')[1]) if len(newest_date.split('-')) > 1 else 6.0
-        else:
-            newest_year = float(newest_date[:4]) if len(newest_date) >= 4 else None
-            newest_month = 6.0
-        
-        if '-' in oldest_date:
-            oldest_year = float(oldest_date.split('-')[0])
-            oldest_month = float(oldest_date.split('-')[1]) if len(oldest_date.split('-')) > 1 else 6.0
-        else:
-            oldest_year = float(oldest_date[:4]) if len(oldest_date) >= 4 else None
-            oldest_month = 6.0
-        
-        if newest_year and oldest_year:
-            # Calculate years difference more accurately
-            years_diff = (newest_year + newest_month/12.0) - (oldest_year + oldest_month/12.0)
-        else:
-            years_diff = 5.0  # Default to 5 years
-    except (ValueError, IndexError, TypeError):
-        years_diff = 5.0  # Default to 5 years if parsing fails
-    
-    if years_diff <= 0:
-        return None
+    # Time between the newest and oldest quarter in years. The run's dates
+    # are all 'YYYY-MM' (get_consecutive_quarters parsed each one), so this
+    # is always 4.75 years and positive.
+    newest_year, newest_month = _ym(dates[0])
+    oldest_year, oldest_month = _ym(dates[19])
+    years_diff = (newest_year + newest_month/12.0) - (oldest_year + oldest_month/12.0)
     
     # CAGR formula: ((Ending Value / Beginning Value) ^ (1/Number of Years)) - 1
     growth_rate = ((current_revenue_sum / old_revenue_sum) ** (1.0 / years_diff)) - 1.0
@@ -218,39 +584,25 @@ def calculate_5y_halfway_revenue_growth(ticker_data):
         Tuple of (growth_ratio, recent_10_sum, old_10_sum, recent_periods, old_periods)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
-        return None
-    
-    financials = ticker_data['financials']
-    
-    # Use quarterly data for 5-year halfway calculation
-    if 'quarterly' not in financials:
+    bundle = prepare_quarterly_bundle(ticker_data)
+    if bundle is None:
         return None
     
-    quarterly_data = financials['quarterly']
-    
-    # Get consecutive quarters (requires 20 for this calculation)
-    consecutive_quarters = get_consecutive_quarters(quarterly_data, 'revenue', 20)
-    if consecutive_quarters is None:
-        return None
-    
-    # Filter to only positive revenue values
-    consecutive_quarters = [(date, rev) for date, rev in consecutive_quarters if rev > 0]
+    # Consecutive quarters of positive revenue (requires 20 for this calculation)
+    consecutive_quarters = bundle.revenue
     if len(consecutive_quarters) < 20:
         return None
     
-    # Take the most recent 20 consecutive quarters (for 5 years)
-    most_recent_20 = consecutive_quarters[:20]
+    # The most recent 20 consecutive quarters (for 5 years)
+    most_recent_20 = bundle.revenue_20
     
-    # Most recent 10 quarters (quarters 1-10 of the 20)
-    recent_10 = most_recent_20[:10]
-    recent_10_sum = sum(rev for _, rev in recent_10)
-    recent_periods = [date for date, _ in recent_10]
+    dates, values = _columns(most_recent_20)
     
-    # Oldest 10 quarters from the most recent 20 (quarters 11-20 of the 20)
-    old_10 = most_recent_20[10:20]
-    old_10_sum = sum(rev for _, rev in old_10)
-    old_periods = [date for date, _ in old_10]
+    # Most recent 10 quarters (quarters 1-10 of the 20) and oldest 10
+    # quarters from the most recent 20 (quarters 11-20 of the 20)
+    recent_10_sum, old_10_sum = _partition_sum(values, (10, 10))
+    recent_periods = list(dates[:10])
+    old_periods = list(dates[10:20])
     
     if old_10_sum <= 0:
         return None
@@ -258,8 +610,8 @@ def calculate_5y_halfway_revenue_growth(ticker_data):
     # Calculate growth ratio
     growth_ratio = recent_10_sum / old_10_sum
     
-    # Return all 20 quarters for display
-    all_20_periods = [(date, rev) for date, rev in most_recent_20]
+    # Return all 20 quarters for display (a copy, since the slice is shared)
+    all_20_periods = list(most_recent_20)
     
     return (growth_ratio, recent_10_sum, old_10_sum, recent_periods, old_periods, all_20_periods)
 
@@ -281,49 +633,30 @@ def calculate_halfway_share_count_growth(ticker_data):
         Tuple of (growth_ratio, recent_10_sum, old_10_sum, recent_periods, old_periods, all_20_periods)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
+    quarterly_data = _quarterly(ticker_data)
+    if quarterly_data is None:
         return None
     
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
     # Check if share count is available (try different possible field names)
-    shares_field = None
-    for field_name in ['shares_eop', 'shares_diluted', 'shares_basic', 'shares']:
-        if field_name in quarterly_data:
-            shares_field = field_name
-            break
-    
+    shares_field = _resolve_field(quarterly_data, SHARES_FIELDS)
     if not shares_field:
         return None
     
-    # Get consecutive quarters (requires 20 for this calculation)
-    consecutive_quarters = get_consecutive_quarters(quarterly_data, shares_field, 20)
+    # Get consecutive quarters of positive share counts (requires 20 for this calculation)
+    consecutive_quarters = get_consecutive_quarters(quarterly_data, shares_field, 20, positive_only=True)
     if consecutive_quarters is None:
         return None
     
-    # Filter to only positive share count values
-    consecutive_quarters = [(date, shares) for date, shares in consecutive_quarters if shares > 0]
-    if len(consecutive_quarters) < 20:
-        return None
-    
     # Take the most recent 20 consecutive quarters (for 5 years)
     most_recent_20 = consecutive_quarters[:20]
     
-    # Most recent 10 quarters (quarters 1-10 of the 20)
-    recent_10 = most_recent_20[:10]
-    recent_10_sum = sum(shares for _, shares in recent_10)
-    recent_periods = [date for date, _ in recent_10]
+    dates, values = _columns(most_recent_20)
     
-    # Oldest 10 quarters from the most recent 20 (quarters 11-20 of the 20)
-    old_10 = most_recent_20[10:20]
-    old_10_sum = sum(shares for _, shares in old_10)
-    old_periods = [date for date, _ in old_10]
+    # Most recent 10 quarters (quarters 1-10 of the 20) and oldest 10
+    # quarters from the most recent 20 (quarters 11-20 of the 20)
+    recent_10_sum, old_10_sum = _partition_sum(values, (10, 10))
+    recent_periods = list(dates[:10])
+    old_periods = list(dates[10:20])
     
     if old_10_sum <= 0:
         return None
@@ -348,101 +681,51 @@ def calculate_consistency_of_growth(ticker_data):
         ticker_data: Dictionary containing QuickFS financial data
     
     Returns:
-        Tuple of (stdev, growth_rates, quarters_with_growth)
+        Tuple of (stdev, avg_growth, growth_rates, quarters_with_growth)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
-        return None
-    
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
-    # Get consecutive quarters (requires 20 for this calculation)
-    consecutive_quarters = get_consecutive_quarters(quarterly_data, 'revenue', 20)
-    if consecutive_quarters is None:
+    bundle = prepare_quarterly_bundle(ticker_data)
+    if bundle is None:
         return None
     
-    # Filter to only positive revenue values
-    consecutive_quarters = [(date, rev) for date, rev in consecutive_quarters if rev > 0]
+    # Consecutive quarters of positive revenue (requires 20 for this calculation)
+    consecutive_quarters = bundle.revenue
     if len(consecutive_quarters) < 20:
         return None
     
     # Get the last 5 years of consecutive quarters (20 quarters)
-    last_5_years = consecutive_quarters[:20]
+    last_5_years = bundle.revenue_20
     
-    # Create a dictionary to look up revenue by date (use all consecutive quarters for YoY lookup)
-    revenue_by_date = {date: rev for date, rev in consecutive_quarters}
+    # Look up revenue by (year, quarter) so the same quarter of the previous
+    # year is a single dict lookup (use all consecutive quarters for YoY lookup)
+    revenue_by_quarter = {}
+    for date, rev in consecutive_quarters:
+        year, month = divmod(_month_key(date) - 1, 12)
+        revenue_by_quarter[(year, month // 3 + 1)] = (date, rev)
     
     # Calculate YoY growth for each quarter
     growth_rates = []
     quarters_with_growth = []
     
     for date, current_rev in last_5_years:
-        # Parse the date to get year and quarter
-        try:
-            if '-' in date:
-                parts = date.split('-')
-                year = int(parts[0])
-                month = int(parts[1])
-                # Determine quarter from month
-                quarter = (month - 1) // 3 + 1
-                
-                # Find the same quarter from the previous year
-                prev_year = year - 1
-                # Approximate the previous year's quarter date
-                # We'll try to find the closest matching date
-                prev_year_month = month  # Same month in previous year
-                prev_date_candidates = [
-                    f"{prev_year}-{prev_year_month:02d}",
-                    f"{prev_year}-{prev_year_month-1:02d}" if prev_year_month > 1 else None,
-                    f"{prev_year}-{prev_year_month+1:02d}" if prev_year_month < 12 else None,
-                ]
-                
-                # Try to find the previous year's quarter
-                prev_rev = None
-                prev_date_found = None
-                for candidate in prev_date_candidates:
-                    if candidate and candidate in revenue_by_date:
-                        prev_rev = revenue_by_date[candidate]
-                        prev_date_found = candidate
-                        break
-                
-                # If not found, try a broader search - look for any quarter in that year range
-                if prev_rev is None:
-                    for check_date, check_rev in consecutive_quarters:
-                        if '-' in check_date:
-                            check_parts = check_date.split('-')
-                            check_year = int(check_parts[0])
-                            check_month = int(check_parts[1])
-                            # Check if it's in the previous year and same quarter
-                            if check_year == prev_year:
-                                check_quarter = (check_month - 1) // 3 + 1
-                                if check_quarter == quarter:
-                                    prev_rev = check_rev
-                                    prev_date_found = check_date
-                                    break
-                
-                if prev_rev and prev_rev > 0:
-                    # Calculate YoY growth
-                    yoy_growth = (current_rev - prev_rev) / prev_rev
-                    growth_rates.append(yoy_growth)
-                    quarters_with_growth.append((date, current_rev, prev_date_found, prev_rev, yoy_growth))
-        except (ValueError, IndexError, TypeError):
-            # Skip if we can't parse the date
-            continue
+        year, month = divmod(_month_key(date) - 1, 12)
+        
+        # Find the same quarter from the previous year
+        prev_date_found, prev_rev = revenue_by_quarter.get((year - 1, month // 3 + 1), (None, None))
+        
+        if prev_rev and prev_rev > 0:
+            # Calculate YoY growth
+            yoy_growth = (current_rev - prev_rev) / prev_rev
+            growth_rates.append(yoy_growth)
+            quarters_with_growth.append((date, current_rev, prev_date_found, prev_rev, yoy_growth))
     
     if len(growth_rates) < 2:
         return None
     
-    # Calculate standard deviation of growth rates
-    stdev = statistics.stdev(growth_rates)
+    # Calculate standard deviation and average of growth rates
+    avg_growth, stdev = _mean_stdev(growth_rates)
     
-    return (stdev, growth_rates, quarters_with_growth)
+    return (stdev, avg_growth, growth_rates, quarters_with_growth)
 
 def calculate_acceleration_of_growth(ticker_data):
     """
@@ -468,46 +751,25 @@ def calculate_acceleration_of_growth(ticker_data):
         where all_21_periods is ordered oldest to newest (quarter 1 to 21)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
+    bundle = prepare_quarterly_bundle(ticker_data)
+    if bundle is None:
         return None
     
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
-    # Get consecutive quarters (requires 21 for this calculation)
-    consecutive_quarters = get_consecutive_quarters(quarterly_data, 'revenue', 21)
-    if consecutive_quarters is None:
-        return None
-    
-    # Filter to only positive revenue values
-    consecutive_quarters = [(date, rev) for date, rev in consecutive_quarters if rev > 0]
+    # Consecutive quarters of positive revenue (requires 21 for this calculation)
+    consecutive_quarters = bundle.revenue
     if len(consecutive_quarters) < 21:
         return None
     
-    # Take the most recent 21 consecutive quarters (most recent first)
-    most_recent_21 = consecutive_quarters[:21]
-    
-    # Reverse the list so oldest is first (for display purposes)
+    # Take the most recent 21 consecutive quarters, oldest first (for display
+    # purposes) in a single reversed slice
     # This way quarter 1 = oldest, quarter 21 = newest
-    oldest_to_newest_21 = list(reversed(most_recent_21))
-    
-    # Split into 3 groups of 7 quarters each
-    # Quarters 1-7 (oldest of the 21) - these are indices 0-6 in reversed list
-    quarters_1_7 = oldest_to_newest_21[:7]
-    sum1 = sum(rev for _, rev in quarters_1_7)
+    oldest_to_newest_21 = consecutive_quarters[20::-1]
     
-    # Quarters 8-14 (middle) - these are indices 7-13 in reversed list
-    quarters_8_14 = oldest_to_newest_21[7:14]
-    sum2 = sum(rev for _, rev in quarters_8_14)
+    _, revenues = _columns(oldest_to_newest_21)
     
-    # Quarters 15-21 (newest) - these are indices 14-20 in reversed list
-    quarters_15_21 = oldest_to_newest_21[14:21]
-    sum3 = sum(rev for _, rev in quarters_15_21)
+    # Split into 3 groups of 7 quarters each: quarters 1-7 (oldest of the
+    # 21), quarters 8-14 (middle) and quarters 15-21 (newest)
+    sum1, sum2, sum3 = _partition_sum(revenues, (7, 7, 7))
     
     if sum1 <= 0 or sum2 <= 0:
         return None
@@ -546,62 +808,21 @@ def calculate_operating_margin_growth(ticker_data):
         Tuple of (margin_growth, margin1, margin2, op_income_sum1, op_income_sum2, revenue_sum1, revenue_sum2, all_20_periods)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
+    quarterly_data = _quarterly(ticker_data)
+    if quarterly_data is None:
         return None
     
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
+    # The most recent 20 quarters with consecutive revenue and operating income,
+    # oldest first (quarter 1 = oldest, quarter 20 = newest)
+    frame = get_margin_frame(quarterly_data, 'operating_income')
+    if frame is None:
         return None
     
-    quarterly_data = financials['quarterly']
+    revenues, op_incomes = frame.revenues, frame.values
     
-    if 'revenue' not in quarterly_data or 'operating_income' not in quarterly_data:
-        return None
-    
-    # Get consecutive quarters for revenue (requires 20 for this calculation)
-    consecutive_revenue = get_consecutive_quarters(quarterly_data, 'revenue', 20)
-    if consecutive_revenue is None:
-        return None
-    
-    # Get consecutive quarters for operating income
-    consecutive_op_inc = get_consecutive_quarters(quarterly_data, 'operating_income', 20)
-    if consecutive_op_inc is None:
-        return None
-    
-    # Match up consecutive quarters - they should have the same dates
-    # Create a dictionary for operating income by date
-    op_inc_by_date = {date: val for date, val in consecutive_op_inc}
-    
-    # Filter to only include quarters where both revenue and operating income are available
-    valid_data = []
-    for date, rev in consecutive_revenue:
-        if date in op_inc_by_date and rev > 0:
-            op_inc = op_inc_by_date[date]
-            if op_inc is not None:
-                valid_data.append((date, rev, op_inc))
-    
-    # Need at least 20 consecutive quarters with both revenue and operating income
-    if len(valid_data) < 20:
-        return None
-    
-    # Take the most recent 20 consecutive quarters
-    most_recent_20 = valid_data[:20]
-    
-    # Reverse the list so oldest is first (for display purposes)
-    # This way quarter 1 = oldest, quarter 20 = newest
-    oldest_to_newest_20 = list(reversed(most_recent_20))
-    
-    # Quarters 1-10 (oldest 10)
-    quarters_1_10 = oldest_to_newest_20[:10]
-    revenue_sum1 = sum(rev for _, rev, _ in quarters_1_10)
-    op_income_sum1 = sum(op_inc for _, _, op_inc in quarters_1_10)
-    
-    # Quarters 11-20 (newest 10)
-    quarters_11_20 = oldest_to_newest_20[10:20]
-    revenue_sum2 = sum(rev for _, rev, _ in quarters_11_20)
-    op_income_sum2 = sum(op_inc for _, _, op_inc in quarters_11_20)
+    # Quarters 1-10 (oldest 10) and quarters 11-20 (newest 10)
+    revenue_sum1, revenue_sum2 = _partition_sum(revenues, (10, 10))
+    op_income_sum1, op_income_sum2 = _partition_sum(op_incomes, (10, 10))
     
     if revenue_sum1 <= 0 or revenue_sum2 <= 0:
         return None
@@ -613,7 +834,7 @@ def calculate_operating_margin_growth(ticker_data):
     # Calculate operating margin growth (difference, not ratio)
     margin_growth = margin2 - margin1
     
-    return (margin_growth, margin1, margin2, op_income_sum1, op_income_sum2, revenue_sum1, revenue_sum2, oldest_to_newest_20)
+    return (margin_growth, margin1, margin2, op_income_sum1, op_income_sum2, revenue_sum1, revenue_sum2, list(frame.rows))
 
 def calculate_gross_margin_growth(ticker_data):
     """
@@ -634,62 +855,21 @@ def calculate_gross_margin_growth(ticker_data):
         Tuple of (margin_growth, margin1, margin2, gross_profit_sum1, gross_profit_sum2, revenue_sum1, revenue_sum2, all_20_periods)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
+    quarterly_data = _quarterly(ticker_data)
+    if quarterly_data is None:
         return None
     
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
+    # The most recent 20 quarters with consecutive revenue and gross profit,
+    # oldest first (quarter 1 = oldest, quarter 20 = newest)
+    frame = get_margin_frame(quarterly_data, 'gross_profit')
+    if frame is None:
         return None
     
-    quarterly_data = financials['quarterly']
+    revenues, gross_profits = frame.revenues, frame.values
     
-    if 'revenue' not in quarterly_data or 'gross_profit' not in quarterly_data:
-        return None
-    
-    # Get consecutive quarters for revenue (requires 20 for this calculation)
-    consecutive_revenue = get_consecutive_quarters(quarterly_data, 'revenue', 20)
-    if consecutive_revenue is None:
-        return None
-    
-    # Get consecutive quarters for gross profit
-    consecutive_gross_profit = get_consecutive_quarters(quarterly_data, 'gross_profit', 20)
-    if consecutive_gross_profit is None:
-        return None
-    
-    # Match up consecutive quarters - they should have the same dates
-    # Create a dictionary for gross profit by date
-    gross_profit_by_date = {date: val for date, val in consecutive_gross_profit}
-    
-    # Filter to only include quarters where both revenue and gross profit are available
-    valid_data = []
-    for date, rev in consecutive_revenue:
-        if date in gross_profit_by_date and rev > 0:
-            gp = gross_profit_by_date[date]
-            if gp is not None:
-                valid_data.append((date, rev, gp))
-    
-    # Need at least 20 consecutive quarters with both revenue and gross profit
-    if len(valid_data) < 20:
-        return None
-    
-    # Take the most recent 20 consecutive quarters
-    most_recent_20 = valid_data[:20]
-    
-    # Reverse the list so oldest is first (for display purposes)
-    # This way quarter 1 = oldest, quarter 20 = newest
-    oldest_to_newest_20 = list(reversed(most_recent_20))
-    
-    # Quarters 1-10 (oldest 10)
-    quarters_1_10 = oldest_to_newest_20[:10]
-    revenue_sum1 = sum(rev for _, rev, _ in quarters_1_10)
-    gross_profit_sum1 = sum(gp for _, _, gp in quarters_1_10)
-    
-    # Quarters 11-20 (newest 10)
-    quarters_11_20 = oldest_to_newest_20[10:20]
-    revenue_sum2 = sum(rev for _, rev, _ in quarters_11_20)
-    gross_profit_sum2 = sum(gp for _, _, gp in quarters_11_20)
+    # Quarters 1-10 (oldest 10) and quarters 11-20 (newest 10)
+    revenue_sum1, revenue_sum2 = _partition_sum(revenues, (10, 10))
+    gross_profit_sum1, gross_profit_sum2 = _partition_sum(gross_profits, (10, 10))
     
     if revenue_sum1 <= 0 or revenue_sum2 <= 0:
         return None
@@ -701,7 +881,7 @@ def calculate_gross_margin_growth(ticker_data):
     # Calculate gross margin growth (difference, not ratio)
     margin_growth = margin2 - margin1
     
-    return (margin_growth, margin1, margin2, gross_profit_sum1, gross_profit_sum2, revenue_sum1, revenue_sum2, oldest_to_newest_20)
+    return (margin_growth, margin1, margin2, gross_profit_sum1, gross_profit_sum2, revenue_sum1, revenue_sum2, list(frame.rows))
 
 def calculate_operating_margin_consistency(ticker_data):
     """
@@ -728,68 +908,28 @@ def calculate_operating_margin_consistency(ticker_data):
         where margins_with_data is a list of (group_num, operating_margin, total_revenue, total_operating_income, quarters_list)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
+    quarterly_data = _quarterly(ticker_data)
+    if quarterly_data is None:
         return None
     
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
+    # The most recent 20 quarters with consecutive revenue and operating
+    # income, oldest first (quarter 1 = oldest, quarter 20 = newest)
+    frame = get_margin_frame(quarterly_data, 'operating_income')
+    if frame is None:
         return None
     
-    quarterly_data = financials['quarterly']
-    
-    if 'revenue' not in quarterly_data or 'operating_income' not in quarterly_data:
-        return None
-    
-    # Get consecutive quarters for revenue (requires 20 for this calculation)
-    consecutive_revenue = get_consecutive_quarters(quarterly_data, 'revenue', 20)
-    if consecutive_revenue is None:
-        return None
-    
-    # Get consecutive quarters for operating income
-    consecutive_op_inc = get_consecutive_quarters(quarterly_data, 'operating_income', 20)
-    if consecutive_op_inc is None:
-        return None
-    
-    # Match up consecutive quarters - they should have the same dates
-    op_inc_by_date = {date: val for date, val in consecutive_op_inc}
-    
-    # Filter to only include quarters where both revenue and operating income are available
-    valid_data = []
-    for date, rev in consecutive_revenue:
-        if date in op_inc_by_date and rev > 0:
-            op_inc = op_inc_by_date[date]
-            if op_inc is not None:
-                valid_data.append((date, rev, op_inc))
-    
-    # Need at least 20 consecutive quarters with both revenue and operating income
-    if len(valid_data) < 20:
-        return None
-    
-    # Take the most recent 20 consecutive quarters
-    most_recent_20 = valid_data[:20]
-    
-    # Reverse the list so oldest is first (for display purposes)
-    # This way quarter 1 = oldest, quarter 20 = newest
-    oldest_to_newest_20 = list(reversed(most_recent_20))
+    oldest_to_newest_20, revenues, op_incomes = frame.rows, frame.revenues, frame.values
     
     # Split into 5 groups of 4 quarters each
-    groups = []
-    for i in range(5):
-        start_idx = i * 4
-        end_idx = start_idx + 4
-        group_quarters = oldest_to_newest_20[start_idx:end_idx]
-        groups.append(group_quarters)
+    groups = zip([oldest_to_newest_20[i:i + 4] for i in range(0, 20, 4)],
+                 _partition_sum(revenues, GROUPS_OF_4),
+                 _partition_sum(op_incomes, GROUPS_OF_4))
     
     # Calculate operating margin for each group
     margins = []
     margins_with_data = []
     
-    for group_num, group_quarters in enumerate(groups, 1):
-        total_revenue = sum(rev for _, rev, _ in group_quarters)
-        total_op_income = sum(op_inc for _, _, op_inc in group_quarters)
-        
+    for group_num, (group_quarters, total_revenue, total_op_income) in enumerate(groups, 1):
         if total_revenue > 0:
             margin = total_op_income / total_revenue
             margins.append(margin)
@@ -799,8 +939,7 @@ def calculate_operating_margin_consistency(ticker_data):
         return None
     
     # Calculate standard deviation and average
-    stdev = statistics.stdev(margins)
-    avg_margin = statistics.mean(margins)
+    avg_margin, stdev = _mean_stdev(margins)
     
     return (stdev, avg_margin, margins_with_data)
 
@@ -829,68 +968,28 @@ def calculate_gross_margin_consistency(ticker_data):
         where margins_with_data is a list of (group_num, gross_margin, total_revenue, total_gross_profit, quarters_list)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
-        return None
-    
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
-    if 'revenue' not in quarterly_data or 'gross_profit' not in quarterly_data:
-        return None
-    
-    # Get consecutive quarters for revenue (requires 20 for this calculation)
-    consecutive_revenue = get_consecutive_quarters(quarterly_data, 'revenue', 20)
-    if consecutive_revenue is None:
-        return None
-    
-    # Get consecutive quarters for gross profit
-    consecutive_gross_profit = get_consecutive_quarters(quarterly_data, 'gross_profit', 20)
-    if consecutive_gross_profit is None:
+    quarterly_data = _quarterly(ticker_data)
+    if quarterly_data is None:
         return None
     
-    # Match up consecutive quarters - they should have the same dates
-    gross_profit_by_date = {date: val for date, val in consecutive_gross_profit}
-    
-    # Filter to only include quarters where both revenue and gross profit are available
-    valid_data = []
-    for date, rev in consecutive_revenue:
-        if date in gross_profit_by_date and rev > 0:
-            gp = gross_profit_by_date[date]
-            if gp is not None:
-                valid_data.append((date, rev, gp))
-    
-    # Need at least 20 consecutive quarters with both revenue and gross profit
-    if len(valid_data) < 20:
+    # The most recent 20 quarters with consecutive revenue and gross profit,
+    # oldest first (quarter 1 = oldest, quarter 20 = newest)
+    frame = get_margin_frame(quarterly_data, 'gross_profit')
+    if frame is None:
         return None
     
-    # Take the most recent 20 consecutive quarters
-    most_recent_20 = valid_data[:20]
-    
-    # Reverse the list so oldest is first (for display purposes)
-    # This way quarter 1 = oldest, quarter 20 = newest
-    oldest_to_newest_20 = list(reversed(most_recent_20))
+    oldest_to_newest_20, revenues, gross_profits = frame.rows, frame.revenues, frame.values
     
     # Split into 5 groups of 4 quarters each
-    groups = []
-    for i in range(5):
-        start_idx = i * 4
-        end_idx = start_idx + 4
-        group_quarters = oldest_to_newest_20[start_idx:end_idx]
-        groups.append(group_quarters)
+    groups = zip([oldest_to_newest_20[i:i + 4] for i in range(0, 20, 4)],
+                 _partition_sum(revenues, GROUPS_OF_4),
+                 _partition_sum(gross_profits, GROUPS_OF_4))
     
     # Calculate gross margin for each group
     margins = []
     margins_with_data = []
     
-    for group_num, group_quarters in enumerate(groups, 1):
-        total_revenue = sum(rev for _, rev, _ in group_quarters)
-        total_gross_profit = sum(gp for _, _, gp in group_quarters)
-        
+    for group_num, (group_quarters, total_revenue, total_gross_profit) in enumerate(groups, 1):
         if total_revenue > 0:
             margin = total_gross_profit / total_revenue
             margins.append(margin)
@@ -900,8 +999,7 @@ def calculate_gross_margin_consistency(ticker_data):
         return None
     
     # Calculate standard deviation and average
-    stdev = statistics.stdev(margins)
-    avg_margin = statistics.mean(margins)
+    avg_margin, stdev = _mean_stdev(margins)
     
     return (stdev, avg_margin, margins_with_data)
 
@@ -922,27 +1020,12 @@ def calculate_ttm_ebit_ppe(ticker_data):
         where quarters_used is a list of (date, operating_income) for the 4 quarters
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
-        return None
-    
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
-    if 'operating_income' not in quarterly_data:
+    quarterly_data = _quarterly(ticker_data, 'operating_income')
+    if quarterly_data is None:
         return None
     
     # Check if PPE is available (try different possible field names)
-    ppe_field = None
-    for field_name in ['ppe_net', 'ppe', 'property_plant_equipment', 'net_ppe', 'fixed_assets']:
-        if field_name in quarterly_data:
-            ppe_field = field_name
-            break
-    
+    ppe_field = _resolve_field(quarterly_data, PPE_FIELDS)
     if not ppe_field:
         return None
     
@@ -953,7 +1036,7 @@ def calculate_ttm_ebit_ppe(ticker_data):
     
     # Get most recent 4 consecutive quarters for TTM EBIT
     ttm_quarters = consecutive_op_inc[:4]
-    ttm_ebit = sum(op_inc for _, op_inc in ttm_quarters)
+    ttm_ebit = ttm_quarters[0][1] + ttm_quarters[1][1] + ttm_quarters[2][1] + ttm_quarters[3][1]
     
     # Get PPE from the most recent quarter (same date as first quarter in TTM)
     most_recent_date = ttm_quarters[0][0]
@@ -963,16 +1046,8 @@ def calculate_ttm_ebit_ppe(ticker_data):
     if consecutive_ppe is None or len(consecutive_ppe) == 0:
         return None
     
-    # Get PPE from the most recent quarter
-    ppe_date, ppe = consecutive_ppe[0]
-    
-    # Verify it's the same date as our TTM most recent date
-    if ppe_date != most_recent_date:
-        # Try to find matching date in PPE data
-        ppe_by_date = {date: val for date, val in consecutive_ppe}
-        if most_recent_date not in ppe_by_date:
-            return None
-        ppe = ppe_by_date[most_recent_date]
+    # Get PPE from the same quarter as our TTM most recent date
+    ppe = _value_at(consecutive_ppe, most_recent_date)
     
     if ppe is None or ppe <= 0:
         return None
@@ -1003,22 +1078,8 @@ def calculate_net_debt_to_ttm_operating_income(ticker_data):
         where quarters_used is a list of (date, operating_income) for the 4 quarters
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
-        return None
-    
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
-    if 'operating_income' not in quarterly_data:
-        return None
-    
-    # Check if net debt is available
-    if 'net_debt' not in quarterly_data:
+    quarterly_data = _quarterly(ticker_data, 'operating_income', 'net_debt')
+    if quarterly_data is None:
         return None
     
     # Get consecutive quarters for operating income (requires 4 for TTM calculation)
@@ -1028,7 +1089,8 @@ def calculate_net_debt_to_ttm_operating_income(ticker_data):
     
     # Get most recent 4 consecutive quarters for TTM Operating Income
     ttm_quarters = consecutive_op_inc[:4]
-    ttm_operating_income = sum(op_inc for _, op_inc in ttm_quarters)
+    ttm_operating_income = (ttm_quarters[0][1] + ttm_quarters[1][1]
+                            + ttm_quarters[2][1] + ttm_quarters[3][1])
     
     # Get Net Debt from the most recent quarter (same date as first quarter in TTM)
     most_recent_date = ttm_quarters[0][0]
@@ -1038,16 +1100,8 @@ def calculate_net_debt_to_ttm_operating_income(ticker_data):
     if consecutive_net_debt is None or len(consecutive_net_debt) == 0:
         return None
     
-    # Get net debt from the most recent quarter
-    net_debt_date, net_debt = consecutive_net_debt[0]
-    
-    # Verify it's the same date as our TTM most recent date
-    if net_debt_date != most_recent_date:
-        # Try to find matching date in net debt data
-        net_debt_by_date = {date: val for date, val in consecutive_net_debt}
-        if most_recent_date not in net_debt_by_date:
-            return None
-        net_debt = net_debt_by_date[most_recent_date]
+    # Get net debt from the same quarter as our TTM most recent date
+    net_debt = _value_at(consecutive_net_debt, most_recent_date)
     
     if net_debt is None:
         return None
@@ -1064,6 +1118,70 @@ def calculate_net_debt_to_ttm_operating_income(ticker_data):
     
     return (ratio, ttm_operating_income, net_debt, most_recent_date, ttm_quarters)
 
+def _reinvest(valid_data):
+    """
+    Reinvest dividends starting from 1 share.
+    
+    Dividend reinvestment logic, for each (date, price, dividend) period from
+    oldest to newest:
+    - At the start of the period, we own shares_owned shares
+    - During the period, we receive dividend per share * shares_owned
+    - We immediately reinvest the dividend at the period's end price to buy more shares
+    - At the end of the period, we own shares_owned + new_shares_from_dividend
+    
+    Returns:
+        Tuple of (shares_owned, periods_with_data), where periods_with_data is a
+        list of (date, price, dividend, shares_before, dividend_received,
+        shares_purchased, shares_after)
+    """
+    shares_owned = 1.0
+    periods_with_data = []
+    append = periods_with_data.append
+    
+    for date, price, dividend in valid_data:
+        shares_before = shares_owned
+        dividend_received = shares_before * dividend
+        
+        if price > 0 and dividend_received > 0:
+            shares_purchased = dividend_received / price
+        else:
+            shares_purchased = 0.0
+        
+        shares_owned += shares_purchased
+        append((date, price, dividend, shares_before, dividend_received,
+                shares_purchased, shares_owned))
+    
+    return shares_owned, periods_with_data
+
+def _dividends_at(run, dates, dividends):
+    """
+    Dividend for each (date, value) row of a consecutive run (most recent
+    first), or 0.0 where there is none.
+    
+    When the run's dates are a block of the date list that appear in it only
+    once (as in QuickFS data, unless quarters were dropped from the run) the
+    dividends are sliced out by position; otherwise they are looked up by date.
+    """
+    if not dividends or not dates:
+        return [0.0] * len(run)
+    
+    run_dates = next(zip(*run))
+    if run_dates[-1] in dates:
+        start = dates.index(run_dates[-1])
+        end = start + len(run)
+        if tuple(reversed(dates[start:end])) == run_dates and len(set(dates)) == len(dates):
+            # dividends may be shorter than dates; missing entries count as none
+            block = list(dividends[start:end])
+            block += [None] * (len(run) - len(block))
+            return [0.0 if div is None else div for div in reversed(block)]
+    
+    # Create a dictionary for dividends by date
+    dividend_by_date = {}
+    for date, div in zip(dates, dividends):
+        if date and div is not None:
+            dividend_by_date[date] = div
+    return [dividend_by_date.get(date, 0.0) for date in run_dates]
+
 def calculate_total_past_return(ticker_data):
     """
     Calculate total past return with dividend reinvestment.
@@ -1089,86 +1207,35 @@ def calculate_total_past_return(ticker_data):
         dividend_received, shares_purchased, shares_after)
         Returns None if insufficient data
     """
-    if not ticker_data or 'financials' not in ticker_data:
-        return None
-    
-    financials = ticker_data['financials']
-    
-    # Use quarterly data
-    if 'quarterly' not in financials:
-        return None
-    
-    quarterly_data = financials['quarterly']
-    
-    if 'period_end_price' not in quarterly_data:
+    quarterly_data = _quarterly(ticker_data, 'period_end_price')
+    if quarterly_data is None:
         return None
     
     prices = quarterly_data['period_end_price']
     dates = quarterly_data.get('period_end_date', [])
     dividends = quarterly_data.get('dividends', [])
     
-    # Get consecutive quarters for price data (need at least 2 for start and end)
-    consecutive_prices = get_consecutive_quarters(quarterly_data, 'period_end_price', 2)
+    # Get consecutive quarters of positive prices (need at least 2 for start and end)
+    consecutive_prices = get_consecutive_quarters(quarterly_data, 'period_end_price', 2, positive_only=True)
     if consecutive_prices is None:
         return None
     
-    # Filter to only positive prices
-    consecutive_prices = [(date, price) for date, price in consecutive_prices if price > 0]
-    if len(consecutive_prices) < 2:
-        return None
-    
-    # Create a dictionary for dividends by date
-    dividend_by_date = {}
-    if dividends and dates:
-        for date, div in zip(dates, dividends):
-            if date and div is not None:
-                dividend_by_date[date] = div if div is not None else 0.0
-    
     # Build valid data with prices and dividends
-    valid_data = []
-    for date, price in consecutive_prices:
-        dividend = dividend_by_date.get(date, 0.0)
-        valid_data.append((date, price, dividend))
+    valid_data = [(date, price, dividend) for (date, price), dividend
+                  in zip(consecutive_prices, _dividends_at(consecutive_prices, dates, dividends))]
     
     # Need at least 2 data points (start and end)
     if len(valid_data) < 2:
         return None
     
     # Sort by date (oldest to newest) - consecutive_prices is already most recent first, so reverse
-    valid_data.sort(key=lambda x: x[0])
+    valid_data.sort(key=itemgetter(0))
     
     initial_date, initial_price, initial_dividend = valid_data[0]
     final_date, final_price, final_dividend = valid_data[-1]
     
-    # Start with 1 share at the initial price
-    shares_owned = 1.0
-    
-    periods_with_data = []
-    
-    # Process each period (oldest to newest)
-    # Dividend reinvestment logic:
-    # - At the start of period i, we own shares_owned shares
-    # - During period i, we receive dividend per share * shares_owned
-    # - We immediately reinvest the dividend at period i's end price to buy more shares
-    # - At the end of period i, we own shares_owned + new_shares_from_dividend
-    
-    for i, (date, price, dividend) in enumerate(valid_data):
-        shares_before = shares_owned
-        
-        # Receive dividend based on shares owned at the start of this period
-        dividend_received = shares_before * dividend
-        
-        # Reinvest dividend to buy more shares at this period's end price
-        if price > 0 and dividend_received > 0:
-            shares_purchased = dividend_received / price
-        else:
-            shares_purchased = 0.0
-        
-        shares_owned += shares_purchased
-        shares_after = shares_owned
-        
-        periods_with_data.append((date, price, dividend, shares_before, 
-                                  dividend_received, shares_purchased, shares_after))
+    # Start with 1 share at the initial price and reinvest every dividend
+    shares_owned, periods_with_data = _reinvest(valid_data)
     
     # Calculate total return
     # Final value = shares owned at end * final price
@@ -1181,6 +1248,78 @@ def calculate_total_past_return(ticker_data):
     return (total_return, total_return_multiplier, initial_price, initial_date,
             final_price, final_date, shares_owned, periods_with_data)
 
+# Calculator for each metric, keyed by its name in calculate_all_metrics.py
+# (where calculate_total_past_return also fills total_past_return_multiplier)
+METRIC_CALCULATORS = {
+    'revenue_5y_cagr': calculate_5y_revenue_growth,
+    'revenue_5y_halfway_growth': calculate_5y_halfway_revenue_growth,
+    'revenue_growth_consistency': calculate_consistency_of_growth,
+    'revenue_growth_acceleration': calculate_acceleration_of_growth,
+    'operating_margin_growth': calculate_operating_margin_growth,
+    'gross_margin_growth': calculate_gross_margin_growth,
+    'operating_margin_consistency': calculate_operating_margin_consistency,
+    'gross_margin_consistency': calculate_gross_margin_consistency,
+    'share_count_halfway_growth': calculate_halfway_share_count_growth,
+    'ttm_ebit_ppe': calculate_ttm_ebit_ppe,
+    'net_debt_to_ttm_operating_income': calculate_net_debt_to_ttm_operating_income,
+    'total_past_return': calculate_total_past_return,
+}
+
+def calculate_all_metrics(ticker):
+    """
+    Load a ticker's data once and run every calculator on it.
+    
+    The data comes from get_cached_ticker_data, so checking a ticker again
+    (e.g. in main()) skips the database read and reuses its consecutive runs.
+    
+    Args:
+        ticker: Ticker symbol
+    
+    Returns:
+        Dict of {metric_name: calculator result (None if insufficient data)},
+        keyed as METRIC_CALCULATORS, or None if there is no data for the ticker
+    """
+    return calculate_metrics(get_cached_ticker_data(ticker))
+
+def calculate_metrics(ticker_data):
+    """Run every calculator on already loaded ticker data, like calculate_all_metrics."""
+    if not ticker_data:
+        return None
+    
+    return {name: calculate(ticker_data) for name, calculate in METRIC_CALCULATORS.items()}
+
+def _load_and_calculate(ticker):
+    """Load one ticker's data and calculate its metrics, for run_all's workers."""
+    return calculate_metrics(get_ticker_data(ticker))
+
+def run_all(tickers, max_workers=None):
+    """
+    Calculate every metric for many tickers in one process.
+    
+    Tickers are handled by a thread pool, so one worker's database read and
+    decompression (which release the GIL) overlap with others' calculations.
+    Data is loaded with get_ticker_data rather than the cache used by main(),
+    which a bulk run would only churn.
+    
+    Args:
+        tickers: Ticker symbols
+        max_workers: Number of threads (default min(32, 4 * CPU count))
+    
+    Returns:
+        Dict of {ticker: calculate_all_metrics result} in the order of tickers
+    """
+    tickers = list(tickers)
+    if not os.path.exists(QUICKFS_DB):
+        print(f"Error: Database not found at {QUICKFS_DB}")
+        return dict.fromkeys(tickers)
+    
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(tickers, executor.map(_load_and_calculate, tickers)))
+
+# Reports format the same sums and TTM figures several times, so
+# format_revenue, a pure function of its argument, keeps recent results
+@lru_cache(maxsize=4096)
 def format_revenue(revenue):
     """Format revenue as billions with appropriate suffix."""
     if revenue >= 1e9:
@@ -1190,6 +1329,13 @@ def format_revenue(revenue):
     else:
         return f"${revenue:,.0f}"
 
+def format_revenues(revenues):
+    """Format many revenues like format_revenue, in one pass without a call per value."""
+    return [f"${revenue / 1e9:.2f}B" if revenue >= 1e9
+            else f"${revenue / 1e6:.2f}M" if revenue >= 1e6
+            else f"${revenue:,.0f}"
+            for revenue in revenues]
+
 def format_shares(shares):
     """Format share count with appropriate suffix."""
     if shares >= 1e9:
@@ -1199,11 +1345,510 @@ def format_shares(shares):
     else:
         return f"{shares:,.0f}"
 
-def main():
-    """Main function to calculate revenue growth."""
-    print("=" * 80)
+# Rules and table headers of the main() report
+BANNER = "=" * 80
+SEP70, SEP85, SEP100, SEP110, SEP120 = ("  " + "-" * n for n in (70, 85, 100, 110, 120))
+HDR_REVENUE_20Q = f"  {'Quarter':<12} {'Revenue':>15} {'Group':<10}"
+HDR_SHARES_20Q = f"  {'Quarter':<12} {'Share Count':>20} {'Group':<10}"
+HDR_YOY = f"  {'Quarter':<12} {'Revenue':>15} {'Prev Year':<12} {'Prev Revenue':>15} {'YoY Growth':>12}"
+HDR_REVENUE_21Q = f"  {'Quarter':<4} {'Date':<12} {'Revenue':>15} {'Group':<15}"
+HDR_OP_MARGIN_20Q = f"  {'Quarter':<4} {'Date':<12} {'Revenue':>15} {'Op Income':>15} {'Margin':>12} {'Group':<15}"
+HDR_GROSS_MARGIN_20Q = f"  {'Quarter':<4} {'Date':<12} {'Revenue':>15} {'Gross Profit':>15} {'Margin':>12} {'Group':<15}"
+HDR_OP_MARGIN_GROUP = f"  {'Group':<7} {'Quarters':<20} {'Revenue':>18} {'Op Income':>18} {'Margin':>12} {'Deviation':>12}"
+HDR_GROSS_MARGIN_GROUP = f"  {'Group':<7} {'Quarters':<20} {'Revenue':>18} {'Gross Profit':>18} {'Margin':>12} {'Deviation':>12}"
+HDR_TTM = f"  {'Quarter':<12} {'Operating Income':>20}"
+HDR_RETURN = (f"  {'Period':<7} {'Date':<12} {'Price':>12} {'Div/Share':>12} {'Shares Before':>15} "
+              f"{'Div Received':>15} {'Shares Purchased':>18} {'Shares After':>15}")
+
+# Layout of a ticker's report in main(), filled in with str.format_map: the
+# summary alone, or the detail sections followed by the summary
+SUMMARY_TPL = (
+    "\n"
+    "{banner}\n"
+    "METRIC SUMMARY\n"
+    "{banner}\n"
+    "\n"
+    "{summary}\n"
+    "\n"
+    "{banner}\n"
+    "\n"
+)
+REPORT_TPL = (
+    "\n"
+    "{banner}\n"
+    "5-YEAR REVENUE GROWTH: {ticker}\n"
+    "{banner}\n"
+    "\n"
+    "{details}\n"
+) + SUMMARY_TPL
+
+# Row templates of the main() report tables, matching the headers above
+ROW_20Q = "  {:<12} {:>15} {:<10}"
+ROW_SHARES_20Q = "  {:<12} {:>20} {:<10}"
+ROW_YOY = "  {:<12} {:>15} {:<12} {:>15} {:>11.2f}%"
+ROW_21Q = "  {:<4} {:<12} {:>15} {:<15}"
+ROW_Q = "  {:<4} {:<12} {:>15} {:>15} {:>11.2f}% {:<15}"
+ROW_GROUP = "  {:<7} {:<20} {:>18} {:>18} {:>11.2f}% {:>+11.2f}pp"
+ROW_TTM = "  {:<12} {:>20}"
+ROW_RETURN = "  {:<7} {:<12} ${:>11.2f} ${:>11.4f} {:>15.6f} ${:>14.2f} {:>18.6f} {:>15.6f}"
+ROW_RETURN_GAP = f"  {'...':<7} {'...':<12} {'...':>12} {'...':>12} {'...':>15} {'...':>15} {'...':>18} {'...':>15}"
+
+# Lines of the METRIC SUMMARY, in report order: (metric key, name, qualifier
+# shown with a value, formatter of the calculator result)
+SUMMARY_METRICS = (
+    ('revenue_5y_cagr', "5-Year CAGR", "",
+     lambda r: f"{r[0] * 100:.2f}%"),
+    ('revenue_5y_halfway_growth', "5-Year Halfway Growth", "",
+     lambda r: f"{r[0]:.4f}x ({(r[0] - 1) * 100:.2f}%)"),
+    ('share_count_halfway_growth', "5-Year Halfway Share Count Growth", "",
+     lambda r: f"{r[0]:.4f}x ({(r[0] - 1) * 100:.2f}%)"),
+    ('revenue_growth_consistency', "Consistency of Growth", " (YoY Stdev)",
+     lambda r: f"{r[0] * 100:.2f}% (Avg: {r[1] * 100:.2f}%)"),
+    ('revenue_growth_acceleration', "Acceleration of Growth", "",
+     lambda r: f"{r[0]:.4f}x"),
+    ('operating_margin_growth', "Operating Margin Growth", "",
+     lambda r: f"{r[0] * 100:.2f} pp"),
+    ('gross_margin_growth', "Gross Margin Growth", "",
+     lambda r: f"{r[0] * 100:.2f} pp"),
+    ('operating_margin_consistency', "Operating Margin Consistency", " (Stdev)",
+     lambda r: f"{r[0] * 100:.2f} pp"),
+    ('gross_margin_consistency', "Gross Margin Consistency", " (Stdev)",
+     lambda r: f"{r[0] * 100:.2f} pp"),
+    ('ttm_ebit_ppe', "TTM EBIT/PPE", "",
+     lambda r: f"{r[0]:.4f} ({r[0] * 100:.2f}%)"),
+    ('net_debt_to_ttm_operating_income', "Net Debt to TTM Operating Income", "",
+     lambda r: f"{r[0]:.2f} (negative income)" if r[1] <= 0 else f"{r[0]:.4f}"),
+    ('total_past_return', "Total Past Return", " (with dividends)",
+     lambda r: f"{r[0] * 100:.2f}% ({r[1]:.4f}x)"),
+)
+
+def build_summary(metrics):
+    """
+    Build the METRIC SUMMARY lines of the report, one per metric.
+    
+    Args:
+        metrics: Dict of calculator results, as returned by calculate_all_metrics
+    
+    Returns:
+        List of "<metric>: <value>" strings, with N/A for metrics without a result
+    """
+    return [f"{name}{qualifier}: {format_result(metrics[key])}" if metrics[key] else f"{name}: N/A"
+            for key, name, qualifier, format_result in SUMMARY_METRICS]
+
+def render_revenue_cagr(w, result):
+    """Write the 5-year CAGR section of a main() report through w."""
+    fmt = format_revenue
+    
+    growth_rate, current_rev_sum, old_rev_sum, current_periods, old_periods, years_diff = result
+    w(f"5-YEAR CAGR (Quarterly Data):")
+    w(f"  Using most recent 4 quarters vs 4 quarters from ~5 years ago")
+    w(f"  Period: {old_periods[-1]} to {old_periods[0]} → {current_periods[-1]} to {current_periods[0]}")
+    w(f"  Time period: {years_diff:.2f} years")
+    w(f"  Revenue (5 years ago, 4 quarters): {fmt(old_rev_sum)}")
+    w(f"  Revenue (most recent, 4 quarters): {fmt(current_rev_sum)}")
+    w(f"  CAGR: {growth_rate * 100:.2f}%")
+    w(f"  Total Growth: {((current_rev_sum / old_rev_sum) - 1) * 100:.2f}%")
+    w("")
+    w(f"  Quarters used:")
+    w(f"    5 years ago: {old_periods[0]} to {old_periods[-1]}")
+    w(f"    Most recent: {current_periods[0]} to {current_periods[-1]}")
+    w("")
+
+def render_halfway_growth(w, result):
+    """Write the 5-year halfway growth section of a main() report through w."""
+    fmt = format_revenue
+    
+    growth_ratio, recent_sum, old_sum, recent_periods, old_periods, all_20_periods = result
+    w(f"5-YEAR HALFWAY GROWTH (Quarterly Data):")
+    w(f"  Formula: Sum of recent 10 quarters / Sum of oldest 10 quarters")
+    w(f"  Oldest 10 quarters: {old_periods[-1]} to {old_periods[0]}")
+    w(f"  Recent 10 quarters: {recent_periods[-1]} to {recent_periods[0]}")
+    w(f"  Sum of oldest 10 quarters: {fmt(old_sum)}")
+    w(f"  Sum of recent 10 quarters: {fmt(recent_sum)}")
+    w(f"  Growth Ratio: {growth_ratio:.2f}x")
+    w(f"  Growth Percentage: {(growth_ratio - 1) * 100:.2f}%")
+    w("")
+    w(f"  Revenue for all 20 quarters (most recent first):")
+    w(SEP70)
+    w(HDR_REVENUE_20Q)
+    w(SEP70)
+    revenue_strs = format_revenues(rev for _, rev in all_20_periods[:20])
+    # Quarters 1-10 are the recent group, 11-20 the oldest of the 20
+    rows = [ROW_20Q.format(date, rev_str, 'Recent 10' if i <= 10 else 'Oldest 10')
+            for i, ((date, _), rev_str) in enumerate(zip(all_20_periods[:20], revenue_strs), 1)]
+    w("\n".join(rows))
+    w(SEP70)
+
+def render_share_count_growth(w, result):
+    """Write the halfway share count growth section of a main() report through w."""
+    growth_ratio, recent_sum, old_sum, recent_periods, old_periods, all_20_periods = result
+    w("")
+    w(f"5-YEAR HALFWAY SHARE COUNT GROWTH (Quarterly Data):")
+    w(f"  Formula: Sum of recent 10 quarters / Sum of oldest 10 quarters")
+    w(f"  Oldest 10 quarters: {old_periods[-1]} to {old_periods[0]}")
+    w(f"  Recent 10 quarters: {recent_periods[-1]} to {recent_periods[0]}")
+    w(f"  Sum of oldest 10 quarters: {format_shares(old_sum)} shares")
+    w(f"  Sum of recent 10 quarters: {format_shares(recent_sum)} shares")
+    w(f"  Growth Ratio: {growth_ratio:.4f}x")
+    w(f"  Growth Percentage: {(growth_ratio - 1) * 100:.2f}%")
+    if growth_ratio < 1.0:
+        w(f"  Note: Share count decreased (share buybacks exceeded issuances)")
+    elif growth_ratio > 1.0:
+        w(f"  Note: Share count increased (share issuances exceeded buybacks)")
+    else:
+        w(f"  Note: Share count remained stable")
+    w("")
+    w(f"  Share count for all 20 quarters (most recent first):")
+    w(SEP70)
+    w(HDR_SHARES_20Q)
+    w(SEP70)
+    # Quarters 1-10 are the recent group, 11-20 the oldest of the 20
+    rows = [ROW_SHARES_20Q.format(date, format_shares(shares), 'Recent 10' if i <= 10 else 'Oldest 10')
+            for i, (date, shares) in enumerate(all_20_periods[:20], 1)]
+    w("\n".join(rows))
+    w(SEP70)
+
+def render_growth_consistency(w, result):
+    """Write the consistency of growth section of a main() report through w."""
+    fmt = format_revenue
+    
+    stdev, avg_growth, growth_rates, quarters_with_growth = result
+    w("")
+    w(f"CONSISTENCY OF GROWTH (YoY Quarterly Revenue Growth):")
+    w(f"  Calculated standard deviation of year-over-year quarterly growth rates")
+    w(f"  Number of YoY comparisons: {len(growth_rates)}")
+    w(f"  Average YoY Growth: {avg_growth * 100:.2f}%")
+    w(f"  Standard Deviation: {stdev * 100:.2f}%")
+    w(f"  Coefficient of Variation: {(stdev / abs(avg_growth) * 100) if avg_growth != 0 else 'N/A':.2f}%")
+    w("")
+    w(f"  Year-over-Year Quarterly Growth Rates:")
+    w(SEP85)
+    w(HDR_YOY)
+    w(SEP85)
+    w("\n".join(
+        ROW_YOY.format(date, fmt(current_rev), prev_date or 'N/A',
+                       fmt(prev_rev) if prev_rev else 'N/A', yoy_growth * 100)
+        for date, current_rev, prev_date, prev_rev, yoy_growth in quarters_with_growth))
+    w(SEP85)
+
+def render_growth_acceleration(w, result):
+    """Write the acceleration of growth section of a main() report through w."""
+    fmt = format_revenue
+    
+    acceleration, growth1, growth2, sum1, sum2, sum3, all_21_periods = result
+    w("")
+    w(f"ACCELERATION OF GROWTH (Quarterly Revenue):")
+    w(f"  Using last 21 quarters split into 3 groups of 7 quarters each")
+    w("")
+    w(f"  Quarters 1-7 (oldest): {all_21_periods[0][0]} to {all_21_periods[6][0]}")
+    w(f"    Sum: {fmt(sum1)}")
+    w(f"  Quarters 8-14 (middle): {all_21_periods[7][0]} to {all_21_periods[13][0]}")
+    w(f"    Sum: {fmt(sum2)}")
+    w(f"  Quarters 15-21 (newest): {all_21_periods[14][0]} to {all_21_periods[20][0]}")
+    w(f"    Sum: {fmt(sum3)}")
+    w("")
+    w(f"  Halfway Growth 1 (sum2 / sum1): {growth1:.4f}x ({(growth1 - 1) * 100:.2f}%)")
+    w(f"  Halfway Growth 2 (sum3 / sum2): {growth2:.4f}x ({(growth2 - 1) * 100:.2f}%)")
+    w(f"  Acceleration (growth2 / growth1): {acceleration:.4f}x")
+    w("")
+    w(f"  Revenue for all 21 quarters (oldest to newest):")
+    w(SEP85)
+    w(HDR_REVENUE_21Q)
+    w(SEP85)
+    revenue_strs = format_revenues(rev for _, rev in all_21_periods[:21])
+    # Quarters 1-7 (oldest), 8-14 (middle) and 15-21 (newest)
+    groups = ('Quarters 1-7', 'Quarters 8-14', 'Quarters 15-21')
+    rows = [ROW_21Q.format(i, date, revenue_strs[i - 1], groups[(i - 1) // 7])
+            for i, (date, _) in enumerate(all_21_periods[:21], 1)]
+    w("\n".join(rows))
+    w(SEP85)
+
+def render_operating_margin_growth(w, result):
+    """Write the operating margin growth section of a main() report through w."""
+    fmt = format_revenue
+    
+    margin_growth, margin1, margin2, op_income_sum1, op_income_sum2, revenue_sum1, revenue_sum2, all_20_periods = result
+    w("")
+    w(f"OPERATING MARGIN GROWTH (Quarterly Data):")
+    w(f"  Using last 20 quarters split into 2 groups of 10 quarters each")
+    w("")
+    w(f"  Quarters 1-10 (oldest): {all_20_periods[0][0]} to {all_20_periods[9][0]}")
+    w(f"    Sum of Operating Income: {fmt(op_income_sum1)}")
+    w(f"    Sum of Revenue: {fmt(revenue_sum1)}")
+    w(f"    Operating Margin: {margin1 * 100:.2f}%")
+    w(f"  Quarters 11-20 (newest): {all_20_periods[10][0]} to {all_20_periods[19][0]}")
+    w(f"    Sum of Operating Income: {fmt(op_income_sum2)}")
+    w(f"    Sum of Revenue: {fmt(revenue_sum2)}")
+    w(f"    Operating Margin: {margin2 * 100:.2f}%")
+    w("")
+    w(f"  Operating Margin Growth (Margin 2 - Margin 1): {margin_growth * 100:.2f} percentage points")
+    w("")
+    w(f"  Revenue and Operating Income for all 20 quarters (oldest to newest):")
+    w(SEP100)
+    w(HDR_OP_MARGIN_20Q)
+    w(SEP100)
+    # Every quarter's margin and formatted amounts, worked out before the rows are formatted
+    margins = [(op_inc / rev * 100) if rev > 0 else 0 for _, rev, op_inc in all_20_periods[:20]]
+    revenue_strs = format_revenues(rev for _, rev, _ in all_20_periods[:20])
+    op_inc_strs = format_revenues(op_inc for _, _, op_inc in all_20_periods[:20])
+    # Quarters 1-10 (oldest) and 11-20 (newest)
+    row = ROW_Q.format
+    rows = [row(i, all_20_periods[i - 1][0], revenue_strs[i - 1], op_inc_strs[i - 1], margins[i - 1],
+                'Quarters 1-10' if i <= 10 else 'Quarters 11-20')
+            for i in range(1, 21)]
+    w("\n".join(rows))
+    w(SEP100)
+
+def render_gross_margin_growth(w, result):
+    """Write the gross margin growth section of a main() report through w."""
+    fmt = format_revenue
+    
+    margin_growth, margin1, margin2, gross_profit_sum1, gross_profit_sum2, revenue_sum1, revenue_sum2, all_20_periods = result
+    w("")
+    w(f"GROSS MARGIN GROWTH (Quarterly Data):")
+    w(f"  Using last 20 quarters split into 2 groups of 10 quarters each")
+    w("")
+    w(f"  Quarters 1-10 (oldest): {all_20_periods[0][0]} to {all_20_periods[9][0]}")
+    w(f"    Sum of Gross Profit: {fmt(gross_profit_sum1)}")
+    w(f"    Sum of Revenue: {fmt(revenue_sum1)}")
+    w(f"    Gross Margin: {margin1 * 100:.2f}%")
+    w(f"  Quarters 11-20 (newest): {all_20_periods[10][0]} to {all_20_periods[19][0]}")
+    w(f"    Sum of Gross Profit: {fmt(gross_profit_sum2)}")
+    w(f"    Sum of Revenue: {fmt(revenue_sum2)}")
+    w(f"    Gross Margin: {margin2 * 100:.2f}%")
+    w("")
+    w(f"  Gross Margin Growth (Margin 2 - Margin 1): {margin_growth * 100:.2f} percentage points")
+    w("")
+    w(f"  Revenue and Gross Profit for all 20 quarters (oldest to newest):")
+    w(SEP100)
+    w(HDR_GROSS_MARGIN_20Q)
+    w(SEP100)
+    # Every quarter's margin and formatted amounts, worked out before the rows are formatted
+    margins = [(gp / rev * 100) if rev > 0 else 0 for _, rev, gp in all_20_periods[:20]]
+    revenue_strs = format_revenues(rev for _, rev, _ in all_20_periods[:20])
+    gp_strs = format_revenues(gp for _, _, gp in all_20_periods[:20])
+    # Quarters 1-10 (oldest) and 11-20 (newest)
+    row = ROW_Q.format
+    rows = [row(i, all_20_periods[i - 1][0], revenue_strs[i - 1], gp_strs[i - 1], margins[i - 1],
+                'Quarters 1-10' if i <= 10 else 'Quarters 11-20')
+            for i in range(1, 21)]
+    w("\n".join(rows))
+    w(SEP100)
+
+def render_operating_margin_consistency(w, result):
+    """Write the operating margin consistency section of a main() report through w."""
+    fmt = format_revenue
+    
+    stdev, avg_margin, margins_with_data = result
+    w("")
+    w(f"OPERATING MARGIN CONSISTENCY (Most Recent 20 Quarters):")
+    w(f"  Calculated standard deviation of operating margins for 5 groups of 4 quarters each")
+    w(f"  Using the most recent 20 quarters, split into 5 groups")
+    w(f"  Number of groups: {len(margins_with_data)}")
+    w(f"  Average Operating Margin: {avg_margin * 100:.2f}%")
+    w(f"  Standard Deviation: {stdev * 100:.2f} percentage points")
+    w(f"  Coefficient of Variation: {(stdev / abs(avg_margin) * 100) if avg_margin != 0 else 'N/A':.2f}%")
+    w("")
+    w(f"  Operating Margin for each group (oldest to newest):")
+    w(SEP110)
+    w(HDR_OP_MARGIN_GROUP)
+    w(SEP110)
+    # Every group's quarter range (oldest to newest in the group) and deviation
+    # from the average, worked out before the rows are formatted
+    quarter_ranges = [f"{quarters_list[0][0]} to {quarters_list[-1][0]}"
+                      for *_, quarters_list in margins_with_data]
+    deviations = [(margin - avg_margin) * 100 for _, margin, *_ in margins_with_data]
+    row = ROW_GROUP.format
+    rows = [row(group_num, quarter_range, fmt(total_rev),
+                fmt(total_op_inc), margin * 100, deviation)
+            for (group_num, margin, total_rev, total_op_inc, _), quarter_range, deviation
+            in zip(margins_with_data, quarter_ranges, deviations)]
+    w("\n".join(rows))
+    w(SEP110)
+
+def render_gross_margin_consistency(w, result):
+    """Write the gross margin consistency section of a main() report through w."""
+    fmt = format_revenue
+    
+    stdev, avg_margin, margins_with_data = result
+    w("")
+    w(f"GROSS MARGIN CONSISTENCY (Most Recent 20 Quarters):")
+    w(f"  Calculated standard deviation of gross margins for 5 groups of 4 quarters each")
+    w(f"  Using the most recent 20 quarters, split into 5 groups")
+    w(f"  Number of groups: {len(margins_with_data)}")
+    w(f"  Average Gross Margin: {avg_margin * 100:.2f}%")
+    w(f"  Standard Deviation: {stdev * 100:.2f} percentage points")
+    w(f"  Coefficient of Variation: {(stdev / abs(avg_margin) * 100) if avg_margin != 0 else 'N/A':.2f}%")
+    w("")
+    w(f"  Gross Margin for each group (oldest to newest):")
+    w(SEP110)
+    w(HDR_GROSS_MARGIN_GROUP)
+    w(SEP110)
+    # Every group's quarter range (oldest to newest in the group) and deviation
+    # from the average, worked out before the rows are formatted
+    quarter_ranges = [f"{quarters_list[0][0]} to {quarters_list[-1][0]}"
+                      for *_, quarters_list in margins_with_data]
+    deviations = [(margin - avg_margin) * 100 for _, margin, *_ in margins_with_data]
+    row = ROW_GROUP.format
+    rows = [row(group_num, quarter_range, fmt(total_rev),
+                fmt(total_gross_profit), margin * 100, deviation)
+            for (group_num, margin, total_rev, total_gross_profit, _), quarter_range, deviation
+            in zip(margins_with_data, quarter_ranges, deviations)]
+    w("\n".join(rows))
+    w(SEP110)
+
+def render_ttm_ebit_ppe(w, result):
+    """Write the TTM EBIT/PPE section of a main() report through w."""
+    fmt = format_revenue
+    
+    ratio, ttm_ebit, ppe, most_recent_date, ttm_quarters = result
+    w("")
+    w(f"TTM EBIT/PPE (Return on Capital):")
+    w(f"  Trailing Twelve Months Operating Income / Property Plant & Equipment")
+    w(f"  This metric shows how efficiently a company uses its fixed assets")
+    w("")
+    w(f"  Most Recent Quarter (for PPE): {most_recent_date}")
+    w(f"  Property Plant & Equipment: {fmt(ppe)}")
+    w("")
+    w(f"  TTM Operating Income (sum of last 4 quarters): {fmt(ttm_ebit)}")
+    w(f"  TTM EBIT/PPE Ratio: {ratio:.4f} ({ratio * 100:.2f}%)")
+    w("")
+    w(f"  Quarters used for TTM calculation (most recent first):")
+    w(SEP70)
+    w(HDR_TTM)
+    w(SEP70)
+    w("\n".join(ROW_TTM.format(date, fmt(op_inc)) for date, op_inc in ttm_quarters))
+    w(SEP70)
+    w(ROW_TTM.format('TTM Total', fmt(ttm_ebit)))
+    w(SEP70)
+
+def render_net_debt_to_ttm_operating_income(w, result):
+    """Write the Net Debt to TTM Operating Income section of a main() report through w."""
+    fmt = format_revenue
+    
+    ratio, ttm_operating_income, net_debt, most_recent_date, ttm_quarters = result
+    w("")
+    w(f"NET DEBT TO TTM OPERATING INCOME:")
+    w(f"  Net Debt / Trailing Twelve Months Operating Income")
+    w(f"  This metric is lower the better (reflects debt burden relative to earnings)")
+    w("")
+    w(f"  Most Recent Quarter (for Net Debt): {most_recent_date}")
+    if net_debt >= 0:
+        w(f"  Net Debt: {fmt(net_debt)}")
+    else:
+        w(f"  Net Debt (cash position): {fmt(-net_debt)} (negative net debt means cash > debt)")
+    w("")
+    w(f"  TTM Operating Income (sum of last 4 quarters): {fmt(ttm_operating_income)}")
+    
+    # Explain the ratio based on the calculation
+    if ttm_operating_income <= 0:
+        w(f"  Ratio: {ratio:.2f} (assigned 1000 due to negative operating income)")
+        w(f"  Interpretation: Company has negative operating income, indicating poor profitability")
+    elif net_debt < 0:
+        w(f"  Ratio: {ratio:.4f} (negative ratio reflects cash position)")
+        w(f"  Interpretation: Company has net cash (cash > debt), which is excellent")
+    else:
+        w(f"  Ratio: {ratio:.4f}")
+        w(f"  Interpretation: Lower is better - indicates less debt relative to operating income")
+    
+    w("")
+    w(f"  Quarters used for TTM calculation (most recent first):")
+    w(SEP70)
+    w(HDR_TTM)
+    w(SEP70)
+    w("\n".join(ROW_TTM.format(date, fmt(op_inc)) for date, op_inc in ttm_quarters))
+    w(SEP70)
+    w(ROW_TTM.format('TTM Total', fmt(ttm_operating_income)))
+    w(SEP70)
+
+def render_total_past_return(w, result):
+    """Write the total past return section of a main() report through w."""
+    total_return, total_return_multiplier, initial_price, initial_date, final_price, final_date, final_shares, periods_with_data = result
+    w("")
+    w(f"TOTAL PAST RETURN (With Dividend Reinvestment):")
+    w(f"  Calculates total return from first available data point to most recent")
+    w(f"  Includes reinvested dividends along the way")
+    w("")
+    w(f"  Start Date: {initial_date}")
+    w(f"  Initial Price: ${initial_price:.2f}")
+    w(f"  Initial Investment: ${initial_price:.2f} (1 share)")
+    w("")
+    w(f"  End Date: {final_date}")
+    w(f"  Final Price: ${final_price:.2f}")
+    w(f"  Final Shares Owned: {final_shares:.6f} shares")
+    w(f"  Final Value: ${final_shares * final_price:.2f}")
+    w("")
+    w(f"  Total Return: {total_return * 100:.2f}%")
+    w(f"  Total Return Multiplier: {total_return_multiplier:.4f}x")
+    w(f"  Number of Periods: {len(periods_with_data)}")
+    w("")
+    # Show summary of first 5 and last 5 periods, plus key milestones
+    w(f"  Key Periods (first 5, last 5, and every 20th period):")
+    w(SEP120)
+    w(HDR_RETURN)
+    w(SEP120)
+    
+    # Rows are picked by index, without copying slices of the history
+    num_periods = len(periods_with_data)
+    
+    # Show first 5
+    rows = [ROW_RETURN.format(i + 1, *periods_with_data[i]) for i in range(min(5, num_periods))]
+    
+    # Show every 20th period (if there are more than 10 periods)
+    if num_periods > 10:
+        rows.append(ROW_RETURN_GAP)
+        for i in range(19, num_periods - 5, 20):
+            rows.append(ROW_RETURN.format(i + 1, *periods_with_data[i]))
+        rows.append(ROW_RETURN_GAP)
+    
+    # Show last 5, numbered from num_periods - 4
+    last_start = max(0, num_periods - 5)
+    rows += [ROW_RETURN.format(num_periods - 4 + i - last_start, *periods_with_data[i])
+             for i in range(last_start, num_periods)]
+    w("\n".join(rows))
+    
+    w(SEP120)
+
+# Detail sections of a main() report, in order: (metric key, renderer of
+# the calculator result, line written instead when there is no result)
+SECTIONS = (
+    ('revenue_5y_cagr', render_revenue_cagr,
+     "5-YEAR CAGR: Insufficient quarterly data (need at least 20 quarters)\n"),
+    ('revenue_5y_halfway_growth', render_halfway_growth,
+     "5-YEAR HALFWAY GROWTH: Insufficient quarterly data (need at least 20 quarters)"),
+    ('share_count_halfway_growth', render_share_count_growth,
+     "\n5-YEAR HALFWAY SHARE COUNT GROWTH: Insufficient quarterly data (need at least 20 quarters with share count)"),
+    ('revenue_growth_consistency', render_growth_consistency,
+     "\nCONSISTENCY OF GROWTH: Insufficient quarterly data (need at least 20 quarters for YoY comparisons)"),
+    ('revenue_growth_acceleration', render_growth_acceleration,
+     "\nACCELERATION OF GROWTH: Insufficient quarterly data (need at least 21 quarters)"),
+    ('operating_margin_growth', render_operating_margin_growth,
+     "\nOPERATING MARGIN GROWTH: Insufficient quarterly data (need at least 20 quarters with operating income)"),
+    ('gross_margin_growth', render_gross_margin_growth,
+     "\nGROSS MARGIN GROWTH: Insufficient quarterly data (need at least 20 quarters with gross profit)"),
+    ('operating_margin_consistency', render_operating_margin_consistency,
+     "\nOPERATING MARGIN CONSISTENCY: Insufficient quarterly data (need at least 20 quarters with operating income)"),
+    ('gross_margin_consistency', render_gross_margin_consistency,
+     "\nGROSS MARGIN CONSISTENCY: Insufficient quarterly data (need at least 20 quarters with gross profit)"),
+    ('ttm_ebit_ppe', render_ttm_ebit_ppe,
+     "\nTTM EBIT/PPE: Insufficient quarterly data (need at least 4 quarters with operating income and PPE)"),
+    ('net_debt_to_ttm_operating_income', render_net_debt_to_ttm_operating_income,
+     "\nNET DEBT TO TTM OPERATING INCOME: Insufficient quarterly data (need at least 4 quarters with operating income and net debt)"),
+    ('total_past_return', render_total_past_return,
+     "\nTOTAL PAST RETURN: Insufficient data (need at least 2 periods with price data)"),
+)
+
+def main(summary_only=False):
+    """
+    Main function to calculate revenue growth.
+    
+    Args:
+        summary_only: Print only the METRIC SUMMARY of each ticker, without
+            the detailed tables (--summary-only on the command line)
+    """
+    print(BANNER)
     print("5-Year Revenue Growth Calculator")
-    print("=" * 80)
+    print(BANNER)
     print()
     
     # Check if database exists
@@ -1226,547 +1871,37 @@ def main():
         
         print(f"\nFetching data for {ticker}...")
         
-        # Get ticker data
-        ticker_data = get_ticker_data(ticker)
+        # Get ticker data and calculate every metric from it
+        metrics = calculate_all_metrics(ticker)
         
-        if not ticker_data:
+        if not metrics:
             print(f"✗ No data found for {ticker}")
             print("  Make sure the ticker exists in the database.")
             continue
         
-        # Calculate 5-year growth
-        result = calculate_5y_revenue_growth(ticker_data)
-        
-        # Calculate 5-year halfway growth
-        halfway_result = calculate_5y_halfway_revenue_growth(ticker_data)
-        
-        # Calculate consistency of growth
-        consistency_result = calculate_consistency_of_growth(ticker_data)
-        
-        # Calculate acceleration of growth
-        acceleration_result = calculate_acceleration_of_growth(ticker_data)
-        
-        # Calculate operating margin growth
-        margin_growth_result = calculate_operating_margin_growth(ticker_data)
-        
-        # Calculate gross margin growth
-        gross_margin_growth_result = calculate_gross_margin_growth(ticker_data)
-        
-        # Calculate operating margin consistency
-        margin_consistency_result = calculate_operating_margin_consistency(ticker_data)
-        
-        # Calculate gross margin consistency
-        gross_margin_consistency_result = calculate_gross_margin_consistency(ticker_data)
-        
-        # Calculate TTM EBIT/PPE
-        ttm_ebit_ppe_result = calculate_ttm_ebit_ppe(ticker_data)
-        
-        # Calculate total past return with dividend reinvestment
-        total_return_result = calculate_total_past_return(ticker_data)
-        
-        # Calculate halfway share count growth
-        share_count_growth_result = calculate_halfway_share_count_growth(ticker_data)
-        
-        # Calculate Net Debt to TTM Operating Income
-        net_debt_ttm_result = calculate_net_debt_to_ttm_operating_income(ticker_data)
-        
-        if result is None and halfway_result is None and consistency_result is None and acceleration_result is None and margin_growth_result is None and gross_margin_growth_result is None and margin_consistency_result is None and gross_margin_consistency_result is None and ttm_ebit_ppe_result is None and total_return_result is None and share_count_growth_result is None and net_debt_ttm_result is None:
+        if all(metric_result is None for metric_result in metrics.values()):
             print(f"✗ Insufficient data to calculate revenue growth metrics for {ticker}")
             continue
         
-        # Display results
-        print()
-        print("=" * 80)
-        print(f"5-YEAR REVENUE GROWTH: {ticker}")
-        print("=" * 80)
-        print()
-        
-        # Display 5-year CAGR if available
-        if result:
-            growth_rate, current_rev_sum, old_rev_sum, current_periods, old_periods, years_diff = result
-            print(f"5-YEAR CAGR (Quarterly Data):")
-            print(f"  Using most recent 4 quarters vs 4 quarters from ~5 years ago")
-            print(f"  Period: {old_periods[-1]} to {old_periods[0]} → {current_periods[-1]} to {current_periods[0]}")
-            print(f"  Time period: {years_diff:.2f} years")
-            print(f"  Revenue (5 years ago, 4 quarters): {format_revenue(old_rev_sum)}")
-            print(f"  Revenue (most recent, 4 quarters): {format_revenue(current_rev_sum)}")
-            print(f"  CAGR: {growth_rate * 100:.2f}%")
-            print(f"  Total Growth: {((current_rev_sum / old_rev_sum) - 1) * 100:.2f}%")
-            print()
-            print(f"  Quarters used:")
-            print(f"    5 years ago: {old_periods[0]} to {old_periods[-1]}")
-            print(f"    Most recent: {current_periods[0]} to {current_periods[-1]}")
-            print()
-        else:
-            print("5-YEAR CAGR: Insufficient quarterly data (need at least 20 quarters)")
-            print()
-        
-        # Display 5-year halfway growth if available
-        if halfway_result:
-            growth_ratio, recent_sum, old_sum, recent_periods, old_periods, all_20_periods = halfway_result
-            print(f"5-YEAR HALFWAY GROWTH (Quarterly Data):")
-            print(f"  Formula: Sum of recent 10 quarters / Sum of oldest 10 quarters")
-            print(f"  Oldest 10 quarters: {old_periods[-1]} to {old_periods[0]}")
-            print(f"  Recent 10 quarters: {recent_periods[-1]} to {recent_periods[0]}")
-            print(f"  Sum of oldest 10 quarters: {format_revenue(old_sum)}")
-            print(f"  Sum of recent 10 quarters: {format_revenue(recent_sum)}")
-            print(f"  Growth Ratio: {growth_ratio:.2f}x")
-            print(f"  Growth Percentage: {(growth_ratio - 1) * 100:.2f}%")
-            print()
-            print(f"  Revenue for all 20 quarters (most recent first):")
-            print(f"  {'-' * 70}")
-            print(f"  {'Quarter':<12} {'Revenue':>15} {'Group':<10}")
-            print(f"  {'-' * 70}")
-            # Display quarters 1-10 (recent)
-            for i, (date, rev) in enumerate(all_20_periods[:10], 1):
-                print(f"  {date:<12} {format_revenue(rev):>15} {'Recent 10':<10}")
-            # Display quarters 11-20 (oldest of the 20)
-            for i, (date, rev) in enumerate(all_20_periods[10:20], 11):
-                print(f"  {date:<12} {format_revenue(rev):>15} {'Oldest 10':<10}")
-            print(f"  {'-' * 70}")
-        else:
-            print("5-YEAR HALFWAY GROWTH: Insufficient quarterly data (need at least 20 quarters)")
-        
-        # Display halfway share count growth if available
-        if share_count_growth_result:
-            growth_ratio, recent_sum, old_sum, recent_periods, old_periods, all_20_periods = share_count_growth_result
-            print()
-            print(f"5-YEAR HALFWAY SHARE COUNT GROWTH (Quarterly Data):")
-            print(f"  Formula: Sum of recent 10 quarters / Sum of oldest 10 quarters")
-            print(f"  Oldest 10 quarters: {old_periods[-1]} to {old_periods[0]}")
-            print(f"  Recent 10 quarters: {recent_periods[-1]} to {recent_periods[0]}")
-            print(f"  Sum of oldest 10 quarters: {format_shares(old_sum)} shares")
-            print(f"  Sum of recent 10 quarters: {format_shares(recent_sum)} shares")
-            print(f"  Growth Ratio: {growth_ratio:.4f}x")
-            print(f"  Growth Percentage: {(growth_ratio - 1) * 100:.2f}%")
-            if growth_ratio < 1.0:
-                print(f"  Note: Share count decreased (share buybacks exceeded issuances)")
-            elif growth_ratio > 1.0:
-                print(f"  Note: Share count increased (share issuances exceeded buybacks)")
-            else:
-                print(f"  Note: Share count remained stable")
-            print()
-            print(f"  Share count for all 20 quarters (most recent first):")
-            print(f"  {'-' * 70}")
-            print(f"  {'Quarter':<12} {'Share Count':>20} {'Group':<10}")
-            print(f"  {'-' * 70}")
-            # Display quarters 1-10 (recent)
-            for i, (date, shares) in enumerate(all_20_periods[:10], 1):
-                print(f"  {date:<12} {format_shares(shares):>20} {'Recent 10':<10}")
-            # Display quarters 11-20 (oldest of the 20)
-            for i, (date, shares) in enumerate(all_20_periods[10:20], 11):
-                print(f"  {date:<12} {format_shares(shares):>20} {'Oldest 10':<10}")
-            print(f"  {'-' * 70}")
-        else:
-            print()
-            print("5-YEAR HALFWAY SHARE COUNT GROWTH: Insufficient quarterly data (need at least 20 quarters with share count)")
-        
-        # Display consistency of growth if available
-        if consistency_result:
-            stdev, growth_rates, quarters_with_growth = consistency_result
-            avg_growth = statistics.mean(growth_rates)
-            print()
-            print(f"CONSISTENCY OF GROWTH (YoY Quarterly Revenue Growth):")
-            print(f"  Calculated standard deviation of year-over-year quarterly growth rates")
-            print(f"  Number of YoY comparisons: {len(growth_rates)}")
-            print(f"  Average YoY Growth: {avg_growth * 100:.2f}%")
-            print(f"  Standard Deviation: {stdev * 100:.2f}%")
-            print(f"  Coefficient of Variation: {(stdev / abs(avg_growth) * 100) if avg_growth != 0 else 'N/A':.2f}%")
-            print()
-            print(f"  Year-over-Year Quarterly Growth Rates:")
-            print(f"  {'-' * 85}")
-            print(f"  {'Quarter':<12} {'Revenue':>15} {'Prev Year':<12} {'Prev Revenue':>15} {'YoY Growth':>12}")
-            print(f"  {'-' * 85}")
-            for date, current_rev, prev_date, prev_rev, yoy_growth in quarters_with_growth:
-                print(f"  {date:<12} {format_revenue(current_rev):>15} {prev_date or 'N/A':<12} {format_revenue(prev_rev) if prev_rev else 'N/A':>15} {yoy_growth * 100:>11.2f}%")
-            print(f"  {'-' * 85}")
-        else:
-            print()
-            print("CONSISTENCY OF GROWTH: Insufficient quarterly data (need at least 20 quarters for YoY comparisons)")
-        
-        # Display acceleration of growth if available
-        if acceleration_result:
-            acceleration, growth1, growth2, sum1, sum2, sum3, all_21_periods = acceleration_result
-            print()
-            print(f"ACCELERATION OF GROWTH (Quarterly Revenue):")
-            print(f"  Using last 21 quarters split into 3 groups of 7 quarters each")
-            print()
-            print(f"  Quarters 1-7 (oldest): {all_21_periods[0][0]} to {all_21_periods[6][0]}")
-            print(f"    Sum: {format_revenue(sum1)}")
-            print(f"  Quarters 8-14 (middle): {all_21_periods[7][0]} to {all_21_periods[13][0]}")
-            print(f"    Sum: {format_revenue(sum2)}")
-            print(f"  Quarters 15-21 (newest): {all_21_periods[14][0]} to {all_21_periods[20][0]}")
-            print(f"    Sum: {format_revenue(sum3)}")
-            print()
-            print(f"  Halfway Growth 1 (sum2 / sum1): {growth1:.4f}x ({(growth1 - 1) * 100:.2f}%)")
-            print(f"  Halfway Growth 2 (sum3 / sum2): {growth2:.4f}x ({(growth2 - 1) * 100:.2f}%)")
-            print(f"  Acceleration (growth2 / growth1): {acceleration:.4f}x")
-            print()
-            print(f"  Revenue for all 21 quarters (oldest to newest):")
-            print(f"  {'-' * 85}")
-            print(f"  {'Quarter':<4} {'Date':<12} {'Revenue':>15} {'Group':<15}")
-            print(f"  {'-' * 85}")
-            # Quarters 1-7 (oldest)
-            for i, (date, rev) in enumerate(all_21_periods[:7], 1):
-                print(f"  {i:<4} {date:<12} {format_revenue(rev):>15} {'Quarters 1-7':<15}")
-            # Quarters 8-14 (middle)
-            for i, (date, rev) in enumerate(all_21_periods[7:14], 8):
-                print(f"  {i:<4} {date:<12} {format_revenue(rev):>15} {'Quarters 8-14':<15}")
-            # Quarters 15-21 (newest)
-            for i, (date, rev) in enumerate(all_21_periods[14:21], 15):
-                print(f"  {i:<4} {date:<12} {format_revenue(rev):>15} {'Quarters 15-21':<15}")
-            print(f"  {'-' * 85}")
-        else:
-            print()
-            print("ACCELERATION OF GROWTH: Insufficient quarterly data (need at least 21 quarters)")
-        
-        # Display operating margin growth if available
-        if margin_growth_result:
-            margin_growth, margin1, margin2, op_income_sum1, op_income_sum2, revenue_sum1, revenue_sum2, all_20_periods = margin_growth_result
-            print()
-            print(f"OPERATING MARGIN GROWTH (Quarterly Data):")
-            print(f"  Using last 20 quarters split into 2 groups of 10 quarters each")
-            print()
-            print(f"  Quarters 1-10 (oldest): {all_20_periods[0][0]} to {all_20_periods[9][0]}")
-            print(f"    Sum of Operating Income: {format_revenue(op_income_sum1)}")
-            print(f"    Sum of Revenue: {format_revenue(revenue_sum1)}")
-            print(f"    Operating Margin: {margin1 * 100:.2f}%")
-            print(f"  Quarters 11-20 (newest): {all_20_periods[10][0]} to {all_20_periods[19][0]}")
-            print(f"    Sum of Operating Income: {format_revenue(op_income_sum2)}")
-            print(f"    Sum of Revenue: {format_revenue(revenue_sum2)}")
-            print(f"    Operating Margin: {margin2 * 100:.2f}%")
-            print()
-            print(f"  Operating Margin Growth (Margin 2 - Margin 1): {margin_growth * 100:.2f} percentage points")
-            print()
-            print(f"  Revenue and Operating Income for all 20 quarters (oldest to newest):")
-            print(f"  {'-' * 100}")
-            print(f"  {'Quarter':<4} {'Date':<12} {'Revenue':>15} {'Op Income':>15} {'Margin':>12} {'Group':<15}")
-            print(f"  {'-' * 100}")
-            # Quarters 1-10 (oldest)
-            for i, (date, rev, op_inc) in enumerate(all_20_periods[:10], 1):
-                margin = (op_inc / rev * 100) if rev > 0 else 0
-                print(f"  {i:<4} {date:<12} {format_revenue(rev):>15} {format_revenue(op_inc):>15} {margin:>11.2f}% {'Quarters 1-10':<15}")
-            # Quarters 11-20 (newest)
-            for i, (date, rev, op_inc) in enumerate(all_20_periods[10:20], 11):
-                margin = (op_inc / rev * 100) if rev > 0 else 0
-                print(f"  {i:<4} {date:<12} {format_revenue(rev):>15} {format_revenue(op_inc):>15} {margin:>11.2f}% {'Quarters 11-20':<15}")
-            print(f"  {'-' * 100}")
-        else:
-            print()
-            print("OPERATING MARGIN GROWTH: Insufficient quarterly data (need at least 20 quarters with operating income)")
-        
-        # Display gross margin growth if available
-        if gross_margin_growth_result:
-            margin_growth, margin1, margin2, gross_profit_sum1, gross_profit_sum2, revenue_sum1, revenue_sum2, all_20_periods = gross_margin_growth_result
-            print()
-            print(f"GROSS MARGIN GROWTH (Quarterly Data):")
-            print(f"  Using last 20 quarters split into 2 groups of 10 quarters each")
-            print()
-            print(f"  Quarters 1-10 (oldest): {all_20_periods[0][0]} to {all_20_periods[9][0]}")
-            print(f"    Sum of Gross Profit: {format_revenue(gross_profit_sum1)}")
-            print(f"    Sum of Revenue: {format_revenue(revenue_sum1)}")
-            print(f"    Gross Margin: {margin1 * 100:.2f}%")
-            print(f"  Quarters 11-20 (newest): {all_20_periods[10][0]} to {all_20_periods[19][0]}")
-            print(f"    Sum of Gross Profit: {format_revenue(gross_profit_sum2)}")
-            print(f"    Sum of Revenue: {format_revenue(revenue_sum2)}")
-            print(f"    Gross Margin: {margin2 * 100:.2f}%")
-            print()
-            print(f"  Gross Margin Growth (Margin 2 - Margin 1): {margin_growth * 100:.2f} percentage points")
-            print()
-            print(f"  Revenue and Gross Profit for all 20 quarters (oldest to newest):")
-            print(f"  {'-' * 100}")
-            print(f"  {'Quarter':<4} {'Date':<12} {'Revenue':>15} {'Gross Profit':>15} {'Margin':>12} {'Group':<15}")
-            print(f"  {'-' * 100}")
-            # Quarters 1-10 (oldest)
-            for i, (date, rev, gp) in enumerate(all_20_periods[:10], 1):
-                margin = (gp / rev * 100) if rev > 0 else 0
-                print(f"  {i:<4} {date:<12} {format_revenue(rev):>15} {format_revenue(gp):>15} {margin:>11.2f}% {'Quarters 1-10':<15}")
-            # Quarters 11-20 (newest)
-            for i, (date, rev, gp) in enumerate(all_20_periods[10:20], 11):
-                margin = (gp / rev * 100) if rev > 0 else 0
-                print(f"  {i:<4} {date:<12} {format_revenue(rev):>15} {format_revenue(gp):>15} {margin:>11.2f}% {'Quarters 11-20':<15}")
-            print(f"  {'-' * 100}")
-        else:
-            print()
-            print("GROSS MARGIN GROWTH: Insufficient quarterly data (need at least 20 quarters with gross profit)")
-        
-        # Display operating margin consistency if available
-        if margin_consistency_result:
-            stdev, avg_margin, margins_with_data = margin_consistency_result
-            print()
-            print(f"OPERATING MARGIN CONSISTENCY (Most Recent 20 Quarters):")
-            print(f"  Calculated standard deviation of operating margins for 5 groups of 4 quarters each")
-            print(f"  Using the most recent 20 quarters, split into 5 groups")
-            print(f"  Number of groups: {len(margins_with_data)}")
-            print(f"  Average Operating Margin: {avg_margin * 100:.2f}%")
-            print(f"  Standard Deviation: {stdev * 100:.2f} percentage points")
-            print(f"  Coefficient of Variation: {(stdev / abs(avg_margin) * 100) if avg_margin != 0 else 'N/A':.2f}%")
-            print()
-            print(f"  Operating Margin for each group (oldest to newest):")
-            print(f"  {'-' * 110}")
-            print(f"  {'Group':<7} {'Quarters':<20} {'Revenue':>18} {'Op Income':>18} {'Margin':>12} {'Deviation':>12}")
-            print(f"  {'-' * 110}")
-            for group_num, margin, total_rev, total_op_inc, quarters_list in margins_with_data:
-                deviation = (margin - avg_margin) * 100
-                # Show quarter range (oldest to newest in group)
-                oldest_quarter = quarters_list[0][0]
-                newest_quarter = quarters_list[-1][0]
-                quarter_range = f"{oldest_quarter} to {newest_quarter}"
-                print(f"  {group_num:<7} {quarter_range:<20} {format_revenue(total_rev):>18} {format_revenue(total_op_inc):>18} {margin * 100:>11.2f}% {deviation:>+11.2f}pp")
-            print(f"  {'-' * 110}")
-        else:
-            print()
-            print("OPERATING MARGIN CONSISTENCY: Insufficient quarterly data (need at least 20 quarters with operating income)")
-        
-        # Display gross margin consistency if available
-        if gross_margin_consistency_result:
-            stdev, avg_margin, margins_with_data = gross_margin_consistency_result
-            print()
-            print(f"GROSS MARGIN CONSISTENCY (Most Recent 20 Quarters):")
-            print(f"  Calculated standard deviation of gross margins for 5 groups of 4 quarters each")
-            print(f"  Using the most recent 20 quarters, split into 5 groups")
-            print(f"  Number of groups: {len(margins_with_data)}")
-            print(f"  Average Gross Margin: {avg_margin * 100:.2f}%")
-            print(f"  Standard Deviation: {stdev * 100:.2f} percentage points")
-            print(f"  Coefficient of Variation: {(stdev / abs(avg_margin) * 100) if avg_margin != 0 else 'N/A':.2f}%")
-            print()
-            print(f"  Gross Margin for each group (oldest to newest):")
-            print(f"  {'-' * 110}")
-            print(f"  {'Group':<7} {'Quarters':<20} {'Revenue':>18} {'Gross Profit':>18} {'Margin':>12} {'Deviation':>12}")
-            print(f"  {'-' * 110}")
-            for group_num, margin, total_rev, total_gross_profit, quarters_list in margins_with_data:
-                deviation = (margin - avg_margin) * 100
-                # Show quarter range (oldest to newest in group)
-                oldest_quarter = quarters_list[0][0]
-                newest_quarter = quarters_list[-1][0]
-                quarter_range = f"{oldest_quarter} to {newest_quarter}"
-                print(f"  {group_num:<7} {quarter_range:<20} {format_revenue(total_rev):>18} {format_revenue(total_gross_profit):>18} {margin * 100:>11.2f}% {deviation:>+11.2f}pp")
-            print(f"  {'-' * 110}")
-        else:
-            print()
-            print("GROSS MARGIN CONSISTENCY: Insufficient quarterly data (need at least 20 quarters with gross profit)")
-        
-        # Display TTM EBIT/PPE if available
-        if ttm_ebit_ppe_result:
-            ratio, ttm_ebit, ppe, most_recent_date, ttm_quarters = ttm_ebit_ppe_result
-            print()
-            print(f"TTM EBIT/PPE (Return on Capital):")
-            print(f"  Trailing Twelve Months Operating Income / Property Plant & Equipment")
-            print(f"  This metric shows how efficiently a company uses its fixed assets")
-            print()
-            print(f"  Most Recent Quarter (for PPE): {most_recent_date}")
-            print(f"  Property Plant & Equipment: {format_revenue(ppe)}")
-            print()
-            print(f"  TTM Operating Income (sum of last 4 quarters): {format_revenue(ttm_ebit)}")
-            print(f"  TTM EBIT/PPE Ratio: {ratio:.4f} ({ratio * 100:.2f}%)")
-            print()
-            print(f"  Quarters used for TTM calculation (most recent first):")
-            print(f"  {'-' * 70}")
-            print(f"  {'Quarter':<12} {'Operating Income':>20}")
-            print(f"  {'-' * 70}")
-            for date, op_inc in ttm_quarters:
-                print(f"  {date:<12} {format_revenue(op_inc):>20}")
-            print(f"  {'-' * 70}")
-            print(f"  {'TTM Total':<12} {format_revenue(ttm_ebit):>20}")
-            print(f"  {'-' * 70}")
-        else:
-            print()
-            print("TTM EBIT/PPE: Insufficient quarterly data (need at least 4 quarters with operating income and PPE)")
-        
-        # Display Net Debt to TTM Operating Income if available
-        if net_debt_ttm_result:
-            ratio, ttm_operating_income, net_debt, most_recent_date, ttm_quarters = net_debt_ttm_result
-            print()
-            print(f"NET DEBT TO TTM OPERATING INCOME:")
-            print(f"  Net Debt / Trailing Twelve Months Operating Income")
-            print(f"  This metric is lower the better (reflects debt burden relative to earnings)")
-            print()
-            print(f"  Most Recent Quarter (for Net Debt): {most_recent_date}")
-            if net_debt >= 0:
-                print(f"  Net Debt: {format_revenue(net_debt)}")
-            else:
-                print(f"  Net Debt (cash position): {format_revenue(-net_debt)} (negative net debt means cash > debt)")
-            print()
-            print(f"  TTM Operating Income (sum of last 4 quarters): {format_revenue(ttm_operating_income)}")
-            
-            # Explain the ratio based on the calculation
-            if ttm_operating_income <= 0:
-                print(f"  Ratio: {ratio:.2f} (assigned 1000 due to negative operating income)")
-                print(f"  Interpretation: Company has negative operating income, indicating poor profitability")
-            elif net_debt < 0:
-                print(f"  Ratio: {ratio:.4f} (negative ratio reflects cash position)")
-                print(f"  Interpretation: Company has net cash (cash > debt), which is excellent")
-            else:
-                print(f"  Ratio: {ratio:.4f}")
-                print(f"  Interpretation: Lower is better - indicates less debt relative to operating income")
-            
-            print()
-            print(f"  Quarters used for TTM calculation (most recent first):")
-            print(f"  {'-' * 70}")
-            print(f"  {'Quarter':<12} {'Operating Income':>20}")
-            print(f"  {'-' * 70}")
-            for date, op_inc in ttm_quarters:
-                print(f"  {date:<12} {format_revenue(op_inc):>20}")
-            print(f"  {'-' * 70}")
-            print(f"  {'TTM Total':<12} {format_revenue(ttm_operating_income):>20}")
-            print(f"  {'-' * 70}")
-        else:
-            print()
-            print("NET DEBT TO TTM OPERATING INCOME: Insufficient quarterly data (need at least 4 quarters with operating income and net debt)")
-        
-        # Display total past return if available
-        if total_return_result:
-            total_return, total_return_multiplier, initial_price, initial_date, final_price, final_date, final_shares, periods_with_data = total_return_result
-            print()
-            print(f"TOTAL PAST RETURN (With Dividend Reinvestment):")
-            print(f"  Calculates total return from first available data point to most recent")
-            print(f"  Includes reinvested dividends along the way")
-            print()
-            print(f"  Start Date: {initial_date}")
-            print(f"  Initial Price: ${initial_price:.2f}")
-            print(f"  Initial Investment: ${initial_price:.2f} (1 share)")
-            print()
-            print(f"  End Date: {final_date}")
-            print(f"  Final Price: ${final_price:.2f}")
-            print(f"  Final Shares Owned: {final_shares:.6f} shares")
-            print(f"  Final Value: ${final_shares * final_price:.2f}")
-            print()
-            print(f"  Total Return: {total_return * 100:.2f}%")
-            print(f"  Total Return Multiplier: {total_return_multiplier:.4f}x")
-            print(f"  Number of Periods: {len(periods_with_data)}")
-            print()
-            # Show summary of first 5 and last 5 periods, plus key milestones
-            print(f"  Key Periods (first 5, last 5, and every 20th period):")
-            print(f"  {'-' * 120}")
-            print(f"  {'Period':<7} {'Date':<12} {'Price':>12} {'Div/Share':>12} {'Shares Before':>15} {'Div Received':>15} {'Shares Purchased':>18} {'Shares After':>15}")
-            print(f"  {'-' * 120}")
-            
-            # Show first 5
-            for i, (date, price, dividend, shares_before, div_received, shares_purchased, shares_after) in enumerate(periods_with_data[:5]):
-                print(f"  {i+1:<7} {date:<12} ${price:>11.2f} ${dividend:>11.4f} {shares_before:>15.6f} ${div_received:>14.2f} {shares_purchased:>18.6f} {shares_after:>15.6f}")
-            
-            # Show every 20th period (if there are more than 10 periods)
-            if len(periods_with_data) > 10:
-                print(f"  {'...':<7} {'...':<12} {'...':>12} {'...':>12} {'...':>15} {'...':>15} {'...':>18} {'...':>15}")
-                for i in range(19, len(periods_with_data) - 5, 20):
-                    date, price, dividend, shares_before, div_received, shares_purchased, shares_after = periods_with_data[i]
-                    print(f"  {i+1:<7} {date:<12} ${price:>11.2f} ${dividend:>11.4f} {shares_before:>15.6f} ${div_received:>14.2f} {shares_purchased:>18.6f} {shares_after:>15.6f}")
-                print(f"  {'...':<7} {'...':<12} {'...':>12} {'...':>12} {'...':>15} {'...':>15} {'...':>18} {'...':>15}")
-            
-            # Show last 5
-            for i, (date, price, dividend, shares_before, div_received, shares_purchased, shares_after) in enumerate(periods_with_data[-5:], len(periods_with_data) - 4):
-                print(f"  {i:<7} {date:<12} ${price:>11.2f} ${dividend:>11.4f} {shares_before:>15.6f} ${div_received:>14.2f} {shares_purchased:>18.6f} {shares_after:>15.6f}")
-            
-            print(f"  {'-' * 120}")
-        else:
-            print()
-            print("TOTAL PAST RETURN: Insufficient data (need at least 2 periods with price data)")
-        
-        # Display summary of all metrics (just final numbers)
-        print()
-        print("=" * 80)
-        print("METRIC SUMMARY")
-        print("=" * 80)
-        print()
-        
-        metrics_list = []
-        
-        # 5-Year CAGR
-        if result:
-            growth_rate, current_rev_sum, old_rev_sum, current_periods, old_periods, years_diff = result
-            metrics_list.append(f"5-Year CAGR: {growth_rate * 100:.2f}%")
-        else:
-            metrics_list.append("5-Year CAGR: N/A")
-        
-        # 5-Year Halfway Growth
-        if halfway_result:
-            growth_ratio, recent_sum, old_sum, recent_periods, old_periods, all_20_periods = halfway_result
-            metrics_list.append(f"5-Year Halfway Growth: {growth_ratio:.4f}x ({(growth_ratio - 1) * 100:.2f}%)")
-        else:
-            metrics_list.append("5-Year Halfway Growth: N/A")
-        
-        # 5-Year Halfway Share Count Growth
-        if share_count_growth_result:
-            growth_ratio, recent_sum, old_sum, recent_periods, old_periods, all_20_periods = share_count_growth_result
-            metrics_list.append(f"5-Year Halfway Share Count Growth: {growth_ratio:.4f}x ({(growth_ratio - 1) * 100:.2f}%)")
-        else:
-            metrics_list.append("5-Year Halfway Share Count Growth: N/A")
-        
-        # Consistency of Growth
-        if consistency_result:
-            stdev, growth_rates, quarters_with_growth = consistency_result
-            avg_growth = statistics.mean(growth_rates)
-            metrics_list.append(f"Consistency of Growth (YoY Stdev): {stdev * 100:.2f}% (Avg: {avg_growth * 100:.2f}%)")
-        else:
-            metrics_list.append("Consistency of Growth: N/A")
-        
-        # Acceleration of Growth
-        if acceleration_result:
-            acceleration, growth1, growth2, sum1, sum2, sum3, all_21_periods = acceleration_result
-            metrics_list.append(f"Acceleration of Growth: {acceleration:.4f}x")
-        else:
-            metrics_list.append("Acceleration of Growth: N/A")
-        
-        # Operating Margin Growth
-        if margin_growth_result:
-            margin_growth, margin1, margin2, op_income_sum1, op_income_sum2, revenue_sum1, revenue_sum2, all_20_periods = margin_growth_result
-            metrics_list.append(f"Operating Margin Growth: {margin_growth * 100:.2f} pp")
-        else:
-            metrics_list.append("Operating Margin Growth: N/A")
-        
-        # Gross Margin Growth
-        if gross_margin_growth_result:
-            margin_growth, margin1, margin2, gross_profit_sum1, gross_profit_sum2, revenue_sum1, revenue_sum2, all_20_periods = gross_margin_growth_result
-            metrics_list.append(f"Gross Margin Growth: {margin_growth * 100:.2f} pp")
-        else:
-            metrics_list.append("Gross Margin Growth: N/A")
-        
-        # Operating Margin Consistency
-        if margin_consistency_result:
-            stdev, avg_margin, margins_with_data = margin_consistency_result
-            metrics_list.append(f"Operating Margin Consistency (Stdev): {stdev * 100:.2f} pp")
-        else:
-            metrics_list.append("Operating Margin Consistency: N/A")
-        
-        # Gross Margin Consistency
-        if gross_margin_consistency_result:
-            stdev, avg_margin, margins_with_data = gross_margin_consistency_result
-            metrics_list.append(f"Gross Margin Consistency (Stdev): {stdev * 100:.2f} pp")
-        else:
-            metrics_list.append("Gross Margin Consistency: N/A")
-        
-        # TTM EBIT/PPE
-        if ttm_ebit_ppe_result:
-            ratio, ttm_ebit, ppe, most_recent_date, ttm_quarters = ttm_ebit_ppe_result
-            metrics_list.append(f"TTM EBIT/PPE: {ratio:.4f} ({ratio * 100:.2f}%)")
-        else:
-            metrics_list.append("TTM EBIT/PPE: N/A")
-        
-        # Net Debt to TTM Operating Income
-        if net_debt_ttm_result:
-            ratio, ttm_operating_income, net_debt, most_recent_date, ttm_quarters = net_debt_ttm_result
-            if ttm_operating_income <= 0:
-                metrics_list.append(f"Net Debt to TTM Operating Income: {ratio:.2f} (negative income)")
-            else:
-                metrics_list.append(f"Net Debt to TTM Operating Income: {ratio:.4f}")
-        else:
-            metrics_list.append("Net Debt to TTM Operating Income: N/A")
-        
-        # Total Past Return
-        if total_return_result:
-            total_return, total_return_multiplier, initial_price, initial_date, final_price, final_date, final_shares, periods_with_data = total_return_result
-            metrics_list.append(f"Total Past Return (with dividends): {total_return * 100:.2f}% ({total_return_multiplier:.4f}x)")
-        else:
-            metrics_list.append("Total Past Return: N/A")
-        
-        # Print all metrics
-        for i, metric in enumerate(metrics_list, 1):
-            print(f"{i}. {metric}")
+        # Detail sections of the report, one line per entry of out
+        out = []
+        w = out.append
+        if not summary_only:
+            for key, render, fallback in SECTIONS:
+                if metrics[key]:
+                    render(w, metrics[key])
+                else:
+                    w(fallback)
         
-        print()
-        print("=" * 80)
-        print()
+        # Write the report, ending with a summary of all metrics (just final numbers)
+        report = {
+            'banner': BANNER,
+            'ticker': ticker,
+            'details': "\n".join(out),
+            'summary': "\n".join(f"{i}. {metric}" for i, metric in enumerate(build_summary(metrics), 1)),
+        }
+        sys.stdout.write((SUMMARY_TPL if summary_only else REPORT_TPL).format_map(report))
 
 if __name__ == '__main__':
-    main()
+    main(summary_only='--summary-only' in sys.argv[1:])
 
@@ -7,11 +7,14 @@ across all years to identify seasonal patterns.
 import sqlite3
 import json
 import os
-import statistics
+import zlib
 
 # Database path
 QUICKFS_DB = os.path.join(os.path.dirname(__file__), "data.db")
 
+# Quarter numbers a year needs to count as complete
+ALL_QUARTERS = {1, 2, 3, 4}
+
 def get_ticker_data(ticker):
     """Get QuickFS data for a ticker from the database."""
     if not os.path.exists(QUICKFS_DB):
@@ -32,6 +35,9 @@ def get_ticker_data(ticker):
         row = cursor.fetchone()
         if row:
             data_json = row[0]
+            if isinstance(data_json, bytes):
+                # Saved zlib-compressed by get_data.py
+                data_json = zlib.decompress(data_json)
             return json.loads(data_json)
         else:
             return None
@@ -108,10 +114,8 @@ def calculate_seasonality(ticker_data):
     operating_incomes = quarterly_data.get('operating_income', [None] * len(revenues))
     
     # Filter out None values and get valid data (both revenue and operating income)
-    valid_data = []
-    for date, rev, op_inc in zip(dates, revenues, operating_incomes):
-        if rev is not None and rev > 0:
-            valid_data.append((date, rev, op_inc if op_inc is not None else None))
+    valid_data = [(date, rev, op_inc) for date, rev, op_inc in zip(dates, revenues, operating_incomes)
+                  if rev is not None and rev > 0]
     
     if len(valid_data) < 4:  # Need at least 4 quarters (1 year)
         return None
@@ -123,66 +127,52 @@ def calculate_seasonality(ticker_data):
         parsed = parse_quarter_from_date(date)
         if parsed:
             year, quarter = parsed
-            if year not in years_data:
-                years_data[year] = {}
-            years_data[year][quarter] = (date, rev, op_inc)
+            years_data.setdefault(year, {})[quarter] = (date, rev, op_inc)
     
     # Only keep years that have all 4 quarters
-    complete_years = {}
-    for year, quarters in years_data.items():
-        if len(quarters) == 4 and all(q in quarters for q in [1, 2, 3, 4]):
-            complete_years[year] = quarters
+    complete_years = {year: quarters for year, quarters in years_data.items()
+                      if quarters.keys() == ALL_QUARTERS}
     
     if len(complete_years) == 0:
         return None
     
-    # Now group by quarter across all complete years
-    quarters_data = {1: [], 2: [], 3: [], 4: []}  # Q1, Q2, Q3, Q4
-    
-    for year, quarters in complete_years.items():
-        for quarter in [1, 2, 3, 4]:
-            date, rev, op_inc = quarters[quarter]
-            quarters_data[quarter].append((year, date, rev, op_inc))
-    
-    # Calculate totals for each quarter (sum across all complete years)
+    # Calculate totals for each quarter (sum across all complete years);
+    # averages are taken from the totals
     revenue_quarter_totals = {}
     op_income_quarter_totals = {}
     seasonality = {}
     
-    for quarter in [1, 2, 3, 4]:
-        if len(quarters_data[quarter]) > 0:
-            revenues_for_quarter = [rev for _, _, rev, _ in quarters_data[quarter]]
-            op_incomes_for_quarter = [op_inc for _, _, _, op_inc in quarters_data[quarter] if op_inc is not None]
-            
-            total_revenue = sum(revenues_for_quarter)
-            avg_revenue = statistics.mean(revenues_for_quarter)
-            min_revenue = min(revenues_for_quarter)
-            max_revenue = max(revenues_for_quarter)
-            count = len(revenues_for_quarter)
-            
-            revenue_quarter_totals[quarter] = total_revenue
-            
-            # Operating income calculations (only if we have data)
-            total_op_income = sum(op_incomes_for_quarter) if op_incomes_for_quarter else None
-            avg_op_income = statistics.mean(op_incomes_for_quarter) if op_incomes_for_quarter else None
-            min_op_income = min(op_incomes_for_quarter) if op_incomes_for_quarter else None
-            max_op_income = max(op_incomes_for_quarter) if op_incomes_for_quarter else None
-            
-            if total_op_income is not None:
-                op_income_quarter_totals[quarter] = total_op_income
-            
-            seasonality[quarter] = {
-                'total_revenue': total_revenue,
-                'average_revenue': avg_revenue,
-                'min_revenue': min_revenue,
-                'max_revenue': max_revenue,
-                'count': count,
-                'data': quarters_data[quarter],
-                'total_op_income': total_op_income,
-                'average_op_income': avg_op_income,
-                'min_op_income': min_op_income,
-                'max_op_income': max_op_income,
-            }
+    for quarter in (1, 2, 3, 4):
+        quarter_data = [(year, *quarters[quarter]) for year, quarters in complete_years.items()]
+        revenues_for_quarter = [rev for _, _, rev, _ in quarter_data]
+        op_incomes_for_quarter = [op_inc for _, _, _, op_inc in quarter_data if op_inc is not None]
+        
+        count = len(revenues_for_quarter)
+        total_revenue = sum(revenues_for_quarter)
+        revenue_quarter_totals[quarter] = total_revenue
+        
+        # Operating income calculations (only if we have data)
+        if op_incomes_for_quarter:
+            total_op_income = sum(op_incomes_for_quarter)
+            avg_op_income = total_op_income / len(op_incomes_for_quarter)
+            min_op_income = min(op_incomes_for_quarter)
+            max_op_income = max(op_incomes_for_quarter)
+            op_income_quarter_totals[quarter] = total_op_income
+        else:
+            total_op_income = avg_op_income = min_op_income = max_op_income = None
+        
+        seasonality[quarter] = {
+            'total_revenue': total_revenue,
+            'average_revenue': total_revenue / count,
+            'min_revenue': min(revenues_for_quarter),
+            'max_revenue': max(revenues_for_quarter),
+            'count': count,
+            'data': quarter_data,
+            'total_op_income': total_op_income,
+            'average_op_income': avg_op_income,
+            'min_op_income': min_op_income,
+            'max_op_income': max_op_income,
+        }
     
     # Calculate grand totals
     revenue_grand_total = sum(revenue_quarter_totals.values())
@@ -40,7 +40,8 @@ def run_quickfs_calculations(skip_prompt=False):
             get_all_tickers,
             calculate_all_metrics_for_ticker,
             save_metrics,
-            METRICS_DB
+            METRICS_DB,
+            METRIC_INDEX
         )
         
         # Initialize database
@@ -117,8 +118,9 @@ def run_quickfs_calculations(skip_prompt=False):
             
             # Track failures
             failed_metrics = []
+            values = metrics['values']
             for metric_name in all_metric_names:
-                if metric_name not in metrics or metrics[metric_name] is None:
+                if values[METRIC_INDEX[metric_name]] is None:
                     failed_metrics.append(metric_name)
                     metric_failure_counts[metric_name] += 1
             
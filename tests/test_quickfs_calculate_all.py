@@ -10,6 +10,9 @@ import tempfile
 import shutil
 import sqlite3
 import json
+import io
+from multiprocessing import Pipe
+from unittest.mock import patch, Mock
 
 # Add parent directory to path
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -24,8 +27,14 @@ from calculate_all_metrics import (
     get_all_tickers,
     calculate_all_metrics_for_ticker,
     save_metrics,
+    run_batch,
+    batch_calculate,
+    handle_batch_request,
+    serve,
     QUICKFS_DB,
-    METRICS_DB
+    METRICS_DB,
+    METRIC_COLUMNS,
+    METRIC_INDEX
 )
 
 
@@ -97,6 +106,53 @@ class TestQuickFSCalculateAll(unittest.TestCase):
         
         self.assertTrue(table_exists)
     
+    def test_init_metrics_db_migrates_legacy_table(self):
+        """Test that a table with plain REAL metric columns is migrated to metrics_json."""
+        conn = sqlite3.connect(self.test_metrics_db)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE quickfs_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticker TEXT NOT NULL,
+                calculated_at TEXT NOT NULL,
+                revenue_5y_cagr REAL,
+                revenue_5y_halfway_growth REAL,
+                revenue_growth_consistency REAL,
+                revenue_growth_acceleration REAL,
+                operating_margin_growth REAL,
+                gross_margin_growth REAL,
+                operating_margin_consistency REAL,
+                gross_margin_consistency REAL,
+                share_count_halfway_growth REAL,
+                ttm_ebit_ppe REAL,
+                net_debt_to_ttm_operating_income REAL,
+                total_past_return REAL,
+                total_past_return_multiplier REAL,
+                error TEXT,
+                UNIQUE(ticker, calculated_at)
+            )
+        ''')
+        cursor.execute('''
+            INSERT INTO quickfs_metrics (id, ticker, calculated_at, revenue_5y_cagr, error)
+            VALUES (7, 'AAPL', '2024-01-01T00:00:00', 0.123456789012345678, 'Missing: ttm_ebit_ppe')
+        ''')
+        conn.commit()
+        conn.close()
+        
+        init_metrics_db()
+        
+        conn = sqlite3.connect(self.test_metrics_db)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, ticker, revenue_5y_cagr, ttm_ebit_ppe, error, metrics_json
+            FROM quickfs_metrics
+        ''')
+        row = cursor.fetchone()
+        conn.close()
+        
+        self.assertEqual(row[:5], (7, 'AAPL', 0.123456789012345678, None, 'Missing: ttm_ebit_ppe'))
+        self.assertEqual(json.loads(row[5])['revenue_5y_cagr'], 0.123456789012345678)
+    
     def test_get_all_tickers(self):
         """Test getting all tickers from database."""
         tickers = get_all_tickers()
@@ -123,10 +179,12 @@ class TestQuickFSCalculateAll(unittest.TestCase):
         init_metrics_db()
         
         # Create test metrics
+        values = [None] * len(METRIC_COLUMNS)
+        values[METRIC_INDEX['revenue_5y_cagr']] = 0.10
         test_metrics = {
             'ticker': 'AAPL',
             'calculated_at': '2024-01-01T00:00:00',
-            'revenue_5y_cagr': 0.10
+            'values': values
         }
         
         # Save metrics
@@ -147,6 +205,67 @@ class TestQuickFSCalculateAll(unittest.TestCase):
         
         self.assertIsNotNone(row)
     
+    def test_save_metrics_queryable_by_column(self):
+        """Test that values saved to metrics_json are readable through the metric columns."""
+        init_metrics_db()
+        
+        values = [None] * len(METRIC_COLUMNS)
+        values[METRIC_INDEX['revenue_5y_cagr']] = 0.10
+        values[METRIC_INDEX['total_past_return']] = float('nan')
+        test_metrics = {
+            'ticker': 'AAPL',
+            'calculated_at': '2024-01-01T00:00:00',
+            'values': values
+        }
+        
+        self.assertTrue(save_metrics(test_metrics))
+        
+        conn = sqlite3.connect(self.test_metrics_db)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT revenue_5y_cagr, gross_margin_growth, total_past_return
+            FROM quickfs_metrics WHERE ticker = 'AAPL'
+        ''')
+        row = cursor.fetchone()
+        conn.close()
+        
+        self.assertEqual(row, (0.10, None, None))
+    
+    def test_save_metrics_positional_values(self):
+        """Test saving metrics carried as a list ordered by METRIC_COLUMNS."""
+        init_metrics_db()
+        
+        values = [None] * len(METRIC_COLUMNS)
+        values[METRIC_INDEX['ttm_ebit_ppe']] = 1.5
+        test_metrics = {
+            'ticker': 'AAPL',
+            'calculated_at': '2024-01-01T00:00:00',
+            'values': values
+        }
+        
+        self.assertTrue(save_metrics(test_metrics))
+        
+        conn = sqlite3.connect(self.test_metrics_db)
+        cursor = conn.cursor()
+        cursor.execute("SELECT ttm_ebit_ppe, revenue_5y_cagr FROM quickfs_metrics WHERE ticker = 'AAPL'")
+        row = cursor.fetchone()
+        conn.close()
+        
+        self.assertEqual(row, (1.5, None))
+    
+    def test_save_metrics_requires_values(self):
+        """Test that metrics keyed by name without a values list are not saved."""
+        init_metrics_db()
+        
+        test_metrics = {
+            'ticker': 'AAPL',
+            'calculated_at': '2024-01-01T00:00:00',
+            'ttm_ebit_ppe': 1.5
+        }
+        
+        with patch('sys.stdout', new_callable=io.StringIO):
+            self.assertFalse(save_metrics(test_metrics))
+        
     def test_calculate_all_metrics_for_ticker_no_data(self):
         """Test calculate_all_metrics_for_ticker when ticker has no data (covers line 104)."""
         metrics, error = calculate_all_metrics_for_ticker('INVALID')
@@ -349,11 +468,196 @@ class TestQuickFSCalculateAll(unittest.TestCase):
         invalid_metrics = {
             'ticker': None,  # This might cause an error
             'calculated_at': '2024-01-01T00:00:00',
+            'values': [None] * len(METRIC_COLUMNS)
         }
         
         result = save_metrics(invalid_metrics)
         # Should handle error gracefully
         self.assertFalse(result)
+    
+    def test_run_batch(self):
+        """Test running a batch of tickers returns a summary and saves rows."""
+        init_metrics_db()
+        
+        with patch('sys.stdout', new_callable=io.StringIO):
+            summary = run_batch(['AAPL', 'INVALID'])
+        
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(summary['success'], 1)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['skipped'], 0)
+        self.assertEqual(summary['failures'], [])
+        
+        conn = sqlite3.connect(self.test_metrics_db)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM quickfs_metrics WHERE ticker = 'AAPL'")
+        count = cursor.fetchone()[0]
+        conn.close()
+        self.assertEqual(count, 1)
+    
+    def test_run_batch_reports_failed_metrics(self):
+        """Test that run_batch reports each ticker's failed metrics by name."""
+        init_metrics_db()
+        ticker_data = {'financials': {'quarterly': {'period_end_date': ['2024-12'], 'revenue': [100.0]}}}
+        
+        with patch('calculate_all_metrics.iter_ticker_data', return_value=iter([('TEST', ticker_data)])), \
+                patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+            summary = run_batch(['TEST'])
+        
+        self.assertEqual(len(summary['failures']), 1)
+        ticker, failed_metrics = summary['failures'][0]
+        self.assertEqual(ticker, 'TEST')
+        self.assertIn('revenue_5y_cagr', failed_metrics)
+        self.assertIn('total_past_return', failed_metrics)
+        self.assertIn('5-Year Revenue CAGR', mock_stdout.getvalue())
+    
+    def test_batch_calculate(self):
+        """Test batch_calculate yields results in ticker order, serially for small batches."""
+        with patch('calculate_all_metrics.ProcessPoolExecutor') as mock_executor:
+            results = list(batch_calculate(['AAPL', 'INVALID']))
+        
+        mock_executor.assert_not_called()
+        self.assertEqual([ticker for ticker, _, _ in results], ['AAPL', 'INVALID'])
+        self.assertEqual(results[0][1]['ticker'], 'AAPL')
+        self.assertIsNone(results[0][2])
+        self.assertIsNone(results[1][1])
+        self.assertIn('INVALID', results[1][2])
+    
+    def test_batch_calculate_parallel(self):
+        """Test large batches run in worker processes with the same results."""
+        tickers = ['AAPL', 'INVALID', 'AAPL']
+        serial = [(ticker, metrics and metrics['values'], error)
+                  for ticker, metrics, error in batch_calculate(tickers)]
+        
+        with patch('calculate_all_metrics.PARALLEL_MIN_TICKERS', 0), \
+                patch('calculate_all_metrics.PARALLEL_CHUNKSIZE', 1):
+            parallel = [(ticker, metrics and metrics['values'], error)
+                        for ticker, metrics, error in batch_calculate(tickers, max_workers=2)]
+        
+        self.assertEqual(parallel, serial)
+    
+    def test_handle_batch_request(self):
+        """Test that a served connection receives tickers and replies with the summary."""
+        init_metrics_db()
+        server_conn, client_conn = Pipe()
+        
+        client_conn.send(['AAPL'])
+        with patch('sys.stdout', new_callable=io.StringIO):
+            handle_batch_request(server_conn)
+        summary = client_conn.recv()
+        
+        self.assertEqual(summary['total'], 1)
+        self.assertEqual(summary['success'], 1)
+    
+    def test_handle_batch_request_error(self):
+        """Test that a failing batch is reported to the client instead of raised."""
+        server_conn, client_conn = Pipe()
+        
+        client_conn.send(['AAPL'])
+        with patch('calculate_all_metrics.run_batch', side_effect=RuntimeError('boom')), \
+                patch('sys.stdout', new_callable=io.StringIO):
+            handle_batch_request(server_conn)
+        
+        self.assertEqual(client_conn.recv(), {'error': 'boom'})
+    
+    def test_handle_batch_request_client_disconnected(self):
+        """Test that a client closing without sending is ignored."""
+        server_conn, client_conn = Pipe()
+        client_conn.close()
+        
+        with patch('calculate_all_metrics.run_batch') as mock_run_batch:
+            handle_batch_request(server_conn)
+        
+        mock_run_batch.assert_not_called()
+    
+    def test_handle_batch_request_rejects_non_list(self):
+        """Test that a payload that isn't a list of ticker strings is not run."""
+        for payload in ('AAPL', ['AAPL', 1], {'AAPL': 1}):
+            server_conn, client_conn = Pipe()
+            
+            client_conn.send(payload)
+            with patch('calculate_all_metrics.run_batch') as mock_run_batch, \
+                    patch('sys.stdout', new_callable=io.StringIO):
+                handle_batch_request(server_conn)
+            
+            mock_run_batch.assert_not_called()
+            self.assertEqual(client_conn.recv(), {'error': 'expected a list of ticker strings'})
+    
+    def test_handle_batch_request_client_gone_before_reply(self):
+        """Test that a client disconnecting before the reply is reported, not raised."""
+        conn = Mock()
+        conn.recv.return_value = ['AAPL']
+        conn.send.side_effect = BrokenPipeError('Broken pipe')
+        
+        with patch('calculate_all_metrics.run_batch', return_value={'total': 1}), \
+                patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            handle_batch_request(conn)
+        
+        self.assertIn('Client disconnected', stdout.getvalue())
+    
+    def test_serve_survives_wrong_authkey(self):
+        """Test that a client with the wrong key doesn't stop serve from answering later batches."""
+        import threading
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import Client, Listener
+        
+        listener = Listener(('localhost', 0), authkey=b'secret')
+        
+        def run_batch(tickers):
+            if tickers == ['STOP']:
+                raise KeyboardInterrupt
+            return {'total': len(tickers)}
+        
+        def run_server():
+            try:
+                serve(listener.address, b'secret')
+            except KeyboardInterrupt:
+                pass
+        
+        with patch('calculate_all_metrics.Listener', return_value=listener), \
+                patch('calculate_all_metrics.init_metrics_db'), \
+                patch('calculate_all_metrics.run_batch', side_effect=run_batch), \
+                patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            server = threading.Thread(target=run_server, daemon=True)
+            server.start()
+            
+            with self.assertRaises(AuthenticationError):
+                Client(listener.address, authkey=b'wrong')
+            
+            with Client(listener.address, authkey=b'secret') as client:
+                client.send(['AAPL', 'MSFT'])
+                self.assertEqual(client.recv(), {'total': 2})
+            
+            with Client(listener.address, authkey=b'secret') as client:
+                client.send(['STOP'])
+            server.join(timeout=5)
+        
+        self.assertFalse(server.is_alive())
+        self.assertIn('Rejected connection', stdout.getvalue())
+    
+    def test_serve_requires_authkey(self):
+        """Test that serve mode refuses to start without a configured key."""
+        with patch('calculate_all_metrics.SERVE_AUTHKEY', None), \
+                patch('calculate_all_metrics.Listener') as mock_listener, \
+                patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            with self.assertRaises(SystemExit) as cm:
+                serve()
+        
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn('QUICKFS_METRICS_AUTHKEY', stdout.getvalue())
+        mock_listener.assert_not_called()
+    
+    def test_serve_uses_configured_authkey(self):
+        """Test that serve listens with the key from QUICKFS_METRICS_AUTHKEY."""
+        with patch('calculate_all_metrics.SERVE_AUTHKEY', b'secret'), \
+                patch('calculate_all_metrics.init_metrics_db'), \
+                patch('calculate_all_metrics.Listener') as mock_listener, \
+                patch('sys.stdout', new_callable=io.StringIO):
+            mock_listener.return_value.__enter__.return_value.accept.side_effect = KeyboardInterrupt
+            with self.assertRaises(KeyboardInterrupt):
+                serve()
+        
+        self.assertEqual(mock_listener.call_args.kwargs['authkey'], b'secret')
 
 
 if __name__ == '__main__':
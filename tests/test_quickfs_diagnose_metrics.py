@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for quickfs/diagnose_metrics.py - ticker data caching for the diagnostic tool.
+"""
+
+import sys
+import os
+import unittest
+import tempfile
+import shutil
+import time
+from unittest.mock import patch
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+# Import directly from the quickfs folder
+quickfs_dir = os.path.join(parent_dir, 'quickfs')
+sys.path.insert(0, quickfs_dir)
+
+import get_one
+import diagnose_metrics
+from diagnose_metrics import (
+    get_quickfs_db_mtime,
+    load_diagnosis_ticker_data,
+    _load_ticker_data
+)
+
+
+class TestDiagnosisTickerDataCache(unittest.TestCase):
+    """Tests for the diagnostic tool's in-memory and on-disk ticker data caches."""
+    
+    def setUp(self):
+        """Point the caches at an empty directory and a stand-in database."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_db = os.path.join(self.test_dir, 'data.db')
+        self.cache_dir = os.path.join(self.test_dir, 'cache')
+        with open(self.test_db, 'w'):
+            pass
+        # Make the database older than any cache file written by the test
+        old = time.time() - 60
+        os.utime(self.test_db, (old, old))
+        
+        self.patches = [
+            patch.object(get_one, 'QUICKFS_DB', self.test_db),
+            patch.object(diagnose_metrics, 'CACHE_DIR', self.cache_dir),
+            patch.object(diagnose_metrics, 'get_ticker_data', return_value={'revenue': [1.0]}),
+        ]
+        for p in self.patches:
+            p.start()
+        self.mock_get_ticker_data = diagnose_metrics.get_ticker_data
+        _load_ticker_data.cache_clear()
+    
+    def tearDown(self):
+        """Clean up test fixtures."""
+        for p in self.patches:
+            p.stop()
+        _load_ticker_data.cache_clear()
+        shutil.rmtree(self.test_dir)
+    
+    def cache_file(self):
+        """Path of the single cache file written by the test."""
+        return os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+    
+    def test_fresh_cache_hit(self):
+        """Test that a fresh disk copy is used instead of reading the database."""
+        self.assertEqual(load_diagnosis_ticker_data('AAPL'), {'revenue': [1.0]})
+        
+        # In memory
+        self.assertEqual(load_diagnosis_ticker_data('AAPL'), {'revenue': [1.0]})
+        # On disk, as in a new process
+        _load_ticker_data.cache_clear()
+        self.assertEqual(load_diagnosis_ticker_data('AAPL'), {'revenue': [1.0]})
+        
+        self.assertEqual(self.mock_get_ticker_data.call_count, 1)
+    
+    def test_ttl_expiry(self):
+        """Test that a disk copy older than CACHE_TTL_SECONDS is reloaded."""
+        load_diagnosis_ticker_data('AAPL')
+        expired = time.time() - diagnose_metrics.CACHE_TTL_SECONDS - 1
+        os.utime(self.cache_file(), (expired, expired))
+        os.utime(self.test_db, (expired - 60, expired - 60))
+        _load_ticker_data.cache_clear()
+        
+        self.mock_get_ticker_data.return_value = {'revenue': [2.0]}
+        self.assertEqual(load_diagnosis_ticker_data('AAPL'), {'revenue': [2.0]})
+        self.assertEqual(self.mock_get_ticker_data.call_count, 2)
+    
+    def test_newer_database(self):
+        """Test that both caches are dropped when the database changes."""
+        load_diagnosis_ticker_data('AAPL')
+        os.utime(self.test_db, (time.time() + 60, time.time() + 60))
+        
+        self.mock_get_ticker_data.return_value = {'revenue': [2.0]}
+        self.assertEqual(load_diagnosis_ticker_data('AAPL'), {'revenue': [2.0]})
+        self.assertEqual(self.mock_get_ticker_data.call_count, 2)
+    
+    def test_newer_wal_file(self):
+        """Test that a commit only in the WAL file also drops both caches."""
+        load_diagnosis_ticker_data('AAPL')
+        wal = self.test_db + '-wal'
+        with open(wal, 'w'):
+            pass
+        os.utime(wal, (time.time() + 60, time.time() + 60))
+        
+        self.assertEqual(get_quickfs_db_mtime(), os.path.getmtime(wal))
+        self.mock_get_ticker_data.return_value = {'revenue': [2.0]}
+        self.assertEqual(load_diagnosis_ticker_data('AAPL'), {'revenue': [2.0]})
+        self.assertEqual(self.mock_get_ticker_data.call_count, 2)
+    
+    def test_missing_database(self):
+        """Test that a missing database has no mtime."""
+        os.remove(self.test_db)
+        self.assertIsNone(get_quickfs_db_mtime())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
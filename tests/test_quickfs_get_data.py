@@ -10,6 +10,7 @@ import tempfile
 import shutil
 import sqlite3
 import json
+import zlib
 
 # Add parent directory to path
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -26,6 +27,11 @@ from get_data import (
     format_ticker,
     save_quickfs_data,
     fetch_all_data_for_ticker_sdk,
+    QuickFSClient,
+    QuickFSAPIError,
+    TokenBucket,
+    CircuitBreaker,
+    process_ticker,
     QUICKFS_DB,
     TOP_TICKERS_DB
 )
@@ -65,6 +71,7 @@ class TestQuickFSGetData(unittest.TestCase):
     def tearDown(self):
         """Clean up test fixtures."""
         import get_data as get_data_module
+        get_data_module.close_write_connection()
         get_data_module.QUICKFS_DB = self.original_quickfs_path
         get_data_module.TOP_TICKERS_DB = self.original_top_tickers_path
         shutil.rmtree(self.test_dir)
@@ -94,6 +101,33 @@ class TestQuickFSGetData(unittest.TestCase):
         
         self.assertTrue(table_exists)
     
+    def test_init_quickfs_db_uses_wal(self):
+        """Test that the QuickFS database is switched to WAL mode."""
+        init_quickfs_db()
+        
+        conn = sqlite3.connect(self.test_quickfs_db)
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+        
+        self.assertEqual(journal_mode, 'wal')
+    
+    def test_latest_data_lookup_uses_index(self):
+        """Test get_one's latest-row query is an index search with no sort step."""
+        init_quickfs_db()
+        
+        conn = sqlite3.connect(self.test_quickfs_db)
+        plan = [row[3] for row in conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT data_json FROM quickfs_data 
+            WHERE ticker = ? AND data_type = 'full'
+            ORDER BY fetched_at DESC
+            LIMIT 1
+        ''', ('AAPL',))]
+        conn.close()
+        
+        self.assertTrue(any('USING INDEX' in step and 'ticker=? AND data_type=?' in step for step in plan), plan)
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+    
     def test_get_all_tickers(self):
         """Test getting all tickers from database."""
         tickers = get_all_tickers()
@@ -102,6 +136,37 @@ class TestQuickFSGetData(unittest.TestCase):
         self.assertIn('AAPL', tickers)
         self.assertIn('MSFT', tickers)
     
+    def test_get_stale_tickers(self):
+        """Test that tickers fetched within the cache TTL are skipped."""
+        from datetime import datetime, timedelta
+        from unittest.mock import patch
+        import get_data as get_data_module
+        init_quickfs_db()
+        
+        save_quickfs_data('AAPL', {'revenue': [1.0]})
+        old_fetched_at = (datetime.now() - timedelta(hours=48)).isoformat()
+        get_data_module.save_quickfs_rows([('MSFT', json.dumps({'revenue': [1.0]}), old_fetched_at)])
+        
+        self.assertEqual(get_data_module.get_stale_tickers(['AAPL', 'MSFT', 'GOOG'], ttl_hours=24), ['MSFT', 'GOOG'])
+        self.assertEqual(get_data_module.get_stale_tickers(['AAPL', 'MSFT', 'GOOG'], ttl_hours=72), ['GOOG'])
+        # A TTL of 0 re-fetches everything
+        with patch.object(get_data_module, 'CACHE_TTL_HOURS', 0):
+            self.assertEqual(get_data_module.get_stale_tickers(['AAPL', 'MSFT']), ['AAPL', 'MSFT'])
+    
+    def test_get_last_fetched_chunks(self):
+        """Test that get_last_fetched looks tickers up in chunks and skips unknown ones."""
+        from unittest.mock import patch
+        import get_data as get_data_module
+        init_quickfs_db()
+        
+        rows = [(f'T{i}', '{}', f'2024-01-{i + 1:02d}T00:00:00') for i in range(5)]
+        get_data_module.save_quickfs_rows(rows)
+        
+        with patch.object(get_data_module, 'SELECT_CHUNK_SIZE', 2):
+            last_fetched = get_data_module.get_last_fetched(['T0', 'T1', 'T2', 'T3', 'T4', 'NEW'])
+        
+        self.assertEqual(last_fetched, {ticker: fetched_at for ticker, _, fetched_at in rows})
+    
     def test_format_ticker(self):
         """Test ticker formatting."""
         # format_ticker adds :US suffix but doesn't uppercase
@@ -129,9 +194,160 @@ class TestQuickFSGetData(unittest.TestCase):
         conn.close()
         
         self.assertIsNotNone(row)
-        saved_data = json.loads(row[0])
+        saved_data = json.loads(zlib.decompress(row[0]))
         self.assertEqual(saved_data['revenue'], [100.0, 90.0])
     
+    def test_encode_quickfs_data(self):
+        """Test that encoded data decompresses to the same JSON with or without orjson."""
+        from unittest.mock import patch
+        import get_data as get_data_module
+        data = {'financials': {'quarterly': {'revenue': [1.5, None, 3]}}, 'name': 'Behçet'}
+        
+        for has_orjson in {False, get_data_module.HAS_ORJSON}:
+            with patch.object(get_data_module, 'HAS_ORJSON', has_orjson):
+                encoded = get_data_module.encode_quickfs_data(data)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(zlib.decompress(encoded)), data)
+    
+    def test_save_quickfs_data_updates_existing_row(self):
+        """Test that saving a ticker again updates its row instead of adding one."""
+        init_quickfs_db()
+        
+        save_quickfs_data('AAPL', {'revenue': [100.0]})
+        save_quickfs_data('AAPL', {'revenue': [200.0]})
+        
+        conn = sqlite3.connect(self.test_quickfs_db)
+        rows = conn.execute("SELECT data_json FROM quickfs_data WHERE ticker = 'AAPL'").fetchall()
+        conn.close()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(zlib.decompress(rows[0][0])), {'revenue': [200.0]})
+    
+    def test_init_quickfs_db_migrates_per_fetch_rows(self):
+        """Test that a table with a row per fetch is migrated to the latest row per ticker."""
+        conn = sqlite3.connect(self.test_quickfs_db)
+        conn.execute('''
+            CREATE TABLE quickfs_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticker TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                data_json TEXT NOT NULL,
+                fetched_at TEXT NOT NULL,
+                UNIQUE(ticker, data_type, fetched_at)
+            )
+        ''')
+        conn.executemany('''
+            INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at) VALUES (?, 'full', ?, ?)
+        ''', [
+            ('AAPL', '{"v": 2}', '2024-02-01T00:00:00'),
+            ('AAPL', '{"v": 1}', '2024-01-01T00:00:00'),
+            ('MSFT', '{"v": 3}', '2024-01-15T00:00:00'),
+        ])
+        conn.commit()
+        conn.close()
+        
+        init_quickfs_db()
+        save_quickfs_data('MSFT', {'v': 4})
+        
+        conn = sqlite3.connect(self.test_quickfs_db)
+        rows = conn.execute("SELECT ticker, data_json FROM quickfs_data ORDER BY ticker").fetchall()
+        conn.close()
+        self.assertEqual(rows[0], ('AAPL', '{"v": 2}'))
+        self.assertEqual(rows[1][0], 'MSFT')
+        self.assertEqual(json.loads(zlib.decompress(rows[1][1])), {'v': 4})
+    
+    def test_save_quickfs_rows_records_progress(self):
+        """Test that rows saved for a run are marked as completed for that run."""
+        import get_data as get_data_module
+        init_quickfs_db()
+        
+        get_data_module.save_quickfs_rows([('AAPL', '{}', '2024-01-01T00:00:00')], run_id='run-1')
+        get_data_module.save_quickfs_rows([('MSFT', '{}', '2024-01-01T00:00:00')], run_id='run-2')
+        get_data_module.save_quickfs_rows([('GOOG', '{}', '2024-01-01T00:00:00')])
+        
+        self.assertEqual(get_data_module.get_completed_tickers('run-1'), {'AAPL'})
+        self.assertEqual(get_data_module.get_completed_tickers('run-2'), {'MSFT'})
+        
+        # A later run takes over a ticker's progress row
+        get_data_module.save_quickfs_rows([('AAPL', '{}', '2024-01-02T00:00:00')], run_id='run-2')
+        self.assertEqual(get_data_module.get_completed_tickers('run-1'), set())
+        self.assertEqual(get_data_module.get_completed_tickers('run-2'), {'AAPL', 'MSFT'})
+    
+    def test_save_quickfs_rows_rolls_back_failed_batch(self):
+        """Test that a batch that fails partway saves none of its rows."""
+        import get_data as get_data_module
+        init_quickfs_db()
+        
+        # The NULL data_json violates NOT NULL after the first row is written
+        get_data_module.save_quickfs_rows([('AAPL', '{}', '2024-01-01T00:00:00'),
+                                           ('MSFT', None, '2024-01-01T00:00:00')], run_id='run-1')
+        get_data_module.save_quickfs_rows([('GOOG', '{}', '2024-01-01T00:00:00')], run_id='run-1')
+        
+        conn = sqlite3.connect(self.test_quickfs_db)
+        tickers = [row[0] for row in conn.execute("SELECT ticker FROM quickfs_data")]
+        conn.close()
+        self.assertEqual(tickers, ['GOOG'])
+        self.assertEqual(get_data_module.get_completed_tickers('run-1'), {'GOOG'})
+    
+    def test_write_quickfs_rows_reports_failed_batches(self):
+        """Test that the writer thread reports the tickers it failed to save."""
+        import queue
+        import get_data as get_data_module
+        init_quickfs_db()
+        
+        write_queue = queue.Queue()
+        for row in [('AAPL', '{}', '2024-01-01T00:00:00'), ('MSFT', None, '2024-01-01T00:00:00'), None]:
+            write_queue.put(row)
+        failed = set()
+        get_data_module.write_quickfs_rows(write_queue, 'run-1', failed)
+        
+        self.assertEqual(failed, {'AAPL', 'MSFT'})
+        self.assertEqual(get_data_module.get_completed_tickers('run-1'), set())
+        
+    def test_save_quickfs_data_shares_connection(self):
+        """Test that saves from several threads share one write connection."""
+        import threading
+        import get_data as get_data_module
+        init_quickfs_db()
+        
+        threads = [threading.Thread(target=save_quickfs_data, args=(f'T{i}', {'revenue': [float(i)]}))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        first_conn = get_data_module._write_conn
+        save_quickfs_data('AAPL', {'revenue': [1.0]})
+        
+        self.assertIs(get_data_module._write_conn, first_conn)
+        conn = sqlite3.connect(self.test_quickfs_db)
+        count = conn.execute("SELECT COUNT(*) FROM quickfs_data").fetchone()[0]
+        conn.close()
+        self.assertEqual(count, 9)
+    
+    def test_write_quickfs_rows(self):
+        """Test that the writer thread saves queued rows in batches."""
+        import queue
+        from unittest.mock import patch
+        import get_data as get_data_module
+        init_quickfs_db()
+        
+        write_queue = queue.Queue()
+        for i in range(5):
+            write_queue.put((f'T{i}', json.dumps({'revenue': [float(i)]}), '2024-01-01T00:00:00'))
+        write_queue.put(None)
+        
+        with patch.object(get_data_module, 'WRITE_BATCH_SIZE', 2), \
+             patch.object(get_data_module, 'save_quickfs_rows',
+                          wraps=get_data_module.save_quickfs_rows) as mock_save:
+            get_data_module.write_quickfs_rows(write_queue)
+        
+        self.assertEqual([len(call.args[0]) for call in mock_save.call_args_list], [2, 2, 1])
+        conn = sqlite3.connect(self.test_quickfs_db)
+        rows = conn.execute("SELECT ticker, data_json FROM quickfs_data ORDER BY ticker").fetchall()
+        conn.close()
+        self.assertEqual([ticker for ticker, _ in rows], ['T0', 'T1', 'T2', 'T3', 'T4'])
+        self.assertEqual(json.loads(rows[4][1]), {'revenue': [4.0]})
+    
     def test_get_all_tickers_no_db(self):
         """Test get_all_tickers when database doesn't exist (covers lines 95-96)."""
         import get_data as get_data_module
@@ -211,6 +427,87 @@ class TestQuickFSGetData(unittest.TestCase):
         finally:
             time.sleep = original_sleep
     
+    def test_fetch_all_data_for_ticker_sdk_retry_after(self):
+        """Test that a 429 retry waits for the response's Retry-After header."""
+        from unittest.mock import Mock, MagicMock, patch
+        import get_data as get_data_module
+        
+        mock_client = Mock()
+        mock_client.get_data_full = MagicMock(side_effect=[
+            QuickFSAPIError(429, 'Too Many Requests', {'Retry-After': '7'}),
+            {'data': 'test'}
+        ])
+        
+        with patch.object(get_data_module.time, 'sleep') as mock_sleep:
+            result = fetch_all_data_for_ticker_sdk('AAPL', mock_client)
+        
+        self.assertEqual(result, {'data': 'test'})
+        mock_sleep.assert_called_once_with(7.0)
+    
+    def test_fetch_all_data_for_ticker_sdk_transient_errors(self):
+        """Test that network errors and 5xx responses are retried with backoff."""
+        from unittest.mock import Mock, MagicMock, patch
+        import requests
+        import get_data as get_data_module
+        
+        mock_client = Mock()
+        mock_client.get_data_full = MagicMock(side_effect=[
+            requests.exceptions.ConnectionError('Connection reset'),
+            QuickFSAPIError(503, 'Service Unavailable'),
+            {'data': 'test'}
+        ])
+        
+        with patch.object(get_data_module.time, 'sleep') as mock_sleep:
+            result = fetch_all_data_for_ticker_sdk('AAPL', mock_client)
+        
+        self.assertEqual(result, {'data': 'test'})
+        self.assertEqual(mock_client.get_data_full.call_count, 3)
+        # Full jitter: each sleep is at most base * 2**attempt
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertLessEqual(delays[0], get_data_module.RETRY_BASE_DELAY)
+        self.assertLessEqual(delays[1], get_data_module.RETRY_BASE_DELAY * 2)
+    
+    def test_fetch_all_data_for_ticker_sdk_retries_exhausted(self):
+        """Test that a ticker is given up after max_retries transient errors."""
+        from unittest.mock import Mock, MagicMock, patch
+        import get_data as get_data_module
+        
+        mock_client = Mock()
+        mock_client.get_data_full = MagicMock(side_effect=QuickFSAPIError(500, 'Internal Server Error'))
+        
+        with patch.object(get_data_module.time, 'sleep'):
+            result = fetch_all_data_for_ticker_sdk('AAPL', mock_client)
+        
+        self.assertIsNone(result)
+        self.assertEqual(mock_client.get_data_full.call_count, get_data_module.MAX_RETRIES + 1)
+    
+    def test_get_retry_delay(self):
+        """Test Retry-After parsing, with RETRY_DELAY as the fallback."""
+        from email.utils import formatdate
+        import time
+        import get_data as get_data_module
+        
+        self.assertEqual(get_data_module.get_retry_delay(QuickFSAPIError(429, '', {'Retry-After': '12'})), 12.0)
+        http_date = formatdate(time.time() + 30, usegmt=True)
+        delay = get_data_module.get_retry_delay(QuickFSAPIError(429, '', {'Retry-After': http_date}))
+        self.assertTrue(25 <= delay <= 30)
+        self.assertEqual(get_data_module.get_retry_delay(QuickFSAPIError(429, '', {'Retry-After': 'soon'})),
+                         get_data_module.RETRY_DELAY)
+        self.assertEqual(get_data_module.get_retry_delay(Exception('429 Rate limit exceeded')),
+                         get_data_module.RETRY_DELAY)
+    
+    def test_token_bucket_hold(self):
+        """Test that a held TokenBucket gives out no tokens until the hold ends."""
+        import time
+        bucket = TokenBucket(rate=1000, capacity=5)
+        
+        bucket.hold(0.1)
+        start = time.monotonic()
+        bucket.acquire()
+        
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+    
     def test_fetch_all_data_for_ticker_sdk_unauthorized(self):
         """Test fetch_all_data_for_ticker_sdk with unauthorized error (covers lines 147-149)."""
         from unittest.mock import Mock, MagicMock
@@ -224,6 +521,73 @@ class TestQuickFSGetData(unittest.TestCase):
         # Should return None for unauthorized
         self.assertIsNone(result)
     
+    def test_fetch_all_data_for_ticker_sdk_status_404(self):
+        """Test that a 404 response is an answered request for a missing ticker."""
+        from unittest.mock import Mock, MagicMock
+        
+        mock_client = Mock()
+        mock_client.get_data_full = MagicMock(side_effect=QuickFSAPIError(404, 'Gone'))
+        breaker = Mock()
+        
+        self.assertIsNone(fetch_all_data_for_ticker_sdk('INVALID', mock_client, breaker=breaker))
+        
+        mock_client.get_data_full.assert_called_once()
+        breaker.record_result.assert_called_once_with(True)
+    
+    def test_fetch_all_data_for_ticker_sdk_status_429(self):
+        """Test that a 429 response is retried after backing off, whatever its reason text."""
+        from unittest.mock import Mock, MagicMock, patch
+        import get_data as get_data_module
+        
+        mock_client = Mock()
+        mock_client.get_data_full = MagicMock(side_effect=[QuickFSAPIError(429, 'Slow Down'), {'data': 'test'}])
+        concurrency = Mock()
+        
+        with patch.object(get_data_module.time, 'sleep') as mock_sleep:
+            result = fetch_all_data_for_ticker_sdk('AAPL', mock_client, concurrency=concurrency)
+        
+        self.assertEqual(result, {'data': 'test'})
+        concurrency.record_rate_limit.assert_called_once()
+        mock_sleep.assert_called_once_with(get_data_module.RETRY_DELAY)
+    
+    def test_fetch_all_data_for_ticker_sdk_status_401(self):
+        """Test that a 401 response is reported as an authentication error."""
+        from unittest.mock import Mock, MagicMock, patch
+        import get_data as get_data_module
+        
+        mock_client = Mock()
+        mock_client.get_data_full = MagicMock(side_effect=QuickFSAPIError(401, 'Denied'))
+        breaker = Mock()
+        
+        with patch.object(get_data_module.logger, 'warning') as mock_warning:
+            self.assertIsNone(fetch_all_data_for_ticker_sdk('AAPL', mock_client, breaker=breaker))
+        
+        mock_client.get_data_full.assert_called_once()
+        self.assertIn('Authentication error', mock_warning.call_args.args[0])
+        breaker.record_result.assert_called_once_with(False)
+    
+    def test_fetch_all_data_for_ticker_sdk_status_not_in_message(self):
+        """Test that status-like numbers in an error's text don't pick the handling."""
+        from unittest.mock import Mock, MagicMock, patch
+        import requests
+        import get_data as get_data_module
+        
+        for error in (QuickFSAPIError(403, 'Forbidden after 429 requests'),
+                      requests.exceptions.InvalidURL('Invalid port: 404')):
+            mock_client = Mock()
+            mock_client.get_data_full = MagicMock(side_effect=error)
+            breaker = Mock()
+            concurrency = Mock()
+            
+            with patch.object(get_data_module.time, 'sleep') as mock_sleep:
+                result = fetch_all_data_for_ticker_sdk('AAPL', mock_client, breaker=breaker, concurrency=concurrency)
+            
+            self.assertIsNone(result)
+            mock_client.get_data_full.assert_called_once()
+            mock_sleep.assert_not_called()
+            concurrency.record_rate_limit.assert_not_called()
+            breaker.record_result.assert_called_once_with(False)
+    
     def test_fetch_all_data_for_ticker_sdk_general_error(self):
         """Test fetch_all_data_for_ticker_sdk with general error (covers lines 150-152)."""
         from unittest.mock import Mock, MagicMock
@@ -237,6 +601,199 @@ class TestQuickFSGetData(unittest.TestCase):
         # Should return None on error
         self.assertIsNone(result)
     
+    def test_quickfs_client_get_data_full(self):
+        """Test QuickFSClient.get_data_full returns the response's data."""
+        from unittest.mock import Mock
+        
+        client = QuickFSClient('test-key', api_base='https://api.example.com/v1/')
+        client.session.get = Mock(return_value=Mock(status_code=200, json=lambda: {'data': {'revenue': [1.0]}}))
+        
+        result = client.get_data_full('AAPL:US')
+        
+        self.assertEqual(result, {'revenue': [1.0]})
+        self.assertEqual(client.session.headers['X-QFS-API-Key'], 'test-key')
+        client.session.get.assert_called_once_with('https://api.example.com/v1/data/all-data/AAPL:US',
+                                                   timeout=client.timeout)
+    
+    def test_quickfs_client_connection_pool(self):
+        """Test that QuickFSClient keeps a connection pool sized for the fetch threads."""
+        client = QuickFSClient('test-key', api_base='https://api.example.com/v1', pool_size=12)
+        
+        adapter = client.session.get_adapter('https://api.example.com/v1/data/all-data/AAPL:US')
+        
+        self.assertEqual(adapter._pool_maxsize, 12)
+        self.assertTrue(adapter._pool_block)
+    
+    def test_quickfs_client_error_status(self):
+        """Test QuickFSClient raises QuickFSAPIError with the status code for non-200 responses."""
+        from unittest.mock import Mock
+        
+        client = QuickFSClient('test-key')
+        client.session.get = Mock(return_value=Mock(status_code=404, reason='Not Found', headers={}))
+        
+        with self.assertRaises(QuickFSAPIError) as ctx:
+            client.get_data_full('INVALID:US')
+        self.assertEqual(ctx.exception.status_code, 404)
+        self.assertIn('404', str(ctx.exception))
+        
+        # fetch_all_data_for_ticker_sdk treats the 404 as a missing ticker
+        self.assertIsNone(fetch_all_data_for_ticker_sdk('INVALID', client))
+    
+    def test_token_bucket(self):
+        """Test that TokenBucket allows a burst of `capacity` and then paces to `rate`."""
+        import time
+        bucket = TokenBucket(rate=50, capacity=3)
+        
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        burst_time = time.monotonic() - start
+        for _ in range(5):
+            bucket.acquire()
+        paced_time = time.monotonic() - start
+        
+        self.assertLess(burst_time, 0.05)
+        # 5 more tokens at 50 per second take at least 0.1 seconds
+        self.assertGreaterEqual(paced_time, 0.09)
+    
+    def test_circuit_breaker(self):
+        """Test CircuitBreaker opens after repeated failures and closes after a successful probe."""
+        from unittest.mock import patch
+        import get_data as get_data_module
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        
+        with patch.object(get_data_module.time, 'monotonic', return_value=100.0):
+            for _ in range(3):
+                self.assertTrue(breaker.allow_request())
+                breaker.record_result(False)
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            self.assertFalse(breaker.allow_request())
+        
+        with patch.object(get_data_module.time, 'monotonic', return_value=131.0):
+            # One probe after reset_timeout; other requests wait for its result
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())
+            breaker.record_result(True)
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+            self.assertTrue(breaker.allow_request())
+    
+    def test_process_ticker_shared_fetch_not_saved_again(self):
+        """Test that a ticker whose data came from another thread's fetch is not saved twice."""
+        from unittest.mock import Mock, patch
+        import get_data as get_data_module
+        
+        with patch.object(get_data_module, 'coalesce_fetch', return_value=({'revenue': [1.0]}, False)), \
+             patch.object(get_data_module, 'save_quickfs_data') as mock_save:
+            result = process_ticker('AAPL', Mock())
+        
+        self.assertEqual(result, ('AAPL', True, None))
+        mock_save.assert_not_called()
+    
+    def test_coalesce_fetch(self):
+        """Test that a fetch already in progress is shared instead of repeated."""
+        import threading
+        import time
+        import get_data as get_data_module
+        
+        release = threading.Event()
+        calls = []
+        
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'revenue': [1.0]}
+        
+        results = []
+        owner = threading.Thread(target=lambda: results.append(get_data_module.coalesce_fetch('AAPL', fetch)))
+        owner.start()
+        while 'AAPL:US' not in get_data_module._inflight:
+            time.sleep(0.001)
+        waiter = threading.Thread(target=lambda: results.append(get_data_module.coalesce_fetch('AAPL', fetch)))
+        waiter.start()
+        # Give the waiter time to find the fetch in progress
+        time.sleep(0.1)
+        release.set()
+        owner.join()
+        waiter.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(fetched_here for _, fetched_here in results), [False, True])
+        self.assertTrue(all(result == {'revenue': [1.0]} for result, _ in results))
+        self.assertEqual(get_data_module._inflight, {})
+    
+    def test_process_ticker_circuit_open(self):
+        """Test that process_ticker skips the request while the circuit breaker is open."""
+        from unittest.mock import Mock
+        
+        mock_client = Mock()
+        breaker = CircuitBreaker(failure_threshold=2)
+        for _ in range(2):
+            process_ticker('AAPL', Mock(get_data_full=Mock(side_effect=Exception('401 Unauthorized'))),
+                           breaker=breaker)
+        
+        ticker, success, error_msg = process_ticker('MSFT', mock_client, breaker=breaker)
+        
+        self.assertEqual((ticker, success), ('MSFT', False))
+        self.assertIn('circuit breaker', error_msg)
+        mock_client.get_data_full.assert_not_called()
+    
+    def test_progress_log(self):
+        """Test that log messages from any thread are printed by the progress log listener."""
+        import io
+        import threading
+        from unittest.mock import patch
+        import get_data as get_data_module
+        
+        output = io.StringIO()
+        with patch('sys.stdout', output):
+            listener = get_data_module.start_progress_log()
+            thread = threading.Thread(target=get_data_module.logger.warning, args=('  Error fetching data for AAPL',))
+            thread.start()
+            thread.join()
+            get_data_module.logger.info('[1/1] AAPL: ✗ No data found')
+            get_data_module.stop_progress_log(listener)
+        
+        self.assertEqual(output.getvalue(), '  Error fetching data for AAPL\n[1/1] AAPL: ✗ No data found\n')
+        self.assertEqual(get_data_module.logger.handlers, [])
+    
+    def test_adaptive_concurrency(self):
+        """Test AdaptiveConcurrency doubles after a run of successes and halves on rate limits."""
+        from get_data import AdaptiveConcurrency
+        concurrency = AdaptiveConcurrency(max_limit=5, initial=1, increase_after=2)
+        
+        for expected_limit in [1, 2, 4, 5]:
+            self.assertEqual(concurrency.limit, expected_limit)
+            for _ in range(2):
+                concurrency.acquire()
+                concurrency.release()
+        self.assertEqual(concurrency.limit, 5)
+        
+        concurrency.acquire()
+        concurrency.record_rate_limit()
+        concurrency.release()
+        self.assertEqual(concurrency.limit, 2)
+        # The rate-limited request's release didn't count towards the next increase
+        concurrency.acquire()
+        concurrency.release()
+        self.assertEqual(concurrency.limit, 2)
+        self.assertEqual(concurrency.active, 0)
+    
+    def test_adaptive_concurrency_blocks_at_limit(self):
+        """Test that AdaptiveConcurrency.acquire waits while the limit is in use."""
+        import threading
+        from get_data import AdaptiveConcurrency
+        concurrency = AdaptiveConcurrency(max_limit=5, initial=1)
+        
+        concurrency.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (concurrency.acquire(), acquired.set()))
+        thread.start()
+        
+        self.assertFalse(acquired.wait(0.05))
+        concurrency.release()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+    
     def test_save_quickfs_data_error_handling(self):
         """Test save_quickfs_data error handling (covers lines 171-173)."""
         # Initialize DB first
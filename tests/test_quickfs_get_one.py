@@ -11,6 +11,8 @@ import tempfile
 import shutil
 import sqlite3
 import json
+import io
+from unittest.mock import patch
 
 # Add parent directory to path
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,7 +25,13 @@ sys.path.insert(0, quickfs_dir)
 from get_one import (
     get_previous_quarter,
     get_consecutive_quarters,
+    get_cached_consecutive_quarters,
+    get_consecutive_quarters_multi,
+    get_margin_frame,
+    prepare_quarterly_bundle,
     get_ticker_data,
+    get_cached_ticker_data,
+    iter_ticker_data,
     calculate_5y_revenue_growth,
     calculate_5y_halfway_revenue_growth,
     calculate_halfway_share_count_growth,
@@ -36,6 +44,13 @@ from get_one import (
     calculate_ttm_ebit_ppe,
     calculate_net_debt_to_ttm_operating_income,
     calculate_total_past_return,
+    calculate_all_metrics,
+    run_all,
+    format_revenue,
+    format_revenues,
+    build_summary,
+    main,
+    METRIC_CALCULATORS,
     QUICKFS_DB
 )
 
@@ -71,6 +86,7 @@ class TestQuickFSGetOne(unittest.TestCase):
     def tearDown(self):
         """Clean up test fixtures."""
         import get_one as quickfs_module
+        quickfs_module.close_read_connection()
         quickfs_module.QUICKFS_DB = self.original_path
         shutil.rmtree(self.test_dir)
     
@@ -128,6 +144,18 @@ class TestQuickFSGetOne(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(len(result), 2)  # 2024-12, 2024-09
     
+    def test_get_consecutive_quarters_across_year_boundary(self):
+        """Test consecutive quarters run across a year boundary and stop at a gap."""
+        quarterly_data = {
+            'period_end_date': ['2022-09', '2023-03', '2023-06', '2023-12', '2024-03'],
+            'revenue': [60.0, 70.0, 80.0, 90.0, 100.0]
+        }
+        
+        result = get_consecutive_quarters(quarterly_data, 'revenue', 1)
+        
+        # 2024-03 -> 2023-12 crosses the year; 2023-09 is missing
+        self.assertEqual(result, [('2024-03', 100.0), ('2023-12', 90.0)])
+    
     def test_get_consecutive_quarters_insufficient_data(self):
         """Test get_consecutive_quarters with insufficient data."""
         quarterly_data = {
@@ -140,6 +168,183 @@ class TestQuickFSGetOne(unittest.TestCase):
         # Should return None if insufficient consecutive quarters
         self.assertIsNone(result)
     
+    def test_get_cached_consecutive_quarters(self):
+        """Test the consecutive run is computed once and shared across calls."""
+        quarterly_data = {
+            'period_end_date': ['2024-06', '2024-09', '2024-12'],
+            'revenue': [80.0, 90.0, 100.0]
+        }
+        
+        run = get_cached_consecutive_quarters(quarterly_data, 'revenue')
+        self.assertEqual(run, [('2024-12', 100.0), ('2024-09', 90.0), ('2024-06', 80.0)])
+        self.assertIs(get_cached_consecutive_quarters(quarterly_data, 'revenue'), run)
+        self.assertIs(get_consecutive_quarters(quarterly_data, 'revenue', 3), run)
+        self.assertIsNone(get_consecutive_quarters(quarterly_data, 'revenue', 4))
+        
+        # Replacing a field's list recomputes its run
+        quarterly_data['revenue'] = [None, 90.0, 100.0]
+        self.assertEqual(get_cached_consecutive_quarters(quarterly_data, 'revenue'),
+                         [('2024-12', 100.0), ('2024-09', 90.0)])
+        self.assertEqual(get_cached_consecutive_quarters(quarterly_data, 'missing'), [])
+    
+    def test_get_consecutive_quarters_positive_only(self):
+        """Test positive_only drops non-positive quarters without ending the run."""
+        quarterly_data = {
+            'period_end_date': ['2023-12', '2024-03', '2024-06', '2024-09', '2024-12'],
+            'revenue': [60.0, 70.0, -5.0, 90.0, 100.0]
+        }
+        
+        result = get_consecutive_quarters(quarterly_data, 'revenue', 4, positive_only=True)
+        self.assertEqual(result, [('2024-12', 100.0), ('2024-09', 90.0), ('2024-03', 70.0), ('2023-12', 60.0)])
+        
+        # The minimum applies after filtering
+        self.assertIsNone(get_consecutive_quarters(quarterly_data, 'revenue', 5, positive_only=True))
+        self.assertEqual(len(get_consecutive_quarters(quarterly_data, 'revenue', 5)), 5)
+    
+    def test_get_consecutive_quarters_multi(self):
+        """Test joining fields keeps only quarters in every field's consecutive run."""
+        quarterly_data = {
+            'period_end_date': ['2023-06', '2023-09', '2023-12', '2024-03', '2024-06'],
+            'revenue': [60.0, 70.0, 80.0, 90.0, None],
+            'operating_income': [None, 7.0, 8.0, 9.0, 10.0]
+        }
+        
+        result = get_consecutive_quarters_multi(quarterly_data, ['revenue', 'operating_income'], 3)
+        self.assertEqual(result, [('2024-03', 90.0, 9.0), ('2023-12', 80.0, 8.0), ('2023-09', 70.0, 7.0)])
+        
+        # Each field still needs enough consecutive quarters on its own
+        self.assertIsNone(get_consecutive_quarters_multi(quarterly_data, ['revenue', 'operating_income'], 5))
+        self.assertIsNone(get_consecutive_quarters_multi(quarterly_data, ['revenue', 'missing'], 1))
+    
+    def test_get_margin_frame(self):
+        """Test the margin frame holds the 20 newest joined quarters, oldest first, and is shared."""
+        dates = [f'{2018 + i // 4}-{(i % 4) * 3 + 3:02d}' for i in range(22)]
+        quarterly_data = {
+            'period_end_date': dates,
+            'revenue': [100.0 + i for i in range(22)],
+            'gross_profit': [40.0 + i for i in range(22)]
+        }
+        
+        frame = get_margin_frame(quarterly_data, 'gross_profit')
+        
+        self.assertEqual(frame.rows[0], ('2018-09', 102.0, 42.0))
+        self.assertEqual(frame.rows[-1], ('2023-06', 121.0, 61.0))
+        self.assertEqual(frame.revenues, tuple(100.0 + i for i in range(2, 22)))
+        self.assertEqual(frame.values, tuple(40.0 + i for i in range(2, 22)))
+        self.assertIs(get_margin_frame(quarterly_data, 'gross_profit'), frame)
+        
+        # Replacing revenue rebuilds the frame; a short run gives None
+        quarterly_data['revenue'] = [None] * 5 + [100.0] * 17
+        self.assertIsNone(get_margin_frame(quarterly_data, 'gross_profit'))
+        self.assertIsNone(get_margin_frame(quarterly_data, 'operating_income'))
+    
+    def test_quarterly(self):
+        """Test quarterly data is returned only when every required field is present."""
+        from get_one import _quarterly
+        quarterly_data = {'revenue': [1.0], 'net_debt': [2.0]}
+        ticker_data = {'financials': {'quarterly': quarterly_data}}
+        
+        self.assertIs(_quarterly(ticker_data), quarterly_data)
+        self.assertIs(_quarterly(ticker_data, 'revenue', 'net_debt'), quarterly_data)
+        self.assertIsNone(_quarterly(ticker_data, 'revenue', 'operating_income'))
+        self.assertIsNone(_quarterly(None, 'revenue'))
+        self.assertIsNone(_quarterly({'financials': {}}))
+    
+    def test_prepare_quarterly_bundle(self):
+        """Test the bundle holds the shared positive-revenue consecutive quarters."""
+        quarterly_data = {
+            'period_end_date': ['2024-03', '2024-06', '2024-09', '2024-12'],
+            'revenue': [70.0, -5.0, 90.0, 100.0]
+        }
+        ticker_data = {'financials': {'quarterly': quarterly_data}}
+        
+        bundle = prepare_quarterly_bundle(ticker_data)
+        
+        self.assertIs(bundle.quarterly, quarterly_data)
+        self.assertEqual(bundle.revenue, [('2024-12', 100.0), ('2024-09', 90.0), ('2024-03', 70.0)])
+        self.assertEqual(bundle.revenue_20, bundle.revenue)
+        self.assertIs(prepare_quarterly_bundle(ticker_data), bundle)
+        
+        # Replacing a series builds a new bundle
+        quarterly_data['revenue'] = [70.0, 80.0, 90.0, 100.0]
+        self.assertEqual(len(prepare_quarterly_bundle(ticker_data).revenue), 4)
+        self.assertIsNone(prepare_quarterly_bundle({}))
+        self.assertIsNone(prepare_quarterly_bundle({'financials': {}}))
+        self.assertEqual(prepare_quarterly_bundle({'financials': {'quarterly': {}}}).revenue, [])
+    
+    def test_prepare_quarterly_bundle_revenue_20(self):
+        """Test the bundle's shared slice holds the most recent 20 quarters."""
+        dates = [f'{2015 + i // 4}-{(i % 4) * 3 + 3:02d}' for i in range(24)]
+        ticker_data = {
+            'financials': {
+                'quarterly': {'period_end_date': dates, 'revenue': [100.0 + i for i in range(24)]}
+            }
+        }
+        
+        bundle = prepare_quarterly_bundle(ticker_data)
+        
+        self.assertEqual(len(bundle.revenue), 24)
+        self.assertEqual(bundle.revenue_20, bundle.revenue[:20])
+        self.assertEqual(bundle.revenue_20[0], ('2020-12', 123.0))
+    
+    def test_mean_stdev_matches_statistics(self):
+        """Test the float mean/stdev helper agrees with the statistics module."""
+        import statistics
+        from get_one import _mean_stdev
+        
+        for values in ([0.1, 0.2, 0.4], [1e6 + 0.1, 1e6 + 0.2, 1e6 + 0.3, 1e6 + 0.5], [0.3, 0.3]):
+            mean, stdev = _mean_stdev(values)
+            self.assertAlmostEqual(mean, statistics.mean(values), places=12)
+            self.assertAlmostEqual(stdev, statistics.stdev(values), places=12)
+    
+    def test_partition_sum(self):
+        """Test partitioned sums match sum() over the same slices."""
+        from get_one import _partition_sum
+        
+        values = [0.1 * i for i in range(21)]
+        
+        self.assertEqual(_partition_sum(values, (7, 7, 7)),
+                         [sum(values[:7]), sum(values[7:14]), sum(values[14:])])
+        self.assertEqual(_partition_sum(tuple(values), (10, 10)),
+                         [sum(values[:10]), sum(values[10:20])])
+    
+    def test_value_at(self):
+        """Test looking up a consecutive run's value by date."""
+        from get_one import _value_at
+        
+        run = [('2024-12', 3.0), ('2024-09', 2.0), ('2024-06', 1.0)]
+        
+        self.assertEqual(_value_at(run, '2024-12'), 3.0)
+        self.assertEqual(_value_at(run, '2024-06'), 1.0)
+        self.assertIsNone(_value_at(run, '2025-03'))
+        self.assertIsNone(_value_at(run, '2024-03'))
+        self.assertIsNone(_value_at(run, '2024-11'))
+    
+    def test_dividends_at(self):
+        """Test dividends line up with a run by position or, failing that, by date."""
+        from get_one import _dividends_at
+        
+        dates = ['2024-03', '2024-06', '2024-09', '2024-12']
+        run = [('2024-12', 13.0), ('2024-09', 12.0), ('2024-06', 11.0)]
+        
+        self.assertEqual(_dividends_at(run, dates, [0.1, None, 0.3]), [0.0, 0.3, 0.0])
+        self.assertEqual(_dividends_at(run, dates, []), [0.0, 0.0, 0.0])
+        # A repeated date falls back to the lookup, where the last one wins
+        self.assertEqual(_dividends_at(run, dates + ['2024-12'], [0.1, 0.2, 0.3, 0.4, 0.5]),
+                         [0.5, 0.3, 0.2])
+    
+    def test_reinvest(self):
+        """Test dividends buy shares at each period's end price."""
+        from get_one import _reinvest
+        
+        shares_owned, periods = _reinvest([('2024-03', 10.0, 0.0), ('2024-06', 20.0, 2.0),
+                                           ('2024-09', 22.0, -1.0)])
+        
+        self.assertAlmostEqual(shares_owned, 1.1)
+        self.assertEqual(periods[0], ('2024-03', 10.0, 0.0, 1.0, 0.0, 0.0, 1.0))
+        self.assertEqual(periods[1][3:], (1.0, 2.0, 0.1, 1.1))
+        self.assertEqual(periods[2][5:], (0.0, shares_owned))
+    
     def test_get_ticker_data_existing(self):
         """Test getting ticker data from database."""
         # Insert test data
@@ -162,11 +367,215 @@ class TestQuickFSGetOne(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result['revenue'], [100.0, 90.0])
     
+    def test_get_ticker_data_compressed(self):
+        """Test getting ticker data saved zlib-compressed by get_data.py."""
+        import zlib
+        test_data = {'revenue': [100.0, 90.0]}
+        
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+            VALUES (?, ?, ?, ?)
+        ''', ('MSFT', 'full', zlib.compress(json.dumps(test_data).encode()), '2024-01-01'))
+        conn.commit()
+        conn.close()
+        
+        result = get_ticker_data('MSFT')
+        
+        self.assertEqual(result, test_data)
+    
+    def test_get_ticker_data_non_finite_values(self):
+        """Test data containing NaN still loads (orjson rejects it, json does not)."""
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+            VALUES (?, ?, ?, ?)
+        ''', ('NAN', 'full', '{"revenue": [NaN, 90.0]}', '2024-01-01'))
+        conn.commit()
+        conn.close()
+        
+        result = get_ticker_data('NAN')
+        
+        self.assertNotEqual(result['revenue'][0], result['revenue'][0])
+        self.assertEqual(result['revenue'][1], 90.0)
+    
+    def test_get_ticker_data_reuses_read_connection(self):
+        """Test reads share one read-only connection until the database changes."""
+        import get_one as quickfs_module
+        
+        self.assertIsNone(get_ticker_data('AAPL'))
+        conn = quickfs_module.get_read_connection()
+        self.assertIsNone(get_ticker_data('MSFT'))
+        self.assertIs(quickfs_module.get_read_connection(), conn)
+        with self.assertRaises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM quickfs_data")
+        
+        # Replacing the database file opens a new connection
+        os.remove(self.test_db)
+        new_conn = sqlite3.connect(self.test_db)
+        new_conn.execute('CREATE TABLE quickfs_data (ticker TEXT, data_type TEXT, data_json TEXT, fetched_at TEXT)')
+        new_conn.execute("INSERT INTO quickfs_data VALUES ('AAPL', 'full', '{\"revenue\": [1.0]}', '2024-01-01')")
+        new_conn.commit()
+        new_conn.close()
+        
+        self.assertEqual(get_ticker_data('AAPL'), {'revenue': [1.0]})
+        self.assertIsNot(quickfs_module.get_read_connection(), conn)
+    
     def test_get_ticker_data_nonexistent(self):
         """Test getting ticker data for nonexistent ticker."""
         result = get_ticker_data('INVALID')
         self.assertIsNone(result)
     
+    def test_get_cached_ticker_data(self):
+        """Test cached ticker data is reused until the database is written to."""
+        conn = sqlite3.connect(self.test_db)
+        conn.execute('''
+            INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+            VALUES (?, ?, ?, ?)
+        ''', ('AAPL', 'full', '{"revenue": [1.0]}', '2024-01-01'))
+        conn.commit()
+        
+        data = get_cached_ticker_data('AAPL')
+        self.assertEqual(data, {'revenue': [1.0]})
+        self.assertIs(get_cached_ticker_data('aapl'), data)
+        self.assertIsNone(get_cached_ticker_data('INVALID'))
+        
+        conn.execute("UPDATE quickfs_data SET data_json = '{\"revenue\": [2.0]}'")
+        conn.commit()
+        conn.close()
+        
+        self.assertEqual(get_cached_ticker_data('AAPL'), {'revenue': [2.0]})
+    
+    def test_iter_ticker_data(self):
+        """Test bulk reads yield each ticker's latest data in the requested order."""
+        import zlib
+        import get_one as quickfs_module
+        
+        conn = sqlite3.connect(self.test_db)
+        conn.executemany('''
+            INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+            VALUES (?, ?, ?, ?)
+        ''', [
+            ('AAPL', 'full', '{"revenue": [1.0]}', '2024-01-01'),
+            ('AAPL', 'full', '{"revenue": [2.0]}', '2024-02-01'),
+            ('MSFT', 'full', zlib.compress(b'{"revenue": [3.0]}'), '2024-01-01'),
+            ('MSFT', 'partial', '{"revenue": [4.0]}', '2024-03-01'),
+        ])
+        conn.commit()
+        conn.close()
+        
+        tickers = ['msft', 'INVALID', 'AAPL', 'MSFT']
+        with patch.object(quickfs_module, 'TICKER_CHUNK_SIZE', 2):
+            result = list(iter_ticker_data(tickers))
+        
+        self.assertEqual(result, [
+            ('msft', {'revenue': [3.0]}),
+            ('INVALID', None),
+            ('AAPL', {'revenue': [2.0]}),
+            ('MSFT', {'revenue': [3.0]}),
+        ])
+        self.assertEqual(result, [(ticker, get_ticker_data(ticker)) for ticker in tickers])
+    
+    def test_calculate_all_metrics(self):
+        """Test every calculator runs on one load of the ticker's data."""
+        dates = [f'{2019 + i // 4}-{(i % 4) * 3 + 3:02d}' for i in range(24)]
+        test_data = {
+            'financials': {
+                'quarterly': {'period_end_date': dates, 'revenue': [100.0 + i for i in range(24)]}
+            }
+        }
+        
+        conn = sqlite3.connect(self.test_db)
+        conn.execute('''
+            INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+            VALUES (?, ?, ?, ?)
+        ''', ('AAPL', 'full', json.dumps(test_data), '2024-01-01'))
+        conn.commit()
+        conn.close()
+        
+        metrics = calculate_all_metrics('aapl')
+        
+        self.assertEqual(set(metrics), set(METRIC_CALCULATORS))
+        self.assertEqual(metrics['revenue_5y_cagr'], calculate_5y_revenue_growth(test_data))
+        self.assertIsNotNone(metrics['revenue_growth_consistency'])
+        self.assertIsNone(metrics['operating_margin_growth'])
+        self.assertIsNone(calculate_all_metrics('INVALID'))
+    
+    def test_run_all(self):
+        """Test a bulk run returns each ticker's metrics in the requested order."""
+        dates = [f'{2019 + i // 4}-{(i % 4) * 3 + 3:02d}' for i in range(24)]
+        conn = sqlite3.connect(self.test_db)
+        for ticker, base in (('AAPL', 100.0), ('MSFT', 50.0)):
+            test_data = {
+                'financials': {
+                    'quarterly': {'period_end_date': dates, 'revenue': [base + i for i in range(24)]}
+                }
+            }
+            conn.execute('''
+                INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+                VALUES (?, ?, ?, ?)
+            ''', (ticker, 'full', json.dumps(test_data), '2024-01-01'))
+        conn.commit()
+        conn.close()
+        
+        results = run_all(['msft', 'INVALID', 'aapl'], max_workers=2)
+        
+        self.assertEqual(list(results), ['msft', 'INVALID', 'aapl'])
+        self.assertIsNone(results['INVALID'])
+        self.assertEqual(results['aapl'], calculate_all_metrics('AAPL'))
+        self.assertEqual(results['msft'], calculate_all_metrics('MSFT'))
+        self.assertNotEqual(results['aapl'], results['msft'])
+    
+    def test_format_revenues(self):
+        """Test batch formatting matches format_revenue for every magnitude."""
+        revenues = [2.5e12, 1e9, 999999999.0, 1e6, 12345.6, 0, -3e9]
+        self.assertEqual(format_revenues(revenues), [format_revenue(revenue) for revenue in revenues])
+        self.assertEqual(format_revenues(iter([1.5e9])), ['$1.50B'])
+    
+    def test_build_summary(self):
+        """Test the summary has one line per metric, with N/A for missing results."""
+        metrics = dict.fromkeys(METRIC_CALCULATORS)
+        metrics['revenue_5y_cagr'] = (0.1234, 0, 0, [], [], 5.0)
+        
+        summary = build_summary(metrics)
+        
+        self.assertEqual(len(summary), len(METRIC_CALCULATORS))
+        self.assertEqual(summary[0], "5-Year CAGR: 12.34%")
+        self.assertEqual(summary[1], "5-Year Halfway Growth: N/A")
+    
+    def test_sections_cover_every_metric(self):
+        """Test the report has exactly one detail section per metric."""
+        from get_one import SECTIONS
+        self.assertEqual(sorted(key for key, _, _ in SECTIONS), sorted(METRIC_CALCULATORS))
+    
+    def test_main_summary_only(self):
+        """Test summary-only mode prints the metric summary without the detail tables."""
+        dates = [f'{2019 + i // 4}-{(i % 4) * 3 + 3:02d}' for i in range(24)]
+        test_data = {
+            'financials': {
+                'quarterly': {'period_end_date': dates, 'revenue': [100.0 + i for i in range(24)]}
+            }
+        }
+        
+        conn = sqlite3.connect(self.test_db)
+        conn.execute('''
+            INSERT INTO quickfs_data (ticker, data_type, data_json, fetched_at)
+            VALUES (?, ?, ?, ?)
+        ''', ('AAPL', 'full', json.dumps(test_data), '2024-01-01'))
+        conn.commit()
+        conn.close()
+        
+        for summary_only in (False, True):
+            with patch('builtins.input', side_effect=['AAPL', 'quit']), \
+                    patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                main(summary_only=summary_only)
+            output = stdout.getvalue()
+            self.assertIn("METRIC SUMMARY", output)
+            self.assertIn("1. 5-Year CAGR: ", output)
+            self.assertEqual("5-YEAR CAGR (Quarterly Data):" in output, not summary_only)
+    
     def test_calculate_5y_revenue_growth(self):
         """Test 5-year revenue CAGR calculation."""
         # Create test data with 20+ consecutive quarters (format: YYYY-MM)
@@ -442,6 +851,28 @@ class TestQuickFSMarginCalculations(unittest.TestCase):
         result = calculate_consistency_of_growth(ticker_data)
         self.assertIsNone(result)
     
+    def test_calculate_consistency_of_growth_matches_previous_year_quarter(self):
+        """Test YoY growth pairs each quarter with the same quarter a year earlier."""
+        import statistics
+        dates = [f'{2019 + i // 4}-{(i % 4) * 3 + 3:02d}' for i in range(24)]
+        revenues = [100.0 + 10.0 * i for i in range(24)]
+        revenues[15] = 0.0  # 2022-12 is filtered out, so 2023-12 has no YoY growth
+        ticker_data = {
+            'financials': {
+                'quarterly': {'period_end_date': dates, 'revenue': revenues}
+            }
+        }
+        
+        stdev, avg_growth, growth_rates, quarters_with_growth = calculate_consistency_of_growth(ticker_data)
+        
+        pairs = {date: prev_date for date, _, prev_date, _, _ in quarters_with_growth}
+        self.assertEqual(pairs['2024-12'], '2023-12')
+        self.assertEqual(pairs['2024-03'], '2023-03')
+        self.assertNotIn('2023-12', pairs)
+        self.assertEqual(len(growth_rates), len(quarters_with_growth))
+        self.assertGreater(stdev, 0)
+        self.assertEqual(avg_growth, statistics.fmean(growth_rates))
+    
     def test_calculate_acceleration_of_growth_no_financials(self):
         """Test calculate_acceleration_of_growth when no financials."""
         ticker_data = {}
@@ -14,6 +14,8 @@ import shutil
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from quickfs.calculate_all_metrics import METRIC_COLUMNS, METRIC_INDEX
+
 
 class TestRecalculateAllMetrics(unittest.TestCase):
     """Test cases for recalculate_all_metrics.py"""
@@ -32,17 +34,25 @@ class TestRecalculateAllMetrics(unittest.TestCase):
         """Test successful QuickFS calculations."""
         import recalculate_all_metrics
         
+        def make_metrics(cagr, halfway_growth):
+            # Metric values are carried as a list ordered by METRIC_COLUMNS
+            values = [None] * len(METRIC_COLUMNS)
+            values[METRIC_INDEX['revenue_5y_cagr']] = cagr
+            values[METRIC_INDEX['revenue_5y_halfway_growth']] = halfway_growth
+            return {'values': values}
+        
         # Mock the calculate_all_metrics module
         mock_calc_module = MagicMock()
         mock_calc_module.init_metrics_db = Mock()
         mock_calc_module.get_all_tickers = Mock(return_value=['AAPL', 'MSFT', 'GOOGL'])
         mock_calc_module.calculate_all_metrics_for_ticker = Mock(side_effect=[
-            ({'revenue_5y_cagr': 0.15, 'revenue_5y_halfway_growth': 0.12}, None),
-            ({'revenue_5y_cagr': 0.20, 'revenue_5y_halfway_growth': 0.18}, None),
-            ({'revenue_5y_cagr': 0.25, 'revenue_5y_halfway_growth': 0.22}, None),
+            (make_metrics(0.15, 0.12), None),
+            (make_metrics(0.20, 0.18), None),
+            (make_metrics(0.25, 0.22), None),
         ])
         mock_calc_module.save_metrics = Mock(return_value=True)
         mock_calc_module.METRICS_DB = 'quickfs/metrics.db'
+        mock_calc_module.METRIC_INDEX = METRIC_INDEX
         
         # Mock the import
         with patch.dict('sys.modules', {'calculate_all_metrics': mock_calc_module}):